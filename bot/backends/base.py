@@ -0,0 +1,135 @@
+"""
+Database backend interface.
+bot.database delegates every call to one backend chosen by DATABASE_URL scheme.
+Backends use the PostgreSQL query dialect ($1 placeholders) and raise DatabaseError on failure.
+"""
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import date
+from typing import AsyncIterator
+
+from bot.utils.exceptions import DatabaseBusyError
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of connection pool usage."""
+
+    size: int
+    min_size: int
+    max_size: int
+    in_use: int
+    idle: int
+    waiters: int
+    acquires: int
+    acquire_timeouts: int
+    avg_acquire_wait_ms: float
+    max_acquire_wait_ms: float
+
+
+# bot_state key holding the fingerprint of the DDL last applied by init_schema
+SCHEMA_VERSION_KEY = "schema_version"
+
+
+def ddl_fingerprint(*parts: str) -> str:
+    """Short hash of schema DDL; changes whenever the DDL text changes."""
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def add_months(d: date, months: int) -> date:
+    """First day of the month `months` after d's month."""
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class DatabaseBackend:
+    """Base class for database backends. Subclasses implement every method."""
+
+    name = "base"
+
+    async def connect(self) -> None:
+        """Open connections and make them ready to serve queries."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Close all connections."""
+        raise NotImplementedError
+
+    async def execute(self, query: str, args: tuple, timeout: float | None) -> None:
+        """Run a statement that returns nothing."""
+        raise NotImplementedError
+
+    async def execute_many(self, batches: list[tuple[str, list[tuple]]]) -> None:
+        """Run each (query, rows) batch with executemany, all inside one transaction."""
+        raise NotImplementedError
+
+    async def fetchrow(self, query: str, args: tuple, timeout: float | None, replica: bool):
+        """Run a query and return the first row (mapping-like) or None."""
+        raise NotImplementedError
+
+    async def fetch(self, query: str, args: tuple, timeout: float | None, replica: bool) -> list:
+        """Run a query and return all rows (mapping-like)."""
+        raise NotImplementedError
+
+    def stream(self, query: str, args: tuple, batch_size: int, replica: bool) -> AsyncIterator[list]:
+        """Run a query and yield its rows in lists of up to batch_size, read through a cursor."""
+        raise NotImplementedError
+
+    async def init_schema(self) -> None:
+        """Create tables, indexes and counters if they do not exist."""
+        raise NotImplementedError
+
+    @property
+    def schema_version(self) -> str:
+        """Fingerprint of the DDL init_schema applies."""
+        raise NotImplementedError
+
+    async def stored_schema_version(self) -> str | None:
+        """Schema version recorded by the last successful init_schema, or None (fresh database)."""
+        raise NotImplementedError
+
+    async def store_schema_version(self) -> None:
+        """Record schema_version after init_schema succeeded."""
+        await self.execute(
+            """
+            INSERT INTO bot_state (key, value, updated_at)
+            VALUES ($1, $2, NOW())
+            ON CONFLICT (key) DO UPDATE SET value = $2, updated_at = NOW()
+            """,
+            (SCHEMA_VERSION_KEY, self.schema_version),
+            None,
+        )
+
+    def utc_hour_sql(self, column: str) -> str:
+        """SQL expression for a timestamp column's UTC hour as 'YYYY-MM-DD HH' text."""
+        raise NotImplementedError
+
+    async def ensure_partitions(self, months_ahead: int) -> None:
+        """Prepare storage for upcoming months of join/broadcast logs."""
+        raise NotImplementedError
+
+    async def apply_retention(self, retention_months: int, action: str) -> list[str]:
+        """Remove log history older than retention_months. Returns what was removed."""
+        raise NotImplementedError
+
+    def is_unavailable_error(self, error: BaseException) -> bool:
+        """
+        True if error means the database could not be reached (as opposed to a bad query or a
+        saturated pool, which wraps a TimeoutError but says nothing about the database).
+        """
+        if isinstance(error, DatabaseBusyError):
+            return False
+        if isinstance(error, (OSError, asyncio.TimeoutError)):
+            return True
+        original = getattr(error, "original", None)
+        return original is not None and original is not error and self.is_unavailable_error(original)
+
+    def pool_stats(self, replica: bool = False) -> PoolStats | None:
+        """Live pool statistics, or None when there is no pool."""
+        return None
+
+    def replica_status(self) -> dict | None:
+        """Replica routing state, or None when no replica is configured."""
+        return None
@@ -0,0 +1,735 @@
+"""
+PostgreSQL backend (asyncpg).
+Primary pool for writes, optional read replica for reads marked replica=True,
+monthly partitions for join_logs/broadcast_results and trigger-maintained stats counters.
+With per_tenant_schemas, each tenant's tables live in its own schema and a connection's
+search_path is switched to the current tenant's schema when it is acquired (emptied when no
+tenant is current).
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from typing import AsyncIterator
+
+import asyncpg
+from asyncpg import Pool
+
+from bot.backends.base import SCHEMA_VERSION_KEY, DatabaseBackend, PoolStats, add_months, ddl_fingerprint
+from bot.config import (
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MAX_INACTIVE_LIFETIME,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_CONNECT_TIMEOUT,
+    DB_COMMAND_TIMEOUT,
+    DB_ACQUIRE_TIMEOUT,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_CHECK_INTERVAL,
+)
+from bot.tenants import current_tenant
+from bot.utils.exceptions import DatabaseBusyError, DatabaseError
+from bot.utils.logger import get_logger
+from bot.utils.metrics import DB_POOL_WAIT
+
+logger = get_logger(__name__)
+
+# Replica lag in seconds; 0 when the replica has replayed everything it received
+_REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+"""
+
+_BASE_DDL = """
+    CREATE TABLE IF NOT EXISTS admins (
+        user_id BIGINT PRIMARY KEY,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    );
+
+    CREATE TABLE IF NOT EXISTS users (
+        user_id BIGINT PRIMARY KEY,
+        username VARCHAR(255),
+        first_name VARCHAR(255),
+        last_name VARCHAR(255),
+        joined_at TIMESTAMPTZ DEFAULT NOW(),
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    -- Set when a broadcast gets Forbidden; cleared when the user interacts again
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS blocked BOOLEAN NOT NULL DEFAULT FALSE;
+    -- Written in bulk by the activity flush job (bot.services.activity_service)
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMPTZ;
+    -- Admin user pages (newest first) seek on (joined_at, user_id) and skip NULL joined_at
+    UPDATE users SET joined_at = COALESCE(updated_at, NOW()) WHERE joined_at IS NULL;
+    CREATE INDEX IF NOT EXISTS users_joined_at_idx ON users (joined_at DESC, user_id DESC);
+
+    CREATE TABLE IF NOT EXISTS bot_config (
+        key VARCHAR(100) PRIMARY KEY,
+        value TEXT,
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+
+    -- Internal bookkeeping, kept out of the admin-editable bot_config
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key VARCHAR(100) PRIMARY KEY,
+        value TEXT,
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    DELETE FROM bot_config WHERE key = 'schema_version';
+    INSERT INTO bot_state (key, value, updated_at)
+        SELECT key, value, updated_at FROM bot_config WHERE key = 'update_high_water_mark'
+        ON CONFLICT (key) DO NOTHING;
+    DELETE FROM bot_config WHERE key = 'update_high_water_mark';
+
+    CREATE TABLE IF NOT EXISTS user_states (
+        user_id BIGINT PRIMARY KEY,
+        state VARCHAR(50),
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+
+    CREATE TABLE IF NOT EXISTS admin_states (
+        admin_id BIGINT PRIMARY KEY,
+        state VARCHAR(50),
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+
+    -- Rollups of join_logs / broadcast_results kept by the stats job; buckets are UTC text
+    -- ('YYYY-MM-DD HH' / 'YYYY-MM-DD') and survive partition retention
+    CREATE TABLE IF NOT EXISTS stats_hourly (
+        bucket VARCHAR(13) NOT NULL,
+        metric VARCHAR(32) NOT NULL,
+        value BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, metric)
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        bucket VARCHAR(10) NOT NULL,
+        metric VARCHAR(32) NOT NULL,
+        value BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, metric)
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_watermarks (
+        source VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        pending_id BIGINT NOT NULL DEFAULT 0,
+        run_token VARCHAR(32),
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+
+    -- Id ranges the rollup watermark passed without rows (open or rolled-back transactions)
+    CREATE TABLE IF NOT EXISTS stats_rollup_gaps (
+        source VARCHAR(64) NOT NULL,
+        lo BIGINT NOT NULL,
+        hi BIGINT NOT NULL,
+        run_token VARCHAR(32),
+        found_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (source, lo, hi)
+    );
+"""
+
+# Append-only tables stored as monthly range partitions: table -> (partition column, DDL)
+PARTITIONED_TABLES: dict[str, tuple[str, str]] = {
+    "join_logs": (
+        "created_at",
+        """
+        CREATE TABLE IF NOT EXISTS join_logs (
+            id SERIAL,
+            user_id BIGINT,
+            username VARCHAR(255),
+            dm_sent BOOLEAN,
+            error_message TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+        -- Admin log pages seek on (created_at, id); failed welcomes have their own partial index
+        DROP INDEX IF EXISTS join_logs_created_at_idx;
+        CREATE INDEX IF NOT EXISTS join_logs_created_at_id_idx ON join_logs (created_at DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS join_logs_failed_idx ON join_logs (created_at DESC, id DESC) WHERE dm_sent = FALSE;
+        """,
+    ),
+    "broadcast_results": (
+        "broadcast_at",
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_results (
+            id SERIAL,
+            broadcast_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            total_users INT,
+            delivered INT,
+            failed INT,
+            blocked INT,
+            message_type VARCHAR(50),
+            PRIMARY KEY (id, broadcast_at)
+        ) PARTITION BY RANGE (broadcast_at);
+        """,
+    ),
+}
+
+# Counters are spread over slots (key % STATS_COUNTER_SLOTS) so concurrent joins don't all
+# queue on one hot row; readers SUM a fixed number of rows.
+STATS_COUNTER_SLOTS = 16
+
+_STATS_COUNTERS_DDL = f"""
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name VARCHAR(64) NOT NULL,
+        slot SMALLINT NOT NULL,
+        value BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (name, slot)
+    );
+
+    CREATE OR REPLACE FUNCTION stats_counter_add(p_name TEXT, p_key BIGINT, p_delta BIGINT)
+    RETURNS void AS $$
+    BEGIN
+        INSERT INTO stats_counters (name, slot, value)
+        VALUES (p_name, (p_key % {STATS_COUNTER_SLOTS})::smallint, p_delta)
+        ON CONFLICT (name, slot) DO UPDATE SET value = stats_counters.value + EXCLUDED.value;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION stats_users_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM stats_counter_add('users_total', NEW.user_id, 1);
+            IF NOT NEW.blocked THEN
+                PERFORM stats_counter_add('users_reachable', NEW.user_id, 1);
+            END IF;
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM stats_counter_add('users_total', OLD.user_id, -1);
+            IF NOT OLD.blocked THEN
+                PERFORM stats_counter_add('users_reachable', OLD.user_id, -1);
+            END IF;
+        ELSIF OLD.blocked IS DISTINCT FROM NEW.blocked THEN
+            PERFORM stats_counter_add(
+                'users_reachable', NEW.user_id, CASE WHEN NEW.blocked THEN -1 ELSE 1 END
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION stats_join_logs_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM stats_counter_add(
+            'joins:' || to_char(NEW.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD'), NEW.id, 1
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS stats_users_counters ON users;
+    CREATE TRIGGER stats_users_counters
+        AFTER INSERT OR DELETE OR UPDATE OF blocked ON users
+        FOR EACH ROW EXECUTE FUNCTION stats_users_trigger();
+
+    DROP TRIGGER IF EXISTS stats_join_logs_counters ON join_logs;
+    CREATE TRIGGER stats_join_logs_counters
+        AFTER INSERT ON join_logs
+        FOR EACH ROW EXECUTE FUNCTION stats_join_logs_trigger();
+"""
+
+SCHEMA_VERSION = ddl_fingerprint(_BASE_DDL, *(ddl for _, ddl in PARTITIONED_TABLES.values()), _STATS_COUNTERS_DDL)
+
+
+class _TenantConnection(asyncpg.Connection):
+    """Connection that remembers its search_path, so it is only set when the tenant changes."""
+
+    _schema: str | None = None
+
+    @staticmethod
+    def _search_path_sql(schema: str) -> str:
+        # "" leaves only the implicit pg_catalog, so unqualified table names are not found
+        return f'SET search_path TO "{schema}";' if schema else "SET search_path TO '';"
+
+    async def use_schema(self, schema: str) -> None:
+        if schema != self._schema:
+            await self.execute(self._search_path_sql(schema))
+            self._schema = schema
+
+    def get_reset_query(self) -> str:
+        """
+        The pool's full reset on release (open transactions rolled back, RESET ALL...), then the
+        search_path put back in the same round trip, so the remembered schema stays true.
+        """
+        query = super().get_reset_query()
+        if self._schema is not None:
+            query += "\n" + self._search_path_sql(self._schema)
+        return query
+
+
+class _AcquireCounters:
+    """Running acquire counters (single event loop, no locking needed)."""
+
+    def __init__(self, pool_label: str) -> None:
+        self.wait_metric = DB_POOL_WAIT.labels(pool_label)
+        self.waiters = 0
+        self.acquires = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+async def _create_month_partition(conn, table: str, month: date) -> None:
+    """Create the partition holding [month, next month) in UTC if it does not exist."""
+    await conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {_partition_name(table, month)} PARTITION OF {table}
+        FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00+00')
+        """
+    )
+
+
+async def create_partitions_for_range(conn, table: str, first: date, last: date) -> None:
+    """Create monthly partitions of table for every month from first to last (inclusive)."""
+    month = add_months(first, 0)
+    while month <= last:
+        await _create_month_partition(conn, table, month)
+        month = add_months(month, 1)
+
+
+async def _convert_to_partitioned(conn, table: str, column: str, ddl: str) -> None:
+    """
+    One-time migration of a pre-partitioning table: rename it, create the partitioned
+    table, create monthly partitions covering the old rows, copy them over (rows with a NULL
+    timestamp get the current time), drop the old table.
+    """
+    legacy = f"{table}_legacy"
+    logger.info("Converting %s to monthly partitions", table)
+    async with conn.transaction():
+        seq = await conn.fetchval("SELECT pg_get_serial_sequence($1, 'id')", table)
+        await conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        await conn.execute(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {legacy}_pkey")
+        if seq:
+            await conn.execute(f"ALTER SEQUENCE {seq} RENAME TO {legacy}_id_seq")
+        await conn.execute(ddl)
+        await conn.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+        oldest = await conn.fetchval(f"SELECT MIN({column}) FROM {legacy}")
+        await create_partitions_for_range(
+            conn,
+            table,
+            (oldest or datetime.now(timezone.utc)).astimezone(timezone.utc).date(),
+            datetime.now(timezone.utc).date(),
+        )
+        # The partition key is NOT NULL now; keep undated rows (stamped with the migration time)
+        undated = await conn.execute(f"UPDATE {legacy} SET {column} = NOW() WHERE {column} IS NULL")
+        if undated != "UPDATE 0":
+            logger.warning("%s had rows without %s, copied with the current time | %s", table, column, undated)
+        moved = await conn.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {legacy}), 0) + 1, false)"
+        )
+        await conn.execute(f"DROP TABLE {legacy}")
+    logger.info("Converted %s to monthly partitions | %s", table, moved)
+
+
+async def _init_stats_counters(conn) -> None:
+    """Install counter triggers and, on first run, seed counters from the existing rows."""
+    async with conn.transaction():
+        # Block user/log writes while seeding so no row is counted twice or missed
+        await conn.execute("LOCK TABLE users, join_logs IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute(_STATS_COUNTERS_DDL)
+        seeded = await conn.fetchval("SELECT 1 FROM stats_counters WHERE name = 'users_total' LIMIT 1")
+        if seeded:
+            return
+        await conn.execute(
+            """
+            INSERT INTO stats_counters (name, slot, value)
+            SELECT 'users_total', 0, COUNT(*) FROM users
+            UNION ALL
+            SELECT 'users_reachable', 0, COUNT(*) FROM users WHERE NOT blocked
+            UNION ALL
+            SELECT 'joins:' || to_char(NOW() AT TIME ZONE 'UTC', 'YYYY-MM-DD'), 0, COUNT(*)
+            FROM join_logs WHERE created_at >= date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+            """
+        )
+        logger.info("Stats counters seeded from existing rows")
+
+
+class PostgresBackend(DatabaseBackend):
+    """asyncpg pools for a primary and an optional read replica."""
+
+    name = "postgresql"
+
+    def __init__(self, dsn: str, replica_dsn: str = "", per_tenant_schemas: bool = False) -> None:
+        self.dsn = dsn
+        self.replica_dsn = replica_dsn
+        self.per_tenant_schemas = per_tenant_schemas
+        self._pool: Pool | None = None
+        self._pool_lock = asyncio.Lock()
+        self._counters = _AcquireCounters("primary")
+        self._replica_pool: Pool | None = None
+        self._replica_lock = asyncio.Lock()
+        self._replica_counters = _AcquireCounters("replica")
+        self._replica_healthy = False
+        self._replica_lag: float | None = None
+        self._replica_checked_at = 0.0
+
+    # Pools
+
+    async def _create_pool(self, dsn: str, label: str) -> Pool:
+        """Create an asyncpg pool with the configured size and timeouts."""
+        tenant_options = {}
+        if self.per_tenant_schemas:
+            tenant_options = {"connection_class": _TenantConnection}
+        try:
+            pool = await asyncpg.create_pool(
+                dsn,
+                **tenant_options,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+                statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                timeout=DB_CONNECT_TIMEOUT,
+                command_timeout=DB_COMMAND_TIMEOUT,
+            )
+        except Exception as e:
+            logger.exception("Failed to create %s database pool", label)
+            msg = f"Failed to connect to {label} database"
+            if isinstance(e, OSError) and "Name or service not known" in str(e):
+                msg += ". Check DATABASE_URL in .env: use localhost if PostgreSQL is on this server, or a valid hostname for remote DB."
+            raise DatabaseError(msg, original=e) from e
+        logger.info(
+            "Database %s pool created | min_size=%s max_size=%s",
+            label,
+            DB_POOL_MIN_SIZE,
+            DB_POOL_MAX_SIZE,
+        )
+        return pool
+
+    async def get_pool(self) -> Pool:
+        """Get or create the primary connection pool."""
+        if self._pool is not None:
+            return self._pool
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await self._create_pool(self.dsn, "primary")
+        return self._pool
+
+    @asynccontextmanager
+    async def acquire(self, pool: Pool | None = None, counters: _AcquireCounters | None = None):
+        """
+        Acquire a pooled connection (primary by default), recording waiters and wait time.
+        Raises DatabaseBusyError if no connection frees up within DB_ACQUIRE_TIMEOUT.
+        """
+        pool = pool or await self.get_pool()
+        counters = counters or self._counters
+        counters.waiters += 1
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=DB_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            counters.timeouts += 1
+            logger.error("Timed out waiting for a database connection | waiters=%s", counters.waiters)
+            raise DatabaseBusyError("Database is busy, try again later", original=e) from e
+        finally:
+            counters.waiters -= 1
+        waited = time.perf_counter() - started
+        counters.wait_metric.observe(waited)
+        counters.acquires += 1
+        counters.wait_total += waited
+        if waited > counters.wait_max:
+            counters.wait_max = waited
+        try:
+            if self.per_tenant_schemas:
+                # Without a tenant (pool warm-up, replica lag check) the search_path is emptied, so
+                # a stray query fails instead of reading the previous tenant's tables
+                tenant = current_tenant()
+                await conn.use_schema(tenant.schema if tenant else "")
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    async def connect(self) -> None:
+        """
+        Create the pool and open min_size connections up front (called from post_init),
+        so the first updates after a restart don't pay for connection setup and TLS.
+        """
+        pool = await self.get_pool()
+
+        async def _ping() -> None:
+            async with self.acquire(pool) as conn:
+                await conn.execute("SELECT 1")
+
+        try:
+            await asyncio.gather(*(_ping() for _ in range(pool.get_min_size())))
+        except (asyncpg.PostgresError, OSError) as e:
+            logger.exception("Failed to warm database pool")
+            raise DatabaseError("Failed to warm database pool", original=e) from e
+        if self.replica_dsn:
+            await self._check_replica()
+
+    async def close(self) -> None:
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+            logger.info("Database pool closed")
+        if self._replica_pool:
+            await self._replica_pool.close()
+            self._replica_pool = None
+            self._replica_healthy = False
+            logger.info("Database replica pool closed")
+
+    # Replica routing
+
+    async def _check_replica(self) -> bool:
+        """Create the replica pool if needed and measure lag. Updates the health flag."""
+        async with self._replica_lock:
+            if time.monotonic() - self._replica_checked_at < DB_REPLICA_CHECK_INTERVAL:
+                return self._replica_healthy
+            self._replica_checked_at = time.monotonic()
+            try:
+                if self._replica_pool is None:
+                    self._replica_pool = await self._create_pool(self.replica_dsn, "replica")
+                async with self.acquire(self._replica_pool, self._replica_counters) as conn:
+                    row = await conn.fetchrow(_REPLICA_LAG_QUERY, timeout=DB_CONNECT_TIMEOUT)
+                lag = float(row["lag"])
+            except (asyncpg.PostgresError, OSError, asyncio.TimeoutError, DatabaseError) as e:
+                if self._replica_healthy:
+                    logger.warning("Replica unhealthy, reads fall back to primary | %s", e)
+                self._replica_healthy = False
+                self._replica_lag = None
+                return False
+            healthy = lag <= DB_REPLICA_MAX_LAG_SECONDS
+            if healthy != self._replica_healthy:
+                if healthy:
+                    logger.info("Replica healthy, routing reads to replica | lag=%.1fs", lag)
+                else:
+                    logger.warning("Replica lagging %.1fs, reads fall back to primary", lag)
+            self._replica_healthy = healthy
+            self._replica_lag = lag
+            return healthy
+
+    async def _get_read_pool(self) -> Pool | None:
+        """Replica pool if configured, healthy and caught up; otherwise None (use primary)."""
+        if not self.replica_dsn:
+            return None
+        if time.monotonic() - self._replica_checked_at >= DB_REPLICA_CHECK_INTERVAL:
+            await self._check_replica()
+        return self._replica_pool if self._replica_healthy else None
+
+    def _mark_replica_unhealthy(self, error: Exception) -> None:
+        """Stop routing reads to the replica until the next health check."""
+        if self._replica_healthy:
+            logger.warning("Replica read failed, falling back to primary | %s", error)
+        self._replica_healthy = False
+        self._replica_checked_at = time.monotonic()
+
+    # Queries
+
+    async def execute(self, query: str, args: tuple, timeout: float | None) -> None:
+        try:
+            async with self.acquire() as conn:
+                await conn.execute(query, *args, timeout=timeout)
+        except asyncpg.PostgresError as e:
+            logger.exception("Database operation failed: %s", query[:100])
+            raise DatabaseError("Database operation failed", original=e) from e
+
+    async def execute_many(self, batches: list[tuple[str, list[tuple]]]) -> None:
+        try:
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    for query, rows in batches:
+                        await conn.executemany(query, rows)
+        except asyncpg.PostgresError as e:
+            logger.exception("Database batch failed")
+            raise DatabaseError("Database batch failed", original=e) from e
+
+    def is_unavailable_error(self, error: BaseException) -> bool:
+        if isinstance(
+            error,
+            (
+                asyncpg.PostgresConnectionError,
+                asyncpg.InterfaceError,
+                asyncpg.CannotConnectNowError,
+                asyncpg.TooManyConnectionsError,
+            ),
+        ):
+            return True
+        return super().is_unavailable_error(error)
+
+    async def _fetch(self, method: str, query: str, args: tuple, timeout: float | None, replica: bool):
+        """Run conn.<method> on the replica when allowed and usable, else on the primary."""
+        if replica:
+            replica_pool = await self._get_read_pool()
+            if replica_pool is not None:
+                try:
+                    async with self.acquire(replica_pool, self._replica_counters) as conn:
+                        return await getattr(conn, method)(query, *args, timeout=timeout)
+                except (
+                    asyncpg.PostgresConnectionError,
+                    asyncpg.InterfaceError,
+                    OSError,
+                    asyncio.TimeoutError,
+                    DatabaseError,
+                ) as e:
+                    self._mark_replica_unhealthy(e)
+                except asyncpg.PostgresError as e:
+                    logger.exception("Database fetch failed on replica: %s", query[:100])
+                    raise DatabaseError("Database fetch failed", original=e) from e
+        try:
+            async with self.acquire() as conn:
+                return await getattr(conn, method)(query, *args, timeout=timeout)
+        except asyncpg.PostgresError as e:
+            logger.exception("Database fetch failed: %s", query[:100])
+            raise DatabaseError("Database fetch failed", original=e) from e
+
+    async def fetchrow(self, query: str, args: tuple, timeout: float | None, replica: bool):
+        return await self._fetch("fetchrow", query, args, timeout, replica)
+
+    async def fetch(self, query: str, args: tuple, timeout: float | None, replica: bool) -> list:
+        return await self._fetch("fetch", query, args, timeout, replica)
+
+    # Schema and retention
+
+    async def stream(self, query: str, args: tuple, batch_size: int, replica: bool) -> AsyncIterator[list]:
+        """Server-side cursor in a read-only transaction; holds one connection until exhausted or closed."""
+        pool, counters = None, None
+        if replica:
+            replica_pool = await self._get_read_pool()
+            if replica_pool is not None:
+                pool, counters = replica_pool, self._replica_counters
+        try:
+            async with self.acquire(pool, counters) as conn:
+                async with conn.transaction(readonly=True):
+                    cursor = await conn.cursor(query, *args)
+                    while rows := await cursor.fetch(batch_size):
+                        yield rows
+        except asyncpg.PostgresError as e:
+            logger.exception("Database stream failed: %s", query[:100])
+            raise DatabaseError("Database stream failed", original=e) from e
+
+    async def init_schema(self) -> None:
+        tenant = current_tenant() if self.per_tenant_schemas else None
+        try:
+            async with self.acquire() as conn:
+                if tenant is not None:
+                    await conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{tenant.schema}"')
+                await conn.execute(_BASE_DDL)
+                for table, (column, ddl) in PARTITIONED_TABLES.items():
+                    relkind = await conn.fetchval(
+                        "SELECT relkind::text FROM pg_class WHERE oid = to_regclass($1)",
+                        table,
+                    )
+                    if relkind == "r":
+                        await _convert_to_partitioned(conn, table, column, ddl)
+                    else:
+                        await conn.execute(ddl)
+                        await conn.execute(
+                            f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+                        )
+                await _init_stats_counters(conn)
+        except asyncpg.PostgresError as e:
+            logger.exception("Failed to initialize database")
+            raise DatabaseError("Failed to initialize database", original=e) from e
+
+    @property
+    def schema_version(self) -> str:
+        return SCHEMA_VERSION
+
+    async def stored_schema_version(self) -> str | None:
+        try:
+            async with self.acquire() as conn:
+                return await conn.fetchval("SELECT value FROM bot_state WHERE key = $1", SCHEMA_VERSION_KEY)
+        except asyncpg.UndefinedTableError:
+            return None
+        except asyncpg.PostgresError as e:
+            logger.exception("Failed to read schema version")
+            raise DatabaseError("Failed to read schema version", original=e) from e
+
+    def utc_hour_sql(self, column: str) -> str:
+        return f"to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24')"
+
+    async def ensure_partitions(self, months_ahead: int) -> None:
+        """Create partitions from the current month up to months_ahead months in the future."""
+        this_month = add_months(datetime.now(timezone.utc).date(), 0)
+        wanted = {
+            _partition_name(table, add_months(this_month, offset)): (table, add_months(this_month, offset))
+            for table in PARTITIONED_TABLES
+            for offset in range(months_ahead + 1)
+        }
+        try:
+            async with self.acquire() as conn:
+                # One round trip in the common case where every partition already exists
+                existing = await conn.fetch(
+                    "SELECT name FROM unnest($1::text[]) AS name WHERE to_regclass(name) IS NOT NULL",
+                    list(wanted),
+                )
+                for name in wanted.keys() - {row["name"] for row in existing}:
+                    await _create_month_partition(conn, *wanted[name])
+        except asyncpg.PostgresError as e:
+            logger.exception("Failed to create partitions")
+            raise DatabaseError("Failed to create partitions", original=e) from e
+
+    async def apply_retention(self, retention_months: int, action: str) -> list[str]:
+        """
+        Detach (and drop, unless action == "detach") monthly partitions whose whole month is
+        older than retention_months. Returns the affected partition names.
+        """
+        cutoff = add_months(datetime.now(timezone.utc).date(), -retention_months)
+        removed = []
+        try:
+            async with self.acquire() as conn:
+                for table in PARTITIONED_TABLES:
+                    rows = await conn.fetch(
+                        """
+                        SELECT c.relname FROM pg_inherits i
+                        JOIN pg_class c ON c.oid = i.inhrelid
+                        JOIN pg_class p ON p.oid = i.inhparent
+                        WHERE p.relname = $1 AND p.relnamespace = current_schema()::regnamespace
+                        """,
+                        table,
+                    )
+                    prefix = f"{table}_p"
+                    for row in rows:
+                        name = row["relname"]
+                        suffix = name[len(prefix):] if name.startswith(prefix) else ""
+                        try:
+                            month = date(int(suffix[:4]), int(suffix[5:7]), 1)
+                        except ValueError:
+                            continue
+                        # Keep a partition while any part of its month is within retention
+                        if add_months(month, 1) > cutoff:
+                            continue
+                        await conn.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                        if action != "detach":
+                            await conn.execute(f"DROP TABLE {name}")
+                        removed.append(name)
+        except asyncpg.PostgresError as e:
+            logger.exception("Failed to apply partition retention")
+            raise DatabaseError("Failed to apply partition retention", original=e) from e
+        return removed
+
+    # Stats
+
+    def pool_stats(self, replica: bool = False) -> PoolStats | None:
+        pool = self._replica_pool if replica else self._pool
+        counters = self._replica_counters if replica else self._counters
+        if pool is None:
+            return None
+        size = pool.get_size()
+        idle = pool.get_idle_size()
+        acquires = counters.acquires
+        return PoolStats(
+            size=size,
+            min_size=pool.get_min_size(),
+            max_size=pool.get_max_size(),
+            in_use=size - idle,
+            idle=idle,
+            waiters=counters.waiters,
+            acquires=acquires,
+            acquire_timeouts=counters.timeouts,
+            avg_acquire_wait_ms=(counters.wait_total / acquires * 1000) if acquires else 0.0,
+            max_acquire_wait_ms=counters.wait_max * 1000,
+        )
+
+    def replica_status(self) -> dict | None:
+        if not self.replica_dsn:
+            return None
+        return {"healthy": self._replica_healthy, "lag_seconds": self._replica_lag}
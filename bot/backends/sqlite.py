@@ -0,0 +1,383 @@
+"""
+Embedded SQLite backend (aiosqlite, WAL) for small bots.
+Accepts the same PostgreSQL-dialect queries the services use: $N placeholders become ?N,
+casts are dropped, "= ANY($N)" becomes a json_each() lookup, "unnest($A, $B) AS t(x, y)" a join of
+two json_each() arrays, and NOW() is a registered function.
+Timestamps are stored as UTC text ("YYYY-MM-DD HH:MM:SS.mmm+00:00"), which sorts chronologically.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiosqlite
+
+from bot.backends.base import SCHEMA_VERSION_KEY, DatabaseBackend, add_months, ddl_fingerprint
+from bot.config import ROOT_DIR
+from bot.utils.exceptions import DatabaseError
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_PARAM_RE = re.compile(r"\$(\d+)")
+_CAST_RE = re.compile(r"::\w+(\[\])?")
+_ANY_RE = re.compile(r"=\s*ANY\(\s*\?(\d+)\s*\)", re.IGNORECASE)
+_UNNEST_RE = re.compile(
+    r"unnest\(\s*\?(\d+)\s*,\s*\?(\d+)\s*\)\s+AS\s+(\w+)\(\s*(\w+)\s*,\s*(\w+)\s*\)", re.IGNORECASE
+)
+
+_NOW_SQL = "(strftime('%Y-%m-%d %H:%M:%f+00:00', 'now'))"
+
+_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS admins (
+        user_id INTEGER PRIMARY KEY,
+        created_at TEXT DEFAULT {_NOW_SQL}
+    );
+
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        joined_at TEXT DEFAULT {_NOW_SQL},
+        updated_at TEXT DEFAULT {_NOW_SQL},
+        blocked BOOLEAN NOT NULL DEFAULT FALSE,
+        last_active_at TEXT
+    );
+    UPDATE users SET joined_at = COALESCE(updated_at, {_NOW_SQL}) WHERE joined_at IS NULL;
+    CREATE INDEX IF NOT EXISTS users_joined_at_idx ON users (joined_at DESC, user_id DESC);
+
+    CREATE TABLE IF NOT EXISTS bot_config (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at TEXT DEFAULT {_NOW_SQL}
+    );
+
+    -- Internal bookkeeping, kept out of the admin-editable bot_config
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at TEXT DEFAULT {_NOW_SQL}
+    );
+    DELETE FROM bot_config WHERE key = 'schema_version';
+    INSERT INTO bot_state (key, value, updated_at)
+        SELECT key, value, updated_at FROM bot_config WHERE key = 'update_high_water_mark'
+        ON CONFLICT (key) DO NOTHING;
+    DELETE FROM bot_config WHERE key = 'update_high_water_mark';
+
+    CREATE TABLE IF NOT EXISTS user_states (
+        user_id INTEGER PRIMARY KEY,
+        state TEXT,
+        updated_at TEXT DEFAULT {_NOW_SQL}
+    );
+
+    CREATE TABLE IF NOT EXISTS admin_states (
+        admin_id INTEGER PRIMARY KEY,
+        state TEXT,
+        updated_at TEXT DEFAULT {_NOW_SQL}
+    );
+
+    CREATE TABLE IF NOT EXISTS broadcast_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        broadcast_at TEXT NOT NULL DEFAULT {_NOW_SQL},
+        total_users INTEGER,
+        delivered INTEGER,
+        failed INTEGER,
+        blocked INTEGER,
+        message_type TEXT
+    );
+    CREATE INDEX IF NOT EXISTS broadcast_results_broadcast_at_idx ON broadcast_results (broadcast_at);
+
+    CREATE TABLE IF NOT EXISTS join_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        username TEXT,
+        dm_sent BOOLEAN,
+        error_message TEXT,
+        created_at TEXT NOT NULL DEFAULT {_NOW_SQL}
+    );
+    DROP INDEX IF EXISTS join_logs_created_at_idx;
+    CREATE INDEX IF NOT EXISTS join_logs_created_at_id_idx ON join_logs (created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS join_logs_failed_idx ON join_logs (created_at DESC, id DESC) WHERE dm_sent = FALSE;
+
+    -- Single writer, so one row per counter (no slots needed)
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT NOT NULL,
+        slot INTEGER NOT NULL DEFAULT 0,
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (name, slot)
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_hourly (
+        bucket TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, metric)
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        bucket TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, metric)
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_watermarks (
+        source TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0,
+        pending_id INTEGER NOT NULL DEFAULT 0,
+        run_token TEXT,
+        updated_at TEXT DEFAULT {_NOW_SQL}
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_rollup_gaps (
+        source TEXT NOT NULL,
+        lo INTEGER NOT NULL,
+        hi INTEGER NOT NULL,
+        run_token TEXT,
+        found_at TEXT NOT NULL DEFAULT {_NOW_SQL},
+        PRIMARY KEY (source, lo, hi)
+    );
+
+    CREATE TRIGGER IF NOT EXISTS stats_users_insert AFTER INSERT ON users BEGIN
+        INSERT INTO stats_counters (name, slot, value) VALUES ('users_total', 0, 1)
+            ON CONFLICT (name, slot) DO UPDATE SET value = value + 1;
+        INSERT INTO stats_counters (name, slot, value) SELECT 'users_reachable', 0, 1 WHERE NOT NEW.blocked
+            ON CONFLICT (name, slot) DO UPDATE SET value = value + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_users_delete AFTER DELETE ON users BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'users_total';
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'users_reachable' AND NOT OLD.blocked;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_users_blocked AFTER UPDATE OF blocked ON users
+    WHEN OLD.blocked IS NOT NEW.blocked BEGIN
+        INSERT INTO stats_counters (name, slot, value)
+            SELECT 'users_reachable', 0, CASE WHEN NEW.blocked THEN -1 ELSE 1 END WHERE TRUE
+            ON CONFLICT (name, slot) DO UPDATE SET value = value + excluded.value;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_join_logs_insert AFTER INSERT ON join_logs BEGIN
+        INSERT INTO stats_counters (name, slot, value) VALUES ('joins:' || substr(NEW.created_at, 1, 10), 0, 1)
+            ON CONFLICT (name, slot) DO UPDATE SET value = value + 1;
+    END;
+"""
+
+SCHEMA_VERSION = ddl_fingerprint(_SCHEMA)
+
+
+def _utc_now_text() -> str:
+    """Current UTC time in the same text format as the column defaults."""
+    return datetime.now(timezone.utc).isoformat(sep=" ", timespec="milliseconds")
+
+
+@lru_cache(maxsize=256)
+def translate_query(query: str) -> str:
+    """Rewrite a PostgreSQL-dialect query for SQLite."""
+    query = _PARAM_RE.sub(r"?\1", query)
+    query = _CAST_RE.sub("", query)
+    query = _UNNEST_RE.sub(
+        r"(SELECT a.value AS \4, b.value AS \5 FROM json_each(?\1) AS a JOIN json_each(?\2) AS b ON a.key = b.key) AS \3",
+        query,
+    )
+    return _ANY_RE.sub(r"IN (SELECT value FROM json_each(?\1))", query)
+
+
+def _adapt_arg(value):
+    """Lists go through json_each(); datetimes use the stored text format."""
+    if isinstance(value, (list, tuple)):
+        return json.dumps([_adapt_arg(v) for v in value])
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(sep=" ", timespec="milliseconds")
+    return value
+
+
+def _path_from_url(url: str) -> str:
+    """sqlite:///relative/path.db (relative to the project root), sqlite:////abs/path.db, sqlite:///:memory:"""
+    path = url.split("://", 1)[1] if "://" in url else url
+    if path.startswith("/"):
+        path = path[1:]
+    if not path or path == ":memory:":
+        return ":memory:"
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = ROOT_DIR / resolved
+    resolved.parent.mkdir(parents=True, exist_ok=True)
+    return str(resolved)
+
+
+class SQLiteBackend(DatabaseBackend):
+    """
+    One aiosqlite connection in WAL mode; statements autocommit. Writes take _write_lock, so
+    a statement from another coroutine can never land inside (and roll back with) a batch
+    transaction, and two batches never BEGIN on the shared connection at once.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, url: str) -> None:
+        self.path = _path_from_url(url)
+        self._conn: aiosqlite.Connection | None = None
+        self._conn_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        if self._conn is not None:
+            return self._conn
+        async with self._conn_lock:
+            if self._conn is not None:
+                return self._conn
+            try:
+                conn = await aiosqlite.connect(self.path, isolation_level=None)
+                conn.row_factory = sqlite3.Row
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                await conn.create_function("NOW", 0, _utc_now_text)
+            except (sqlite3.Error, OSError) as e:
+                logger.exception("Failed to open SQLite database %s", self.path)
+                raise DatabaseError("Failed to open database", original=e) from e
+            self._conn = conn
+            logger.info("SQLite database opened | %s", self.path)
+        return self._conn
+
+    async def connect(self) -> None:
+        await self._get_conn()
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+            logger.info("SQLite database closed")
+
+    async def execute(self, query: str, args: tuple, timeout: float | None) -> None:
+        conn = await self._get_conn()
+        try:
+            async with self._write_lock:
+                await conn.execute(translate_query(query), [_adapt_arg(a) for a in args])
+        except sqlite3.Error as e:
+            logger.exception("Database operation failed: %s", query[:100])
+            raise DatabaseError("Database operation failed", original=e) from e
+
+    async def execute_many(self, batches: list[tuple[str, list[tuple]]]) -> None:
+        conn = await self._get_conn()
+        try:
+            async with self._write_lock:
+                await conn.execute("BEGIN")
+                try:
+                    for query, rows in batches:
+                        await conn.executemany(
+                            translate_query(query),
+                            [[_adapt_arg(a) for a in row] for row in rows],
+                        )
+                except BaseException:
+                    await conn.execute("ROLLBACK")
+                    raise
+                await conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.exception("Database batch failed")
+            raise DatabaseError("Database batch failed", original=e) from e
+
+    async def fetchrow(self, query: str, args: tuple, timeout: float | None, replica: bool):
+        conn = await self._get_conn()
+        try:
+            async with conn.execute(translate_query(query), [_adapt_arg(a) for a in args]) as cur:
+                return await cur.fetchone()
+        except sqlite3.Error as e:
+            logger.exception("Database fetch failed: %s", query[:100])
+            raise DatabaseError("Database fetch failed", original=e) from e
+
+    async def fetch(self, query: str, args: tuple, timeout: float | None, replica: bool) -> list:
+        conn = await self._get_conn()
+        try:
+            async with conn.execute(translate_query(query), [_adapt_arg(a) for a in args]) as cur:
+                return list(await cur.fetchall())
+        except sqlite3.Error as e:
+            logger.exception("Database fetch failed: %s", query[:100])
+            raise DatabaseError("Database fetch failed", original=e) from e
+
+    async def stream(self, query: str, args: tuple, batch_size: int, replica: bool) -> AsyncIterator[list]:
+        conn = await self._get_conn()
+        try:
+            async with conn.execute(translate_query(query), [_adapt_arg(a) for a in args]) as cur:
+                while rows := await cur.fetchmany(batch_size):
+                    yield rows
+        except sqlite3.Error as e:
+            logger.exception("Database stream failed: %s", query[:100])
+            raise DatabaseError("Database stream failed", original=e) from e
+
+    async def init_schema(self) -> None:
+        conn = await self._get_conn()
+        try:
+            async with self._write_lock:
+                await conn.executescript(_SCHEMA)
+                # Columns added after the first release (CREATE TABLE IF NOT EXISTS skips existing tables)
+                async with conn.execute("SELECT 1 FROM pragma_table_info('users') WHERE name = 'last_active_at'") as cur:
+                    has_last_active = await cur.fetchone()
+                if not has_last_active:
+                    await conn.execute("ALTER TABLE users ADD COLUMN last_active_at TEXT")
+                async with conn.execute("SELECT 1 FROM stats_counters WHERE name = 'users_total'") as cur:
+                    seeded = await cur.fetchone()
+                if not seeded:
+                    await conn.execute(
+                        """
+                        INSERT INTO stats_counters (name, slot, value)
+                        SELECT 'users_total', 0, COUNT(*) FROM users
+                        UNION ALL
+                        SELECT 'users_reachable', 0, COUNT(*) FROM users WHERE NOT blocked
+                        UNION ALL
+                        SELECT 'joins:' || substr(?1, 1, 10), 0, COUNT(*) FROM join_logs
+                        WHERE created_at >= substr(?1, 1, 10)
+                        """,
+                        [_utc_now_text()],
+                    )
+        except sqlite3.Error as e:
+            logger.exception("Failed to initialize database")
+            raise DatabaseError("Failed to initialize database", original=e) from e
+
+    @property
+    def schema_version(self) -> str:
+        return SCHEMA_VERSION
+
+    async def stored_schema_version(self) -> str | None:
+        conn = await self._get_conn()
+        try:
+            async with conn.execute("SELECT value FROM bot_state WHERE key = ?", [SCHEMA_VERSION_KEY]) as cur:
+                row = await cur.fetchone()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return None
+            logger.exception("Failed to read schema version")
+            raise DatabaseError("Failed to read schema version", original=e) from e
+        return row[0] if row else None
+
+    def utc_hour_sql(self, column: str) -> str:
+        return f"substr({column}, 1, 13)"
+
+    async def ensure_partitions(self, months_ahead: int) -> None:
+        """SQLite tables are not partitioned; nothing to prepare."""
+
+    async def apply_retention(self, retention_months: int, action: str) -> list[str]:
+        """Delete log rows older than the retention window (small tables, plain DELETE)."""
+        cutoff = add_months(datetime.now(timezone.utc).date(), -retention_months).isoformat()
+        conn = await self._get_conn()
+        removed = []
+        try:
+            async with self._write_lock:
+                for table, column in (("join_logs", "created_at"), ("broadcast_results", "broadcast_at")):
+                    cur = await conn.execute(f"DELETE FROM {table} WHERE {column} < ?", [cutoff])
+                    if cur.rowcount:
+                        removed.append(f"{table} ({cur.rowcount} rows)")
+                    await cur.close()
+        except sqlite3.Error as e:
+            logger.exception("Failed to apply log retention")
+            raise DatabaseError("Failed to apply log retention", original=e) from e
+        return removed
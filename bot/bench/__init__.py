@@ -0,0 +1,6 @@
+"""
+Benchmarks that run the bot's real handlers and services against a local fake Bot API
+and a local database, so throughput can be measured without touching Telegram.
+
+Nothing in this package is imported by the bot itself. See `python -m bot.bench --help`.
+"""
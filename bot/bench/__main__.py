@@ -0,0 +1,136 @@
+"""
+Run the benchmarks against a local fake Bot API.
+
+Usage:
+    python -m bot.bench [--scenarios broadcast,joins,start] [--users 200] [--updates 1000]
+                        [--latency-ms 30] [--jitter-ms 10] [--retry-after-ratio 0] [--forbidden-ratio 0.05]
+                        [--database-url sqlite:///:memory:] [--save-baseline | --check] [--tolerance 0.2]
+
+The database given by --database-url receives synthetic users and logs; never point it at production.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+from bot.bench.env import BENCH_TOKEN, configure_environment
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bot.bench", description="Benchmark the bot against a fake Bot API.")
+    parser.add_argument("--scenarios", default="broadcast,joins,start", help="comma-separated: broadcast, joins, start")
+    parser.add_argument("--users", type=int, default=200, help="broadcast recipients")
+    parser.add_argument("--updates", type=int, default=1000, help="updates per join burst / /start storm")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="fake API response time")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="+/- random variation of the response time")
+    parser.add_argument("--retry-after-ratio", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after-seconds", type=int, default=1)
+    parser.add_argument("--forbidden-ratio", type=float, default=0.05, help="share of users who blocked the bot")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--broadcast-delay", type=float, help="override BROADCAST_DELAY_SECONDS")
+    parser.add_argument("--database-url", default="sqlite:///:memory:", help="scratch database (never production)")
+    parser.add_argument("--log-level", default="CRITICAL", help="bot log level during the run (blocked users log errors)")
+    parser.add_argument("--baseline", type=Path, help="baseline file (default: bench_baseline.json in the project root)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if results regress against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, 0.2 = 20%%")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace, names: list[str]) -> list:
+    from bot.bench.fake_api import FakeApiConfig, FakeBotApi
+    from bot.bench.harness import build_bench_application
+    from bot.bench.scenarios import SCENARIOS, BenchContext
+    from bot.database import close_pool, init_db
+
+    api = FakeBotApi(
+        FakeApiConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            retry_after_ratio=args.retry_after_ratio,
+            retry_after_seconds=args.retry_after_seconds,
+            forbidden_ratio=args.forbidden_ratio,
+            seed=args.seed,
+        )
+    )
+    await init_db()
+    await api.start()
+    application, request = build_bench_application(api, BENCH_TOKEN)
+    results = []
+    try:
+        await application.initialize()
+        await application.start()
+        ctx = BenchContext(api, application, request)
+        for name in names:
+            count = args.users if name == "broadcast" else args.updates
+            results.append(await SCENARIOS[name](ctx, count))
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        await api.stop()
+        await close_pool()
+    return results
+
+
+def main() -> int:
+    args = _parse_args()
+    overrides = {}
+    if args.broadcast_delay is not None:
+        overrides["BROADCAST_DELAY_SECONDS"] = str(args.broadcast_delay)
+    configure_environment(args.database_url, args.log_level, **overrides)
+
+    from bot.bench.harness import compare_to_baseline, format_results, load_baseline, save_baseline
+    from bot.bench.scenarios import SCENARIOS
+    from bot.config import BROADCAST_DELAY_SECONDS, ROOT_DIR, UPDATE_CONCURRENCY
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})", file=sys.stderr)
+        return 2
+
+    results = asyncio.run(_run(args, names))
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+    baseline_path = args.baseline or ROOT_DIR / "bench_baseline.json"
+    settings = {
+        "users": args.users,
+        "updates": args.updates,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "retry_after_ratio": args.retry_after_ratio,
+        "forbidden_ratio": args.forbidden_ratio,
+        "broadcast_delay_seconds": BROADCAST_DELAY_SECONDS,
+        "update_concurrency": UPDATE_CONCURRENCY,
+        "database": args.database_url.split(":", 1)[0],
+    }
+    if args.save_baseline:
+        save_baseline(baseline_path, results, settings)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not args.check:
+        return 0
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        print(f"No baseline at {baseline_path}; run with --save-baseline first", file=sys.stderr)
+        return 2
+    if baseline.get("settings") != settings:
+        print("Warning: settings differ from the baseline's, comparison may be meaningless", file=sys.stderr)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1
+    print(f"No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
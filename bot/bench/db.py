@@ -0,0 +1,319 @@
+"""
+Service-layer database micro-benchmarks at realistic table sizes (PostgreSQL only).
+Seeds a scratch database with synthetic users and join logs (once; later runs reuse them),
+then for each service function that runs on the update path measures:
+- single-call latency (calls one after another)
+- sustained calls per second at --concurrency
+- the plan of every query it issues: rows scanned and scan types, from EXPLAIN ANALYZE
+  (writes are explained inside a rolled-back transaction)
+
+Usage:
+    python -m bot.bench.db --database-url postgresql://.../bench_scratch [--users 1000000] [--logs 10000000]
+                           [--concurrency 16] [--duration 5] [--save-baseline | --check] [--tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from bot.bench.env import configure_environment
+
+SEED_BATCH = 500_000
+SEED_LOG_MONTHS = 6
+SINGLE_CALLS = 200
+HEAVY_SINGLE_CALLS = 3
+
+
+@dataclass
+class ServiceBench:
+    """One service call to time. heavy=True: few single calls, no sustained run (e.g. loads every user)."""
+
+    name: str
+    call: Callable[[random.Random], Awaitable[Any]]
+    heavy: bool = False
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bot.bench.db", description="Time service-layer queries.")
+    parser.add_argument("--database-url", required=True, help="scratch PostgreSQL database (never production)")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--logs", type=int, default=10_000_000, help="join_logs rows, spread over 6 months")
+    parser.add_argument("--skip-seed", action="store_true", help="use the data already in the database")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per sustained run")
+    parser.add_argument("--only", help="comma-separated function names to run")
+    parser.add_argument("--include-heavy", action="store_true", help="also time get_all_user_ids (loads every user)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--baseline", type=Path, help="default: bench_db_baseline.json in the project root")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args()
+
+
+def _service_benches(users: int) -> list[ServiceBench]:
+    from bot.bench.scenarios import FIRST_USER_ID
+    from bot.services import config_service, log_service, state_service, user_service
+
+    def user(rng: random.Random) -> int:
+        return FIRST_USER_ID + rng.randrange(users)
+
+    return [
+        ServiceBench("is_admin", lambda rng: user_service.is_admin(user(rng))),
+        ServiceBench("get_user", lambda rng: user_service.get_user(user(rng))),
+        ServiceBench(
+            "upsert_user",
+            lambda rng: user_service.upsert_user(user(rng), "bench", "Bench", None),
+        ),
+        ServiceBench("get_user_count", lambda rng: user_service.get_user_count()),
+        ServiceBench("get_user_stats", lambda rng: user_service.get_user_stats()),
+        ServiceBench("get_users_page", lambda rng: user_service.get_users_page(10)),
+        ServiceBench("get_all_admin_ids", lambda rng: user_service.get_all_admin_ids()),
+        ServiceBench("get_config_value", lambda rng: config_service.get_config_value("auto_accept_enabled")),
+        ServiceBench("get_all_config", lambda rng: config_service.get_all_config()),
+        ServiceBench("get_user_state", lambda rng: state_service.get_user_state(user(rng))),
+        ServiceBench("set_user_state", lambda rng: state_service.set_user_state(user(rng), None)),
+        ServiceBench("get_admin_state", lambda rng: state_service.get_admin_state(user(rng))),
+        ServiceBench("log_join", lambda rng: log_service.log_join(user(rng), "bench", True, None)),
+        ServiceBench("get_logs_page", lambda rng: log_service.get_logs_page(10)),
+        ServiceBench("get_logs_page_failed", lambda rng: log_service.get_logs_page(10, failed_only=True)),
+        ServiceBench("get_all_user_ids", lambda rng: user_service.get_all_user_ids(), heavy=True),
+    ]
+
+
+async def _seed(users: int, logs: int) -> None:
+    """Top the synthetic users and join logs up to the requested counts."""
+    from bot.backends.base import add_months
+    from bot.backends.postgres import create_partitions_for_range
+    from bot.bench.scenarios import FIRST_USER_ID
+    from bot.database import get_backend
+
+    backend = get_backend()
+    async with backend.acquire() as conn:
+        have_users = await conn.fetchval("SELECT COUNT(*) FROM users WHERE user_id >= $1", FIRST_USER_ID)
+        started = time.perf_counter()
+        for first in range(have_users, users, SEED_BATCH):
+            last = min(first + SEED_BATCH, users) - 1
+            await conn.execute(
+                """
+                INSERT INTO users (user_id, username, first_name, joined_at, updated_at, blocked)
+                SELECT $1 + g, 'user' || g, 'User', NOW() - (g % 365) * INTERVAL '1 day', NOW(), g % 50 = 0
+                FROM generate_series($2::bigint, $3::bigint) AS g
+                ON CONFLICT (user_id) DO NOTHING
+                """,
+                FIRST_USER_ID,
+                first,
+                last,
+            )
+            print(f"  users: {last + 1}/{users} ({time.perf_counter() - started:.0f} s)", file=sys.stderr)
+
+        today = date.today().replace(day=1)
+        await create_partitions_for_range(conn, "join_logs", add_months(today, -SEED_LOG_MONTHS), today)
+        have_logs = await conn.fetchval("SELECT COUNT(*) FROM join_logs WHERE user_id >= $1", FIRST_USER_ID)
+        span_seconds = int(timedelta(days=30 * SEED_LOG_MONTHS).total_seconds())
+        for first in range(have_logs, logs, SEED_BATCH):
+            last = min(first + SEED_BATCH, logs) - 1
+            await conn.execute(
+                """
+                INSERT INTO join_logs (user_id, username, dm_sent, error_message, created_at)
+                SELECT $1 + (g % $4), 'user' || (g % $4), g % 20 <> 0,
+                       CASE WHEN g % 20 = 0 THEN 'Forbidden: bot was blocked by the user' END,
+                       NOW() - ((g * 7919) % $5) * INTERVAL '1 second'
+                FROM generate_series($2::bigint, $3::bigint) AS g
+                """,
+                FIRST_USER_ID,
+                first,
+                last,
+                max(users, 1),
+                span_seconds,
+            )
+            print(f"  join_logs: {last + 1}/{logs} ({time.perf_counter() - started:.0f} s)", file=sys.stderr)
+        await conn.execute("ANALYZE users")
+        await conn.execute("ANALYZE join_logs")
+
+
+class _QueryRecorder:
+    """Wraps the backend's query methods to remember the statements one service call issues."""
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.queries: list[tuple[str, tuple]] = []
+        self.recording = False
+        for method in ("execute", "fetchrow", "fetch"):
+            setattr(backend, method, self._wrap(getattr(backend, method)))
+
+    def _wrap(self, original):
+        async def wrapper(query, args, *rest):
+            if self.recording:
+                self.queries.append((query, args))
+            return await original(query, args, *rest)
+
+        return wrapper
+
+
+def _plan_summary(plan: dict) -> tuple[int, list[str]]:
+    """(rows read by scan nodes, "Index Scan on users" style descriptions) for one EXPLAIN plan."""
+    rows = 0
+    scans: list[str] = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        node_type = node.get("Node Type", "")
+        if "Scan" in node_type:
+            loops = node.get("Actual Loops", 1) or 1
+            rows += int((node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * loops)
+            target = node.get("Index Name") or node.get("Relation Name") or ""
+            scans.append(f"{node_type} {target}".strip())
+        stack.extend(node.get("Plans", []))
+    return rows, scans
+
+
+async def _explain(queries: list[tuple[str, tuple]]) -> tuple[int, list[str]]:
+    from bot.database import get_backend
+
+    rows = 0
+    scans: list[str] = []
+    async with get_backend().acquire() as conn:
+        for query, args in queries:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                result = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", *args)
+            finally:
+                await transaction.rollback()
+            plan = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+            query_rows, query_scans = _plan_summary(plan)
+            rows += query_rows
+            scans.extend(query_scans)
+    return rows, scans
+
+
+async def _sustained(bench: ServiceBench, concurrency: int, duration: float, seed: int) -> tuple[int, list[float]]:
+    calls = 0
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        nonlocal calls
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await bench.call(rng)
+            latencies.append(time.perf_counter() - started)
+            calls += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return calls, latencies
+
+
+async def _run(args: argparse.Namespace) -> list:
+    from bot.bench.harness import make_result, percentile
+    from bot.database import close_pool, get_backend, init_db
+
+    await init_db()
+    try:
+        if not args.skip_seed:
+            print("Seeding (first run only; later runs top up)...", file=sys.stderr)
+            await _seed(args.users, args.logs)
+        recorder = _QueryRecorder(get_backend())
+        benches = _service_benches(args.users)
+        if args.only:
+            wanted = {name.strip() for name in args.only.split(",")}
+            benches = [b for b in benches if b.name in wanted]
+        elif not args.include_heavy:
+            benches = [b for b in benches if not b.heavy]
+
+        results = []
+        rng = random.Random(args.seed)
+        for bench in benches:
+            # Warm the statement cache and pool, and record the statements for EXPLAIN
+            recorder.queries.clear()
+            recorder.recording = True
+            await bench.call(rng)
+            recorder.recording = False
+            rows_scanned, scans = await _explain(list(recorder.queries))
+
+            single: list[float] = []
+            for _ in range(HEAVY_SINGLE_CALLS if bench.heavy else SINGLE_CALLS):
+                started = time.perf_counter()
+                await bench.call(rng)
+                single.append(time.perf_counter() - started)
+
+            if bench.heavy:
+                result = make_result(bench.name, single, sum(single))
+            else:
+                calls, sustained = await _sustained(bench, args.concurrency, args.duration, args.seed)
+                result = make_result(bench.name, single, args.duration, operations=calls)
+                result.extra["sustained_p99_ms"] = round(percentile(sustained, 99) * 1000, 2)
+            result.extra["queries"] = len(recorder.queries)
+            result.extra["rows_scanned"] = rows_scanned
+            result.extra["scans"] = "; ".join(dict.fromkeys(scans)) or "-"
+            print(f"  {bench.name} done", file=sys.stderr)
+            results.append(result)
+        return results
+    finally:
+        await close_pool()
+
+
+def main() -> int:
+    args = _parse_args()
+    if not args.database_url.startswith(("postgresql://", "postgres://")):
+        print("bot.bench.db needs a PostgreSQL --database-url", file=sys.stderr)
+        return 2
+    configure_environment(args.database_url, args.log_level)
+    from bot.bench.harness import compare_to_baseline, format_results, load_baseline, save_baseline
+    from bot.config import DB_POOL_MAX_SIZE, ROOT_DIR
+
+    results = asyncio.run(_run(args))
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print("Latencies are single calls; ops/s is sustained at the given concurrency.")
+        print(format_results(results))
+
+    baseline_path = args.baseline or ROOT_DIR / "bench_db_baseline.json"
+    settings = {
+        "users": args.users,
+        "logs": args.logs,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "pool_max_size": DB_POOL_MAX_SIZE,
+    }
+    if args.save_baseline:
+        save_baseline(baseline_path, results, settings)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not args.check:
+        return 0
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        print(f"No baseline at {baseline_path}; run with --save-baseline first", file=sys.stderr)
+        return 2
+    if baseline.get("settings") != settings:
+        print("Warning: settings differ from the baseline's, comparison may be meaningless", file=sys.stderr)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for result in results:
+        old = baseline.get("results", {}).get(result.scenario)
+        if old and result.extra["rows_scanned"] > old["extra"].get("rows_scanned", 0) * (1 + args.tolerance) + 100:
+            regressions.append(
+                f"{result.scenario}: rows scanned {result.extra['rows_scanned']} "
+                f"vs baseline {old['extra'].get('rows_scanned')}"
+            )
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1
+    print(f"No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""
+Environment for benchmark runs. Kept free of bot imports: it must run before anything
+reads bot.config, and .env never overrides values that are already set.
+"""
+
+import os
+
+BENCH_TOKEN = "100000001:bench-token-not-used-by-telegram"
+
+
+def configure_environment(database_url: str, log_level: str, **overrides: str) -> None:
+    """Point the bot at a scratch database and the fake API token; never at production."""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    os.environ["TELEGRAM_BOT_TOKEN"] = BENCH_TOKEN
+    os.environ["LOG_LEVEL"] = log_level
+    os.environ["SUPERADMIN_ID"] = ""
+    # Not capturing the benchmark's own synthetic traffic
+    os.environ["UPDATE_CAPTURE_FILE"] = ""
+    os.environ.update(overrides)
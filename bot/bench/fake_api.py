@@ -0,0 +1,173 @@
+"""
+Local stand-in for the Telegram Bot API, for benchmarks.
+Answers every method with a plausible result after a configurable delay, and injects
+429 Too Many Requests (RetryAfter) and 403 Forbidden (bot blocked) at configurable ratios.
+Point the bot at it with ApplicationBuilder().base_url(server.base_url).
+"""
+
+import asyncio
+import collections
+import contextlib
+import json
+import random
+import time
+import zlib
+from dataclasses import dataclass
+from urllib.parse import parse_qsl
+
+_BLOCKED_DESCRIPTION = "Forbidden: bot was blocked by the user"
+
+
+@dataclass
+class FakeApiConfig:
+    """How the fake API behaves."""
+
+    latency_ms: float = 30.0
+    jitter_ms: float = 10.0
+    # Share of requests answered with 429 (any method)
+    retry_after_ratio: float = 0.0
+    retry_after_seconds: int = 1
+    # Share of chats that blocked the bot; sends to them always get 403
+    forbidden_ratio: float = 0.0
+    seed: int = 1
+
+
+class FakeBotApi:
+    """Minimal HTTP/1.1 server speaking enough of the Bot API for the bot's handlers."""
+
+    def __init__(self, config: FakeApiConfig, listen: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config
+        self.listen = listen
+        self.port = port
+        self.requests: collections.Counter = collections.Counter()
+        self.retry_afters = 0
+        self.forbidden = 0
+        self._random = random.Random(config.seed)
+        self._message_id = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    @property
+    def base_url(self) -> str:
+        """Value for ApplicationBuilder.base_url (the token and method are appended)."""
+        return f"http://{self.listen}:{self.port}/bot"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def reset_counts(self) -> None:
+        self.requests.clear()
+        self.retry_afters = 0
+        self.forbidden = 0
+
+    def is_blocked(self, chat_id: int) -> bool:
+        """Stable per chat, so a user who blocked the bot stays blocked across calls."""
+        return zlib.crc32(str(chat_id).encode()) % 10_000 < self.config.forbidden_ratio * 10_000
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, target, _ = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._answer(target.rsplit("/", 1)[-1], headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} X\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    def _parameters(self, headers: dict, body: bytes) -> dict:
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("application/json"):
+            return json.loads(body or b"{}")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            return dict(parse_qsl(body.decode()))
+        # Multipart uploads: the benchmarks only send file_ids, so the fields are not needed
+        return {}
+
+    async def _answer(self, method: str, headers: dict, body: bytes) -> tuple[int, dict]:
+        self.requests[method] += 1
+        config = self.config
+        delay = config.latency_ms + self._random.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        params = self._parameters(headers, body)
+
+        if config.retry_after_ratio and self._random.random() < config.retry_after_ratio:
+            self.retry_afters += 1
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {config.retry_after_seconds}",
+                "parameters": {"retry_after": config.retry_after_seconds},
+            }
+        chat_id = params.get("chat_id")
+        if method.startswith(("send", "copy")) and chat_id is not None and self.is_blocked(chat_id):
+            self.forbidden += 1
+            return 403, {"ok": False, "error_code": 403, "description": _BLOCKED_DESCRIPTION}
+        return 200, {"ok": True, "result": self._result(method, params)}
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return {
+                "id": 100000001,
+                "is_bot": True,
+                "first_name": "Bench",
+                "username": "bench_bot",
+                "can_join_groups": True,
+                "can_read_all_group_messages": False,
+                "supports_inline_queries": False,
+            }
+        if method == "getWebhookInfo":
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        self._message_id += 1
+        if method == "copyMessage":
+            return {"message_id": self._message_id}
+        if method.startswith(("send", "edit")):
+            chat_id = int(params.get("chat_id") or 0)
+            message = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+            }
+            if "text" in params:
+                message["text"] = params["text"]
+            return message
+        return True
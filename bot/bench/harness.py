@@ -0,0 +1,247 @@
+"""
+Benchmark plumbing: the bot's Application wired to the fake Bot API, synthetic updates,
+percentiles, and comparison against a stored baseline.
+"""
+
+import asyncio
+import collections
+import json
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder
+
+from bot.bench.fake_api import FakeBotApi
+from bot.main import register_handlers
+from bot.updates import get_update_queue, get_update_processor
+from bot.utils.metrics import InstrumentedRequest
+
+BENCH_CHAT_ID = -1001000000001
+
+_update_ids = iter(range(1, 1 << 62))
+_message_ids = iter(range(1, 1 << 62))
+
+
+@dataclass
+class BenchResult:
+    """One scenario's numbers. Latencies in milliseconds, throughput in operations per second."""
+
+    scenario: str
+    operations: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100); 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(max(rank - 1, 0), len(ordered) - 1)]
+
+
+def make_result(
+    scenario: str,
+    latencies: list[float],
+    seconds: float,
+    operations: int | None = None,
+    **extra: Any,
+) -> BenchResult:
+    """Build a result from latencies in seconds; operations defaults to one per latency."""
+    if operations is None:
+        operations = len(latencies)
+    return BenchResult(
+        scenario=scenario,
+        operations=operations,
+        seconds=round(seconds, 3),
+        throughput=round(operations / seconds, 1) if seconds > 0 else 0.0,
+        p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 99) * 1000, 2),
+        extra=extra,
+    )
+
+
+class RecordingRequest(InstrumentedRequest):
+    """The bot's request layer, additionally keeping every call's duration per API method."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.durations: dict[str, list[float]] = collections.defaultdict(list)
+
+    async def post(self, url: str, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().post(url, *args, **kwargs)
+        finally:
+            self.durations[url.rsplit("/", 1)[-1]].append(time.perf_counter() - started)
+
+
+def build_bench_application(api: FakeBotApi, token: str) -> tuple[Application, RecordingRequest]:
+    """The production handlers, update queue and processor, talking to the fake API."""
+    request = RecordingRequest(connection_pool_size=256)
+    application = (
+        ApplicationBuilder()
+        .token(token)
+        .base_url(api.base_url)
+        .request(request)
+        .update_queue(get_update_queue())
+        .concurrent_updates(get_update_processor())
+        .updater(None)
+        .build()
+    )
+    register_handlers(application)
+    return application, request
+
+
+def next_update_id() -> int:
+    """Fresh, increasing update_id (the update queue drops ids it has already seen)."""
+    return next(_update_ids)
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+def make_join_request(application: Application, user_id: int, chat_id: int = BENCH_CHAT_ID) -> Update:
+    return Update.de_json(
+        {
+            "update_id": next_update_id(),
+            "chat_join_request": {
+                "chat": {"id": chat_id, "type": "channel", "title": "Bench channel"},
+                "from": _user(user_id),
+                "user_chat_id": user_id,
+                "date": int(time.time()),
+            },
+        },
+        application.bot,
+    )
+
+
+def make_message(application: Application, user_id: int, text: str) -> Update:
+    message = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return Update.de_json({"update_id": next_update_id(), "message": message}, application.bot)
+
+
+def make_callback_query(application: Application, user_id: int, data: str) -> Update:
+    """An inline button press on a message the bot sent to user_id."""
+    return Update.de_json(
+        {
+            "update_id": next_update_id(),
+            "callback_query": {
+                "id": str(next(_message_ids)),
+                "from": _user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": next(_message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "Admin panel",
+                },
+            },
+        },
+        application.bot,
+    )
+
+
+async def feed_updates(application: Application, updates: Iterable[Update]) -> list[float]:
+    """
+    Put updates on the Application's queue (waiting when it is full, like the webhook/poller would)
+    and return each update's time from enqueue until its handler finished, in seconds.
+    """
+    queue = application.update_queue
+    updates = list(updates)
+    enqueued: dict[int, float] = {}
+    latencies: list[float] = []
+    done = asyncio.Event()
+    complete = queue.complete
+
+    def record_complete(update_id: int) -> None:
+        complete(update_id)
+        started = enqueued.pop(update_id, None)
+        if started is not None:
+            latencies.append(time.perf_counter() - started)
+            if len(latencies) == len(updates):
+                done.set()
+
+    queue.complete = record_complete
+    try:
+        for update in updates:
+            enqueued[update.update_id] = time.perf_counter()
+            await queue.put(update)
+        if updates:
+            await done.wait()
+    finally:
+        del queue.complete
+    return latencies
+
+
+def load_baseline(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(path: Path, results: list[BenchResult], settings: dict) -> None:
+    path.write_text(
+        json.dumps(
+            {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "settings": settings,
+                "results": {r.scenario: asdict(r) for r in results},
+            },
+            indent=2,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+
+
+def compare_to_baseline(results: list[BenchResult], baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regressions against the baseline: throughput lower, or p95 latency higher, by more than
+    `tolerance` (0.2 = 20%). Scenarios missing from the baseline are skipped.
+    """
+    regressions = []
+    for result in results:
+        old = baseline.get("results", {}).get(result.scenario)
+        if not old:
+            continue
+        if old["throughput"] and result.throughput < old["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result.scenario}: throughput {result.throughput}/s vs baseline {old['throughput']}/s"
+            )
+        if old["p95_ms"] and result.p95_ms > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result.scenario}: p95 {result.p95_ms} ms vs baseline {old['p95_ms']} ms")
+    return regressions
+
+
+def format_results(results: list[BenchResult]) -> str:
+    lines = [f"{'scenario':<18} {'ops':>7} {'seconds':>8} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    for r in results:
+        lines.append(
+            f"{r.scenario:<18} {r.operations:>7} {r.seconds:>8.2f} {r.throughput:>9.1f} "
+            f"{r.p50_ms:>8.1f} {r.p95_ms:>8.1f} {r.p99_ms:>8.1f}"
+        )
+        if r.extra:
+            lines.append("    " + ", ".join(f"{k}={v}" for k, v in r.extra.items()))
+    return "\n".join(lines)
@@ -0,0 +1,219 @@
+"""
+End-to-end load generator: synthetic or replayed updates go through the update processor and
+Application.process_update (the same path as live traffic, minus the network) against a local
+database and the fake Bot API. Reports handler throughput and latency per update kind,
+database queries per update and event loop lag.
+
+Usage:
+    python -m bot.bench.load [--updates 5000] [--users 1000] [--mix join=40,start=25,message=30,callback=5]
+    python -m bot.bench.load --replay captured.jsonl [--speed 1]
+
+Replay files are what UPDATE_CAPTURE_FILE records (anonymized), or one update JSON object per line.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Iterator
+
+from bot.bench.env import BENCH_TOKEN, configure_environment
+
+DEFAULT_MIX = "join=40,start=25,message=30,callback=5"
+# Read-only admin panel screens; never toggles, broadcasts or stops the bot
+ADMIN_CALLBACKS = ("view_users", "view_logs", "view_db_pool", "view_update_queue", "bot_config", "back_to_admin")
+MESSAGE_TEXTS = ("hi", "hello", "how do I join?", "👋", "is this the right channel?", "thanks")
+LAG_INTERVAL = 0.01
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bot.bench.load", description="Replay update streams end to end.")
+    parser.add_argument("--updates", type=int, default=5000, help="synthetic updates to generate")
+    parser.add_argument("--users", type=int, default=1000, help="distinct synthetic users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights of join, start, message, callback")
+    parser.add_argument("--replay", type=Path, help="replay a captured JSONL file instead of synthetic updates")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay pacing: 1 = captured timing, 0 = as fast as possible")
+    parser.add_argument("--inflight", type=int, default=100, help="updates handed to the dispatcher at once")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="fake Bot API response time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default="sqlite:///:memory:", help="scratch database (never production)")
+    parser.add_argument("--log-level", default="CRITICAL")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return parser.parse_args()
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("join", "start", "message", "callback"):
+            raise ValueError(f"Unknown update kind in mix: {name}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("Mix has no positive weights")
+    return mix
+
+
+def synthetic_updates(application, count: int, users: int, mix: dict[str, float], seed: int) -> Iterator[tuple[float, Any]]:
+    """(offset seconds, Update) pairs; offsets are 0, synthetic traffic is sent as fast as allowed."""
+    from bot.bench.harness import make_callback_query, make_join_request, make_message
+    from bot.bench.scenarios import FIRST_USER_ID
+
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    admin_id = FIRST_USER_ID - 1
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        user_id = FIRST_USER_ID + rng.randrange(users)
+        if kind == "join":
+            yield 0.0, make_join_request(application, user_id)
+        elif kind == "start":
+            yield 0.0, make_message(application, user_id, "/start")
+        elif kind == "message":
+            yield 0.0, make_message(application, user_id, rng.choice(MESSAGE_TEXTS))
+        else:
+            yield 0.0, make_callback_query(application, admin_id, rng.choice(ADMIN_CALLBACKS))
+
+
+def replayed_updates(application, path: Path) -> Iterator[tuple[float, Any]]:
+    """(offset seconds since the first update, Update) pairs from a capture file, with fresh update_ids."""
+    from telegram import Update
+
+    from bot.bench.harness import next_update_id
+
+    first_ts = None
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            data = entry.get("update", entry)
+            ts = entry.get("ts", 0.0)
+            if first_ts is None:
+                first_ts = ts
+            # The queue and processor dedupe by update_id; captured ids may already be "seen"
+            data["update_id"] = next_update_id()
+            yield ts - first_ts, Update.de_json(data, application.bot)
+
+
+def update_kind_label(update) -> str:
+    from bot.updates import update_kind
+
+    kind = update_kind(update)
+    if kind == "message" and update.message.text and update.message.text.startswith("/"):
+        return update.message.text.split()[0].split("@")[0]
+    return kind
+
+
+async def _measure_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(time.perf_counter() - started - LAG_INTERVAL, 0.0))
+
+
+async def _run(args: argparse.Namespace) -> list:
+    from bot.bench.fake_api import FakeApiConfig, FakeBotApi
+    from bot.bench.harness import build_bench_application, make_result, percentile
+    from bot.bench.scenarios import FIRST_USER_ID
+    from bot.database import close_pool, init_db
+    from bot.services.user_service import add_admin
+    from bot.utils.metrics import DB_QUERY_LATENCY
+
+    api = FakeBotApi(FakeApiConfig(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 3, seed=args.seed))
+    await init_db()
+    await add_admin(FIRST_USER_ID - 1)
+    await api.start()
+    application, _ = build_bench_application(api, BENCH_TOKEN)
+    processor = application.update_processor
+    latencies: dict[str, list[float]] = {}
+    lags: list[float] = []
+    try:
+        await application.initialize()
+        if args.replay:
+            source = replayed_updates(application, args.replay)
+        else:
+            source = synthetic_updates(application, args.updates, args.users, parse_mix(args.mix), args.seed)
+
+        slots = asyncio.Semaphore(args.inflight)
+        tasks: set[asyncio.Task] = set()
+
+        async def handle(update) -> None:
+            started = time.perf_counter()
+            try:
+                await processor.process_update(update, application.process_update(update))
+            finally:
+                latencies.setdefault(update_kind_label(update), []).append(time.perf_counter() - started)
+                slots.release()
+
+        stop_lag = asyncio.Event()
+        lag_task = asyncio.create_task(_measure_loop_lag(lags, stop_lag))
+        queries_before = DB_QUERY_LATENCY.total_count()
+        started = time.perf_counter()
+        for offset, update in source:
+            if args.speed > 0:
+                delay = offset / args.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await slots.acquire()
+            task = asyncio.create_task(handle(update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        queries = DB_QUERY_LATENCY.total_count() - queries_before
+        stop_lag.set()
+        await lag_task
+    finally:
+        await application.shutdown()
+        await api.stop()
+        await close_pool()
+
+    total = [value for values in latencies.values() for value in values]
+    results = [
+        make_result(
+            "all",
+            total,
+            elapsed,
+            db_queries_per_update=round(queries / len(total), 2) if total else 0,
+            api_calls_per_update=round(sum(api.requests.values()) / len(total), 2) if total else 0,
+            loop_lag_p50_ms=round(percentile(lags, 50) * 1000, 2),
+            loop_lag_p99_ms=round(percentile(lags, 99) * 1000, 2),
+            loop_lag_max_ms=round(max(lags, default=0.0) * 1000, 2),
+        )
+    ]
+    for kind, values in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        results.append(make_result(kind, values, elapsed))
+    return results
+
+
+def main() -> int:
+    args = _parse_args()
+    configure_environment(args.database_url, args.log_level)
+    from bot.bench.harness import format_results
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.replay and not args.replay.exists():
+        print(f"No such file: {args.replay}", file=sys.stderr)
+        return 2
+    results = asyncio.run(_run(args))
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark scenarios. Each runs the production code path against the fake Bot API and
+returns a BenchResult:
+- broadcast: broadcast_to_users to N users; latency per sendMessage call, throughput in messages/s
+- joins:     a burst of N chat join requests through the update queue and handlers
+- start:     a storm of N /start commands from different users
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from telegram import Message
+from telegram.ext import Application
+
+from bot.bench.fake_api import FakeBotApi
+from bot.bench.harness import (
+    BenchResult,
+    RecordingRequest,
+    feed_updates,
+    make_join_request,
+    make_message,
+    make_result,
+)
+from bot.services.broadcast_service import broadcast_to_users
+
+# Synthetic user ids start here so they never collide with real ids in a copied database
+FIRST_USER_ID = 7_000_000_000
+
+
+@dataclass
+class BenchContext:
+    api: FakeBotApi
+    application: Application
+    request: RecordingRequest
+
+    def reset(self) -> None:
+        self.api.reset_counts()
+        self.request.durations.clear()
+
+    def api_calls(self) -> int:
+        return sum(self.api.requests.values())
+
+
+async def broadcast(ctx: BenchContext, count: int) -> BenchResult:
+    ctx.reset()
+    message = Message.de_json(
+        {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": FIRST_USER_ID, "type": "private"},
+            "text": "Benchmark broadcast",
+        },
+        ctx.application.bot,
+    )
+    user_ids = list(range(FIRST_USER_ID, FIRST_USER_ID + count))
+    started = time.perf_counter()
+    result = await broadcast_to_users(ctx.application.bot, user_ids, message)
+    elapsed = time.perf_counter() - started
+    return make_result(
+        "broadcast",
+        ctx.request.durations["sendMessage"],
+        elapsed,
+        operations=count,
+        delivered=result.delivered,
+        blocked=result.blocked,
+        failed=result.failed,
+        retry_after=ctx.api.retry_afters,
+    )
+
+
+async def join_burst(ctx: BenchContext, count: int) -> BenchResult:
+    ctx.reset()
+    updates = [make_join_request(ctx.application, FIRST_USER_ID + i) for i in range(count)]
+    started = time.perf_counter()
+    latencies = await feed_updates(ctx.application, updates)
+    elapsed = time.perf_counter() - started
+    return make_result(
+        "joins",
+        latencies,
+        elapsed,
+        api_calls_per_update=round(ctx.api_calls() / count, 2),
+        retry_after=ctx.api.retry_afters,
+        forbidden=ctx.api.forbidden,
+    )
+
+
+async def start_storm(ctx: BenchContext, count: int) -> BenchResult:
+    ctx.reset()
+    updates = [make_message(ctx.application, FIRST_USER_ID + i, "/start") for i in range(count)]
+    started = time.perf_counter()
+    latencies = await feed_updates(ctx.application, updates)
+    elapsed = time.perf_counter() - started
+    return make_result(
+        "start",
+        latencies,
+        elapsed,
+        api_calls_per_update=round(ctx.api_calls() / count, 2),
+        retry_after=ctx.api.retry_afters,
+        forbidden=ctx.api.forbidden,
+    )
+
+
+SCENARIOS: dict[str, Callable[[BenchContext, int], Awaitable[BenchResult]]] = {
+    "broadcast": broadcast,
+    "joins": join_burst,
+    "start": start_storm,
+}
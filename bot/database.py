@@ -1,156 +1,406 @@
 """
-PostgreSQL database connection and query wrapper.
+Database access - thin wrapper over the configured backend.
 All DB operations must be wrapped with error handling.
 Raises DatabaseError on failure - never crashes the event loop.
+
+The backend is chosen by DATABASE_URL scheme:
+- postgresql:// (default) - asyncpg pool, optional DATABASE_REPLICA_URL for replica=True reads
+- sqlite:///path.db - embedded SQLite (WAL), for small bots and local testing
+Queries are written in PostgreSQL dialect ($1 placeholders); the SQLite backend translates them.
+
+A circuit breaker guards every query: while the database is unreachable calls fail fast with
+DatabaseUnavailableError, and writes marked spool=True are appended to a local spool file and
+replayed in chunked transactions once the database recovers.
+
+When several bots share the process (bot.multi) they share one PostgreSQL pool; every
+query runs with search_path set to the current tenant's schema.
 """
 
-import asyncpg
-from asyncpg import Pool
+import asyncio
+import time
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
 
-from bot.config import DATABASE_URL
-from bot.utils.exceptions import DatabaseError
+from bot.backends.base import DatabaseBackend, PoolStats
+from bot.config import (
+    DATABASE_URL,
+    DATABASE_REPLICA_URL,
+    DB_BREAKER_FAILURE_THRESHOLD,
+    DB_BREAKER_RESET_SECONDS,
+    DB_SPOOL_FILE,
+    PARTITION_PREMAKE_MONTHS,
+    PARTITION_RETENTION_MONTHS,
+    PARTITION_RETENTION_ACTION,
+)
+from bot.tenants import TenantLocal, current_tenant, tenant_context
+from bot.utils.alerts import alert_all_tenants
+from bot.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from bot.utils.exceptions import DatabaseBusyError, DatabaseError, DatabaseUnavailableError
 from bot.utils.logger import get_logger
+from bot.utils.metrics import DB_ERRORS, DB_QUERY_LATENCY, GaugeFunc
+from bot.utils.tracing import span
+from bot.utils.write_spool import WriteSpool
 
 logger = get_logger(__name__)
 
-_pool: Pool | None = None
+_backend: DatabaseBackend | None = None
+_background_tasks: set[asyncio.Task] = set()
+# Per-schema multi-tenant mode (bot.multi): one shared pool, search_path set per tenant
+_per_tenant_schemas = False
 
 
-async def get_pool() -> Pool:
-    """Get or create the connection pool."""
-    global _pool
-    if _pool is None:
-        try:
-            _pool = await asyncpg.create_pool(
-                DATABASE_URL,
-                min_size=1,
-                max_size=10,
-                command_timeout=60,
-            )
-            logger.info("Database pool created")
-        except Exception as e:
-            logger.exception("Failed to create database pool")
-            msg = "Failed to connect to database"
-            if isinstance(e, OSError) and "Name or service not known" in str(e):
-                msg += ". Check DATABASE_URL in .env: use localhost if PostgreSQL is on this server, or a valid hostname for remote DB."
-            raise DatabaseError(msg, original=e) from e
-    return _pool
+def _tenant_spool() -> WriteSpool:
+    """Spool file of the current tenant (spooled writes must replay into the right schema)."""
+    tenant = current_tenant()
+    path = Path(DB_SPOOL_FILE)
+    return WriteSpool(path.with_name(f"{path.stem}.{tenant.name}{path.suffix}") if tenant else path)
+
+
+_spools: TenantLocal[WriteSpool] = TenantLocal(_tenant_spool)
+_replay_locks: TenantLocal[asyncio.Lock] = TenantLocal(asyncio.Lock)
+
+
+def _on_recover() -> None:
+    """Breaker closed again: replay spooled writes (of every tenant) in the background."""
+    loop = asyncio.get_running_loop()
+    for tenant, spool in _spools.items():
+        if spool.pending:
+            with tenant_context(tenant):
+                task = loop.create_task(replay_spool())
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+
+def _on_breaker_state(state: str, error: Exception | None) -> None:
+    """Alert the superadmins when the database goes down, is probed and comes back."""
+    if state == OPEN:
+        text = (
+            f"🚨 Database unavailable\n\n"
+            f"Calls fail fast and join-path writes are spooled; next probe in {DB_BREAKER_RESET_SECONDS:.0f}s.\n"
+            f"Error: {str(error)[:200]}"
+        )
+    elif state == HALF_OPEN:
+        text = "⚠️ Database still unavailable, probing whether it is back"
+    elif state == CLOSED:
+        text = "✅ Database reachable again; any spooled writes are being replayed"
+    else:
+        return
+    alert_all_tenants(("CircuitBreaker", "database", state), text)
+
+
+_breaker = CircuitBreaker(
+    "database",
+    failure_threshold=DB_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=DB_BREAKER_RESET_SECONDS,
+    on_recover=_on_recover,
+    on_state_change=_on_breaker_state,
+)
+
+
+def _pool_gauge(field: str) -> Callable[[], int | None]:
+    def read() -> int | None:
+        stats = get_pool_stats()
+        return getattr(stats, field) if stats is not None else None
+    return read
+
+
+GaugeFunc("bot_db_pool_connections", "Open primary pool connections.", _pool_gauge("size"))
+GaugeFunc("bot_db_pool_in_use", "Primary pool connections checked out.", _pool_gauge("in_use"))
+GaugeFunc("bot_db_pool_waiters", "Callers waiting for a primary pool connection.", _pool_gauge("waiters"))
+GaugeFunc(
+    "bot_db_breaker_open",
+    "1 while the database circuit breaker is not closed.",
+    lambda: int(_breaker.state != "closed"),
+)
+GaugeFunc(
+    "bot_db_spooled_writes",
+    "Writes waiting in the local spool.",
+    lambda: sum(spool.pending for spool in _spools.values()),
+)
+
+
+def _create_backend(url: str) -> DatabaseBackend:
+    """Build the backend for a DATABASE_URL."""
+    scheme = url.split("://", 1)[0].lower() if "://" in url else ""
+    if scheme in ("sqlite", "sqlite3"):
+        from bot.backends.sqlite import SQLiteBackend
+        return SQLiteBackend(url)
+    if scheme in ("postgres", "postgresql"):
+        from bot.backends.postgres import PostgresBackend
+        return PostgresBackend(url, DATABASE_REPLICA_URL, per_tenant_schemas=_per_tenant_schemas)
+    raise DatabaseError(
+        f"Unsupported DATABASE_URL scheme '{scheme}'. Use postgresql:// or sqlite:///path/to/bot.db"
+    )
+
+
+def enable_tenant_schemas() -> None:
+    """
+    Serve several tenants from one PostgreSQL pool, each in its own schema
+    (called by the multi-bot runner before the first query).
+    """
+    global _per_tenant_schemas
+    if _backend is not None:
+        raise DatabaseError("enable_tenant_schemas() must be called before the backend is created")
+    if not DATABASE_URL.lower().startswith(("postgres://", "postgresql://")):
+        raise DatabaseError("Several bots in one process need a postgresql:// DATABASE_URL")
+    _per_tenant_schemas = True
+
+
+def get_backend() -> DatabaseBackend:
+    """Get or create the configured backend."""
+    global _backend
+    if _backend is None:
+        _backend = _create_backend(DATABASE_URL)
+        logger.info("Database backend: %s", _backend.name)
+    return _backend
+
+
+async def warm_pool() -> None:
+    """
+    Open connections up front (called from post_init),
+    so the first updates after a restart don't pay for connection setup and TLS.
+    """
+    backend = get_backend()
+    started = time.perf_counter()
+    await backend.connect()
+    logger.info(
+        "Database ready in %.0f ms | %s",
+        (time.perf_counter() - started) * 1000,
+        format_pool_stats(get_pool_stats()),
+    )
 
 
 async def close_pool() -> None:
-    """Close the connection pool."""
-    global _pool
-    if _pool:
-        await _pool.close()
-        _pool = None
-        logger.info("Database pool closed")
+    """Close database connections."""
+    global _backend
+    if _backend is not None:
+        if _backend.pool_stats() is not None:
+            logger.info("Database pool stats at shutdown | %s", format_pool_stats(get_pool_stats()))
+        await _backend.close()
+        _backend = None
+
+
+def get_pool_stats(replica: bool = False) -> PoolStats | None:
+    """Live pool statistics, or None if there is no pool (not created yet, or SQLite)."""
+    if _backend is None:
+        return None
+    return _backend.pool_stats(replica=replica)
+
+
+def get_replica_status() -> dict | None:
+    """Replica routing state for admin display, or None when no replica is configured."""
+    if _backend is None:
+        return None
+    return _backend.replica_status()
+
+
+def format_pool_stats(stats: PoolStats | None) -> str:
+    """One-line pool stats for logs."""
+    if stats is None:
+        return "no pool"
+    return (
+        f"size={stats.size}/{stats.max_size} in_use={stats.in_use} idle={stats.idle} "
+        f"waiters={stats.waiters} acquires={stats.acquires} timeouts={stats.acquire_timeouts} "
+        f"avg_wait={stats.avg_acquire_wait_ms:.1f}ms max_wait={stats.max_acquire_wait_ms:.1f}ms"
+    )
+
+
+_QUERY_LATENCY = {op: DB_QUERY_LATENCY.labels(op) for op in ("execute", "execute_many", "fetchrow", "fetch")}
+_ERRORS = {kind: DB_ERRORS.labels(kind) for kind in ("unavailable", "busy", "query", "rejected")}
+
+
+async def _guarded(operation: str, call: Callable[[], Awaitable], query: str = ""):
+    """
+    Run a backend call through the circuit breaker, timing it under `operation`
+    (and as a trace span carrying the query text).
+    Connection failures and timeouts count against the breaker and surface as
+    DatabaseUnavailableError; query errors mean the database is reachable and pass through.
+    A saturated pool (DatabaseBusyError) passes through without a verdict either way.
+    """
+    if not _breaker.allow():
+        _ERRORS["rejected"].inc()
+        raise DatabaseUnavailableError(
+            f"Database unavailable, retrying in {_breaker.retry_in():.0f}s"
+        )
+    backend = get_backend()
+    started = time.perf_counter()
+    try:
+        with span(f"db.{operation}", sql=query):
+            result = await call()
+    except DatabaseBusyError:
+        _ERRORS["busy"].inc()
+        raise
+    except Exception as e:
+        if backend.is_unavailable_error(e):
+            _ERRORS["unavailable"].inc()
+            _breaker.record_failure(e)
+            if isinstance(e, DatabaseUnavailableError):
+                raise
+            raise DatabaseUnavailableError("Database unavailable", original=e) from e
+        _ERRORS["query"].inc()
+        _breaker.record_success()
+        raise
+    finally:
+        _breaker.release()
+        _QUERY_LATENCY[operation].observe(time.perf_counter() - started)
+    _breaker.record_success()
+    return result
 
 
 async def execute_query(
     query: str,
     *args,
     timeout: float | None = None,
+    spool: bool = False,
 ) -> str | None:
     """
     Execute a query that returns nothing (INSERT/UPDATE/DELETE).
-    Raises DatabaseError on failure.
+    Always runs on the primary. Raises DatabaseError on failure.
+    spool=True marks an idempotent-enough write that may be deferred: while the database is
+    unavailable it is appended to the local spool instead of raising.
     """
-    pool = await get_pool()
     try:
-        async with pool.acquire() as conn:
-            await conn.execute(query, *args, timeout=timeout)
-        return None
-    except asyncpg.PostgresError as e:
-        logger.exception("Database operation failed: %s", query[:100])
-        raise DatabaseError("Database operation failed", original=e) from e
+        await _guarded("execute", lambda: get_backend().execute(query, args, timeout), query)
+    except DatabaseUnavailableError:
+        if not spool:
+            raise
+        try:
+            _spools.get().append(query, args)
+        except (OSError, TypeError) as e:
+            logger.exception("Failed to spool database write: %s", query[:100])
+            raise DatabaseUnavailableError("Database unavailable and spool failed", original=e) from e
+    return None
+
+
+async def execute_batch(batches: list[tuple[str, list[tuple]]]) -> None:
+    """
+    Run each (query, rows) batch with executemany, all in one transaction on the primary.
+    Raises DatabaseError on failure; nothing is spooled.
+    """
+    await _guarded("execute_many", lambda: get_backend().execute_many(batches), batches[0][0] if batches else "")
 
 
-async def fetch_one(query: str, *args, timeout: float | None = None):
+async def fetch_one(query: str, *args, timeout: float | None = None, replica: bool = False):
     """
     Execute a query and return a single row.
-    Raises DatabaseError on failure.
+    replica=True marks the read as safe to serve from the read replica.
+    Raises DatabaseError on failure (DatabaseUnavailableError when the database is down).
     """
-    pool = await get_pool()
-    try:
-        async with pool.acquire() as conn:
-            return await conn.fetchrow(query, *args, timeout=timeout)
-    except asyncpg.PostgresError as e:
-        logger.exception("Database fetch failed: %s", query[:100])
-        raise DatabaseError("Database fetch failed", original=e) from e
+    return await _guarded("fetchrow", lambda: get_backend().fetchrow(query, args, timeout, replica), query)
 
 
-async def fetch_all(query: str, *args, timeout: float | None = None):
+async def fetch_all(query: str, *args, timeout: float | None = None, replica: bool = False):
     """
     Execute a query and return all rows.
-    Raises DatabaseError on failure.
+    replica=True marks the read as safe to serve from the read replica.
+    Raises DatabaseError on failure (DatabaseUnavailableError when the database is down).
+    """
+    return await _guarded("fetch", lambda: get_backend().fetch(query, args, timeout, replica), query)
+
+
+async def stream_all(query: str, *args, batch_size: int = 1000, replica: bool = False) -> AsyncIterator[list]:
     """
-    pool = await get_pool()
+    Execute a query and yield its rows in lists of up to batch_size, read through a cursor, so
+    memory stays bounded however many rows match. Holds one connection until the iteration
+    ends - close it (contextlib.aclosing) if you stop early.
+    replica=True marks the read as safe to serve from the read replica.
+    Raises DatabaseError on failure (DatabaseUnavailableError when the database is down).
+    """
+    if not _breaker.allow():
+        _ERRORS["rejected"].inc()
+        raise DatabaseUnavailableError(
+            f"Database unavailable, retrying in {_breaker.retry_in():.0f}s"
+        )
+    backend = get_backend()
     try:
-        async with pool.acquire() as conn:
-            return await conn.fetch(query, *args, timeout=timeout)
-    except asyncpg.PostgresError as e:
-        logger.exception("Database fetch failed: %s", query[:100])
-        raise DatabaseError("Database fetch failed", original=e) from e
+        async for rows in backend.stream(query, args, batch_size, replica):
+            yield rows
+    except DatabaseBusyError:
+        _ERRORS["busy"].inc()
+        raise
+    except Exception as e:
+        if backend.is_unavailable_error(e):
+            _ERRORS["unavailable"].inc()
+            _breaker.record_failure(e)
+            raise DatabaseUnavailableError("Database unavailable", original=e) from e
+        _ERRORS["query"].inc()
+        _breaker.record_success()
+        raise
+    finally:
+        _breaker.release()
+    _breaker.record_success()
+
+
+async def replay_spool() -> int:
+    """Replay spooled writes in chunked transactions. Returns how many were applied."""
+    replay_lock = _replay_locks.get()
+    if replay_lock.locked():
+        return 0
+    async with replay_lock:
+        try:
+            return await _spools.get().replay(
+                lambda batches: _guarded("execute_many", lambda: get_backend().execute_many(batches))
+            )
+        except DatabaseError as e:
+            logger.error("Spool replay failed, will retry after recovery | %s", e)
+            return 0
+
+
+def get_db_health() -> dict:
+    """Circuit breaker state and spooled/rejected write counts for admin display."""
+    spool = _spools.get()
+    return {
+        "state": _breaker.state,
+        "consecutive_failures": _breaker.failures,
+        "retry_in": _breaker.retry_in(),
+        "spooled_writes": spool.pending,
+        "failed_writes": spool.failed,
+    }
+
+
+async def ensure_partitions(months_ahead: int = PARTITION_PREMAKE_MONTHS) -> None:
+    """Create join_logs/broadcast_results partitions up to months_ahead months in the future."""
+    await get_backend().ensure_partitions(months_ahead)
+
+
+async def drop_expired_partitions(
+    retention_months: int = PARTITION_RETENTION_MONTHS,
+    action: str = PARTITION_RETENTION_ACTION,
+) -> list[str]:
+    """
+    Remove join/broadcast log months older than retention_months (0 keeps everything).
+    PostgreSQL detaches (and drops, unless action == "detach") whole partitions.
+    """
+    if retention_months <= 0:
+        return []
+    removed = await get_backend().apply_retention(retention_months, action)
+    if removed:
+        logger.info(
+            "Log retention | %s %s",
+            "detached" if action == "detach" else "dropped",
+            ", ".join(removed),
+        )
+    return removed
+
+
+async def maintain_partitions() -> None:
+    """Scheduled job body: premake future partitions, then apply retention."""
+    await ensure_partitions()
+    await drop_expired_partitions()
 
 
 async def init_db() -> None:
-    """Create tables if they do not exist."""
-    pool = await get_pool()
-    try:
-        async with pool.acquire() as conn:
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS admins (
-                    user_id BIGINT PRIMARY KEY,
-                    created_at TIMESTAMPTZ DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id BIGINT PRIMARY KEY,
-                    username VARCHAR(255),
-                    first_name VARCHAR(255),
-                    last_name VARCHAR(255),
-                    joined_at TIMESTAMPTZ DEFAULT NOW(),
-                    updated_at TIMESTAMPTZ DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS bot_config (
-                    key VARCHAR(100) PRIMARY KEY,
-                    value TEXT,
-                    updated_at TIMESTAMPTZ DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS user_states (
-                    user_id BIGINT PRIMARY KEY,
-                    state VARCHAR(50),
-                    updated_at TIMESTAMPTZ DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS admin_states (
-                    admin_id BIGINT PRIMARY KEY,
-                    state VARCHAR(50),
-                    updated_at TIMESTAMPTZ DEFAULT NOW()
-                );
-
-                CREATE TABLE IF NOT EXISTS broadcast_results (
-                    id SERIAL PRIMARY KEY,
-                    broadcast_at TIMESTAMPTZ DEFAULT NOW(),
-                    total_users INT,
-                    delivered INT,
-                    failed INT,
-                    blocked INT,
-                    message_type VARCHAR(50)
-                );
-
-                CREATE TABLE IF NOT EXISTS join_logs (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT,
-                    username VARCHAR(255),
-                    dm_sent BOOLEAN,
-                    error_message TEXT,
-                    created_at TIMESTAMPTZ DEFAULT NOW()
-                );
-            """)
-        logger.info("Database tables initialized")
-    except asyncpg.PostgresError as e:
-        logger.exception("Failed to initialize database")
-        raise DatabaseError("Failed to initialize database", original=e) from e
+    """
+    Create tables if they do not exist. The DDL is skipped when the schema version stored by
+    the last successful run matches this code's, so a plain restart only checks the version
+    and that the premade partitions exist.
+    """
+    backend = get_backend()
+    if await backend.stored_schema_version() == backend.schema_version:
+        await backend.ensure_partitions(PARTITION_PREMAKE_MONTHS)
+        logger.info("Database schema is current (%s)", backend.schema_version)
+        return
+    await backend.init_schema()
+    await backend.ensure_partitions(PARTITION_PREMAKE_MONTHS)
+    await backend.store_schema_version()
+    logger.info("Database tables initialized (schema %s)", backend.schema_version)
@@ -6,6 +6,8 @@ from telegram.ext import ContextTypes
 from bot.handlers.callbacks import show_admin_panel_from_query
 from bot.keyboards.admin import admin_panel_keyboard
 from bot.services.user_service import is_admin
+from bot.tenants import get_superadmin_id
+from bot.utils.exceptions import ValidationError
 from bot.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -61,3 +63,38 @@ async def show_chat_id_command(update: Update, context: ContextTypes.DEFAULT_TYP
         f"{username_info}",
         parse_mode="Markdown",
     )
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /profile [seconds] - superadmin only: CPU and memory profile of the running bot."""
+    user = update.effective_user
+    if not user or not update.message:
+        return
+    superadmin_id = get_superadmin_id()
+    if not superadmin_id or user.id != superadmin_id:
+        await update.message.reply_text("❌ Access denied. Only the superadmin can profile the bot.")
+        return
+
+    from bot.utils.profiler import MAX_SECONDS, format_profile_report, run_profile
+
+    try:
+        seconds = int(context.args[0]) if context.args else 30
+    except ValueError:
+        await update.message.reply_text(f"❌ Usage: /profile [seconds] (1-{MAX_SECONDS})")
+        return
+
+    async def _profile_and_report() -> None:
+        try:
+            report = await run_profile(seconds)
+        except ValidationError as e:
+            await context.bot.send_message(user.id, f"❌ {e}")
+            return
+        except Exception as e:
+            logger.exception("Profiling failed: %s", e)
+            await context.bot.send_message(user.id, "❌ Profiling failed, see the log.")
+            return
+        await context.bot.send_message(user.id, format_profile_report(report))
+
+    await update.message.reply_text(f"⏱ Profiling for {seconds} s, the summary will follow...")
+    # Run outside the handler so the superadmin's other updates are not held up meanwhile
+    context.application.create_task(_profile_and_report(), update=update)
@@ -4,16 +4,21 @@ import json
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from bot.keyboards.admin import admin_panel_keyboard, back_to_admin_keyboard
+from bot.database import get_backend, get_db_health, get_pool_stats, get_replica_status, format_pool_stats
+from bot.handlers.export import EXPORT_USAGE, days_range, start_export
+from bot.keyboards.admin import admin_panel_keyboard, back_to_admin_keyboard, export_keyboard, pager_keyboard
 from bot.services.config_service import get_config_value, get_all_config, set_config_value
-from bot.services.user_service import is_admin, get_user_count, get_recent_users
+from bot.services.user_service import is_admin, get_user_stats, get_users_page
 from bot.services.state_service import get_admin_state, set_admin_state
-from bot.services.log_service import get_recent_logs
+from bot.services.log_service import get_logs_page
+from bot.services.stats_service import get_stats_trends
 from bot.services.broadcast_service import broadcast_to_users, BroadcastResult
 from bot.services.welcome_service import send_welcome, _parse_welcome_buttons
+from bot.updates import get_dispatch_stats, format_dispatch_stats
 from bot.utils.maintenance import check_maintenance
 from bot.utils.exceptions import WelcomeBuilderError
 from bot.utils.logger import get_logger
+from bot.utils.pagination import NEWER, OLDER, PageCursor
 
 logger = get_logger(__name__)
 
@@ -67,10 +72,23 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             "📡 **Send Message to All Users**\n\n"
             "Send the message (text, photo, video, etc.) to broadcast."
         )
-    elif data == "view_users":
-        await _show_user_stats(query)
-    elif data == "view_logs":
-        await _show_logs(query)
+    elif data == "view_users" or data.startswith("users:"):
+        await _show_user_stats(query, data)
+    elif data in ("view_logs", "view_failed_logs") or data.startswith("logs:"):
+        await _show_logs(query, data)
+    elif data == "view_trends":
+        await _show_trends(query)
+    elif data == "export_menu":
+        await query.edit_message_text(
+            "📤 **Export Data**\n\nPick a preset, or for other date ranges send:\n" + EXPORT_USAGE,
+            reply_markup=export_keyboard(),
+        )
+    elif data.startswith("export:"):
+        await _start_export(query, context, data)
+    elif data == "view_db_pool":
+        await _show_db_pool(query)
+    elif data == "view_update_queue":
+        await _show_update_queue(query)
     elif data == "stop_bot":
         await query.edit_message_text(
             "🛑 **Stop Bot**\n\nRestart the process to stop.",
@@ -180,37 +198,192 @@ async def _toggle_auto_accept(query) -> None:
     )
 
 
-async def _show_user_stats(query) -> None:
-    total = await get_user_count()
-    recent = await get_recent_users(5)
+PAGE_SIZE = 10
+
+
+def _page_position(parts: list[str]) -> tuple[PageCursor | None, str]:
+    """[direction, cursor] from callback data; anything malformed means the first page."""
+    if len(parts) == 2 and parts[0] in (OLDER, NEWER):
+        try:
+            return PageCursor.decode(parts[1]), parts[0]
+        except ValueError:
+            pass
+    return None, OLDER
+
+
+def _short_time(value) -> str:
+    """MM-DD HH:MM (UTC) from a datetime or the SQLite text timestamp."""
+    if hasattr(value, "strftime"):
+        return value.strftime("%m-%d %H:%M")
+    return str(value)[5:16] if value else "?"
+
+
+async def _show_user_stats(query, data: str) -> None:
+    """User counters plus a page of users, newest joins first (callback data users:<dir>:<cursor>)."""
+    cursor, direction = _page_position(data.split(":")[1:])
+    stats = await get_user_stats()
+    page = await get_users_page(PAGE_SIZE, cursor, direction)
     lines = []
-    for u in recent:
+    for u in page.rows:
         un = f"@{u['username']}" if u.get("username") else "No username"
-        lines.append(f"• {un} ({u.get('first_name', '')})")
+        blocked = " 🚫" if u.get("blocked") else ""
+        lines.append(f"• {un} ({u.get('first_name') or ''}) · {_short_time(u.get('joined_at'))}{blocked}")
     text = (
         f"👥 **User Statistics**\n\n"
-        f"📊 **Total Users:** {total}\n\n"
-        f"**Recent Users:**\n" + ("\n".join(lines) if lines else "No users yet")
+        f"📊 **Total Users:** {stats['total_users']}\n"
+        f"📬 **Reachable Users:** {stats['reachable_users']}\n"
+        f"📥 **Joins Today (UTC):** {stats['joins_today']}\n\n"
+        f"**Users (newest first):**\n" + ("\n".join(lines) if lines else "No users here")
+    )
+    await query.edit_message_text(
+        text,
+        reply_markup=pager_keyboard(
+            f"users:{NEWER}:{page.newer.encode()}" if page.newer else None,
+            f"users:{OLDER}:{page.older.encode()}" if page.older else None,
+        ),
     )
-    await query.edit_message_text(text, reply_markup=back_to_admin_keyboard())
 
 
-async def _show_logs(query) -> None:
-    logs = await get_recent_logs(10)
-    if not logs:
-        await query.edit_message_text(
-            "📑 **No Logs Available**\n\nNo activity logged yet.",
-            reply_markup=back_to_admin_keyboard(),
-        )
+async def _show_logs(query, data: str) -> None:
+    """A page of join logs, newest first (callback data logs:<a|f>:<dir>:<cursor>; f = failed DMs only)."""
+    parts = data.split(":")
+    failed_only = data == "view_failed_logs" or parts[1:2] == ["f"]
+    cursor, direction = _page_position(parts[2:])
+    page = await get_logs_page(PAGE_SIZE, cursor, direction, failed_only=failed_only)
+    mode = "f" if failed_only else "a"
+    toggle = [[
+        InlineKeyboardButton("📑 All Logs", callback_data="view_logs")
+        if failed_only
+        else InlineKeyboardButton("❌ Failed Welcomes Only", callback_data="view_failed_logs")
+    ]]
+    keyboard = pager_keyboard(
+        f"logs:{mode}:{NEWER}:{page.newer.encode()}" if page.newer else None,
+        f"logs:{mode}:{OLDER}:{page.older.encode()}" if page.older else None,
+        toggle,
+    )
+    title = "❌ **Failed Welcomes**" if failed_only else "📑 **Recent Logs**"
+    if not page.rows:
+        await query.edit_message_text(f"{title}\n\nNo activity logged here.", reply_markup=keyboard)
         return
     lines = []
-    for log in logs:
+    for log in page.rows:
         status = "✅" if log.get("dm_sent") else "❌"
-        err = f" ({log.get('error_message', '')})" if not log.get("dm_sent") else ""
+        err = f" ({(log.get('error_message') or '')[:120]})" if not log.get("dm_sent") else ""
         lines.append(
-            f"• @{log.get('username', '')} (ID: {log.get('user_id')}) - {status}{err}"
+            f"• {_short_time(log.get('created_at'))} @{log.get('username', '')} (ID: {log.get('user_id')}) - {status}{err}"
         )
-    text = "📑 **Recent Logs**\n\n" + "\n".join(lines)
+    text = f"{title}\n\n" + "\n".join(lines)
     if len(text) > 4000:
         text = text[:4000] + "\n\n... (truncated)"
+    await query.edit_message_text(text, reply_markup=keyboard)
+
+
+async def _start_export(query, context: ContextTypes.DEFAULT_TYPE, data: str) -> None:
+    """export:<table>:<format>:<days> preset from the export keyboard."""
+    try:
+        _, table, fmt, days = data.split(":")
+        since, until = days_range(int(days))
+    except ValueError:
+        return
+    await query.edit_message_text("⏳ Exporting, the file will follow...", reply_markup=back_to_admin_keyboard())
+    start_export(context, query.message.chat_id, table, fmt, since, until)
+
+
+def _percent(part: int, whole: int) -> str:
+    return f"{part * 100 / whole:.1f}%" if whole else "–"
+
+
+async def _show_trends(query) -> None:
+    """Show joins, welcome DM success and broadcast blocked rates from the stats rollups."""
+    trends = await get_stats_trends(7)
+    last_24h = trends["last_24h"]
+    joins = last_24h.get("joins", 0)
+    lines = [
+        "📈 **Trends** (UTC)\n",
+        "**Last 24 hours**",
+        f"📥 Joins: {joins}",
+        f"✉️ Welcome DM delivered: {_percent(last_24h.get('dm_sent', 0), joins)}",
+        f"📡 Broadcasts: {last_24h.get('broadcasts', 0)}",
+        "",
+        "**Per day:** joins · DM delivered · users",
+    ]
+    broadcast_lines = []
+    for day, metrics in trends["days"]:
+        day_joins = metrics.get("joins", 0)
+        lines.append(
+            f"• {day[5:]}: {day_joins} · {_percent(metrics.get('dm_sent', 0), day_joins)}"
+            f" · {metrics.get('users_total', '–')}"
+        )
+        if metrics.get("broadcasts"):
+            recipients = metrics.get("broadcast_recipients", 0)
+            broadcast_lines.append(
+                f"• {day[5:]}: {metrics['broadcasts']} to {recipients} users · "
+                f"{_percent(metrics.get('broadcast_delivered', 0), recipients)} delivered · "
+                f"{_percent(metrics.get('broadcast_blocked', 0), recipients)} blocked"
+            )
+    if not trends["days"]:
+        lines.append("No data yet")
+    if broadcast_lines:
+        lines += ["", "**Broadcasts per day**"] + broadcast_lines
+    if trends["updated_at"]:
+        lines += ["", f"🕒 Updated {str(trends['updated_at'])[:16]} UTC"]
+    await query.edit_message_text("\n".join(lines), reply_markup=back_to_admin_keyboard())
+
+
+async def _show_db_pool(query) -> None:
+    """Show live connection pool usage and circuit breaker state (also written to the log)."""
+    stats = get_pool_stats()
+    health = get_db_health()
+    logger.info("Database pool stats | %s | health=%s", format_pool_stats(stats), health)
+    if health["state"] == "closed":
+        status = "✅ Healthy"
+    else:
+        status = f"🚨 Unavailable ({health['state']}, retry in {health['retry_in']:.0f}s)"
+    header = (
+        f"🗄 **Database Pool**\n\n"
+        f"🩺 **Status:** {status}\n"
+        f"📥 **Spooled writes:** {health['spooled_writes']}\n"
+        f"🗑 **Rejected spooled writes:** {health['failed_writes']}\n\n"
+    )
+    if stats is None:
+        await query.edit_message_text(
+            header + f"No connection pool in use (backend: {get_backend().name}).",
+            reply_markup=back_to_admin_keyboard(),
+        )
+        return
+    text = (
+        header +
+        f"🔌 **Connections:** {stats.size} (min {stats.min_size}, max {stats.max_size})\n"
+        f"⚙️ **In use:** {stats.in_use}\n"
+        f"💤 **Idle:** {stats.idle}\n"
+        f"⏳ **Waiting:** {stats.waiters}\n\n"
+        f"📊 **Acquires:** {stats.acquires} ({stats.acquire_timeouts} timed out)\n"
+        f"⏱ **Acquire wait:** avg {stats.avg_acquire_wait_ms:.1f} ms, max {stats.max_acquire_wait_ms:.1f} ms"
+    )
+    replica = get_replica_status()
+    if replica is not None:
+        replica_stats = get_pool_stats(replica=True)
+        lag = f"{replica['lag_seconds']:.1f}s" if replica["lag_seconds"] is not None else "unknown"
+        text += (
+            f"\n\n📖 **Read Replica:** {'✅ serving reads' if replica['healthy'] else '⚠️ fallback to primary'}\n"
+            f"🕒 **Lag:** {lag}"
+        )
+        if replica_stats is not None:
+            text += f"\n🔌 **Connections:** {replica_stats.size} ({replica_stats.in_use} in use)"
+    await query.edit_message_text(text, reply_markup=back_to_admin_keyboard())
+
+
+async def _show_update_queue(query) -> None:
+    """Show update intake: queue depth, concurrency and per-user ordering waits (also logged)."""
+    stats = get_dispatch_stats()
+    logger.info("Update dispatch stats | %s", format_dispatch_stats(stats))
+    text = (
+        f"📥 **Update Queue**\n\n"
+        f"📬 **Queued:** {stats.queued} ({stats.queued_joins} join requests), limit {stats.capacity}\n"
+        f"⚙️ **Running:** {stats.running} of {stats.concurrency}\n"
+        f"⏳ **Waiting:** {stats.waiting}\n"
+        f"👤 **Active users:** {stats.active_keys} (max {stats.busiest_key_depth} queued for one user)\n\n"
+        f"📊 **Processed:** {stats.processed} ({stats.duplicates} duplicates skipped)\n"
+        f"⏱ **Per-user wait:** avg {stats.avg_key_wait_ms:.1f} ms, max {stats.max_key_wait_ms:.1f} ms"
+    )
     await query.edit_message_text(text, reply_markup=back_to_admin_keyboard())
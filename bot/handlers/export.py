@@ -0,0 +1,100 @@
+"""Admin data export - users and join logs sent as a gzip-compressed document."""
+
+from datetime import date, datetime, timedelta, timezone
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from bot.services.export_service import EXPORTS, FORMATS, MAX_DOCUMENT_BYTES, export_table
+from bot.services.user_service import is_admin
+from bot.utils.exceptions import DatabaseError, ValidationError
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_USAGE = (
+    "/export users|logs [csv|jsonl] [from YYYY-MM-DD] [to YYYY-MM-DD]\n"
+    "Dates are UTC days (users: join date) and both are optional."
+)
+_TABLE_ALIASES = {"users": "users", "logs": "join_logs", "join_logs": "join_logs"}
+
+
+def start_export(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    table: str,
+    fmt: str,
+    since: date | None = None,
+    until: date | None = None,
+    update: Update | None = None,
+) -> None:
+    """Run the export as a background task and send the file (or the error) to chat_id."""
+
+    async def _export_and_send() -> None:
+        try:
+            result = await export_table(table, fmt, since, until)
+        except ValidationError as e:
+            await context.bot.send_message(chat_id, f"❌ {e}")
+            return
+        except DatabaseError as e:
+            logger.error("Export of %s failed | %s", table, e)
+            await context.bot.send_message(chat_id, "❌ Export failed, see the log.")
+            return
+        try:
+            if not result.rows:
+                await context.bot.send_message(chat_id, "📤 Nothing to export for this selection.")
+            elif result.size > MAX_DOCUMENT_BYTES:
+                await context.bot.send_message(
+                    chat_id,
+                    f"❌ The export is {result.size / 1024 / 1024:.0f} MB, over Telegram's 50 MB limit. "
+                    "Narrow the date range:\n" + EXPORT_USAGE,
+                )
+            else:
+                with result.path.open("rb") as document:
+                    await context.bot.send_document(
+                        chat_id,
+                        document=document,
+                        filename=result.filename,
+                        caption=f"📤 {result.rows} rows",
+                        read_timeout=300,
+                        write_timeout=300,
+                    )
+        finally:
+            result.path.unlink(missing_ok=True)
+
+    # Outside the handler: the admin's other updates are not held up while the file is built
+    context.application.create_task(_export_and_send(), update=update)
+
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /export users|logs [csv|jsonl] [from] [to] - admin only."""
+    user = update.effective_user
+    if not user or not update.message:
+        return
+    if not await is_admin(user.id):
+        await update.message.reply_text("❌ Access denied. You are not authorized as an admin.")
+        return
+
+    args = list(context.args or [])
+    table = _TABLE_ALIASES.get(args.pop(0).lower()) if args else None
+    fmt = args.pop(0).lower() if args and args[0].lower() in FORMATS else "csv"
+    try:
+        dates = [date.fromisoformat(a) for a in args]
+    except ValueError:
+        dates = None
+    if table not in EXPORTS or dates is None or len(dates) > 2:
+        await update.message.reply_text(f"❌ Usage: {EXPORT_USAGE}")
+        return
+
+    since = dates[0] if dates else None
+    until = dates[1] if len(dates) > 1 else None
+    await update.message.reply_text("⏳ Exporting, the file will follow...")
+    start_export(context, update.effective_chat.id, table, fmt, since, until, update=update)
+
+
+def days_range(days: int) -> tuple[date | None, date | None]:
+    """(since, until) for the last `days` UTC days including today; days=0 means everything."""
+    if days <= 0:
+        return None, None
+    today = datetime.now(timezone.utc).date()
+    return today - timedelta(days=days - 1), today
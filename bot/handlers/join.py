@@ -3,11 +3,11 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from bot.config import MAINTENANCE
 from bot.services.config_service import get_config_value
 from bot.services.welcome_service import send_welcome
 from bot.services.log_service import log_join
 from bot.services.user_service import upsert_user
+from bot.tenants import maintenance_enabled
 from bot.utils.exceptions import WelcomeBuilderError
 from bot.utils.logger import get_logger
 
@@ -24,7 +24,7 @@ async def handle_join_request(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not join_req:
         return
 
-    if MAINTENANCE:
+    if maintenance_enabled():
         return
 
     auto_accept = await get_config_value("auto_accept_enabled")
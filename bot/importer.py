@@ -0,0 +1,451 @@
+"""
+One-time import of v1 (bot_advanced.py) data into the v2 database.
+
+Reads users.json, admins.json, bot_config.json (+ welcome.txt) and logs.txt from a v1 bot folder.
+Large files are parsed incrementally (never json.load of the whole file), streamed into
+temporary staging tables with COPY, then merged into users / admins / bot_config / join_logs
+in one transaction. Existing v2 rows win; re-running the import does not duplicate anything.
+
+Usage (PostgreSQL DATABASE_URL only; run while the bot is stopped):
+    python -m bot.importer /path/to/v1_bot_folder [--batch-size 50000] [--overwrite-config]
+"""
+
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from bot.database import get_backend, init_db, close_pool, warm_pool
+from bot.utils.exceptions import DatabaseError
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 50_000
+_CHUNK_SIZE = 1 << 20
+_WHITESPACE = " \t\r\n"
+
+# v1 URL settings become v2 welcome buttons (label, v1 key)
+_V1_BUTTON_KEYS = (
+    ("Signup", "signup_url"),
+    ("Join Group", "join_group_url"),
+    ("Daily Bonuses", "daily_bonuses_url"),
+)
+
+_LOG_TIME_RE = re.compile(r"(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})")
+_LOG_USER_ID_RE = re.compile(r"(?:user_id|user id|id)\s*[:=]?\s*(\d{3,})", re.IGNORECASE)
+_LOG_USERNAME_RE = re.compile(r"@(\w{1,64})")
+_LOG_FAILED_RE = re.compile(r"\b(fail(?:ed|ure)?|error|dm sent: false|dm_sent=false)\b", re.IGNORECASE)
+
+
+class _Progress:
+    """Logs rows and bytes read at most once per interval."""
+
+    def __init__(self, label: str, total_bytes: int, interval: float = 2.0) -> None:
+        self.label = label
+        self.total_bytes = max(total_bytes, 1)
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, rows: int, bytes_read: int, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self.started
+        logger.info(
+            "Import %s | %s rows | %.0f%% of %.1f MB | %.0f rows/s",
+            self.label,
+            rows,
+            min(bytes_read / self.total_bytes, 1.0) * 100,
+            self.total_bytes / 1_048_576,
+            rows / elapsed if elapsed > 0 else 0,
+        )
+
+
+class _StreamReader:
+    """UTF-8 text buffer over a binary file, refilled in chunks and trimmed as it is consumed."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = open(path, "rb")
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    @property
+    def bytes_read(self) -> int:
+        return self._file.tell()
+
+    def fill(self) -> bool:
+        """Read another chunk. Returns False at end of file."""
+        if self.eof:
+            return False
+        chunk = self._file.read(_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self._decoder.decode(b"", final=True)
+            self.pos = 0
+            return False
+        self.buf = self.buf[self.pos:] + self._decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found '{found or 'end of file'}'")
+        self.pos += 1
+
+    def decode_value(self, decoder: json.JSONDecoder) -> Any:
+        """Decode one JSON value, reading more data until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # A number or literal at the very end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def iter_json_items(path: Path, progress: _Progress | None = None) -> Iterator[tuple[str | None, Any]]:
+    """
+    Stream a top-level JSON object as (key, value) pairs or a top-level array as (None, value),
+    holding only the current item (plus one read chunk) in memory.
+    """
+    reader = _StreamReader(path)
+    decoder = json.JSONDecoder()
+    try:
+        opening = reader.peek()
+        if opening not in ("{", "["):
+            raise ValueError(f"{path.name}: expected a JSON object or array")
+        closing = "}" if opening == "{" else "]"
+        reader.pos += 1
+        count = 0
+        if reader.peek() == closing:
+            return
+        while True:
+            key = None
+            if opening == "{":
+                key = reader.decode_value(decoder)
+                reader.expect(":")
+            value = reader.decode_value(decoder)
+            yield key, value
+            count += 1
+            if progress:
+                progress.update(count, reader.bytes_read)
+            sep = reader.peek()
+            if sep == ",":
+                reader.pos += 1
+                continue
+            if sep == closing:
+                return
+            raise ValueError(f"{path.name}: expected ',' or '{closing}' but found '{sep or 'end of file'}'")
+    finally:
+        reader.close()
+
+
+def _parse_time(value: Any) -> datetime | None:
+    """Parse a v1 timestamp (ISO-like string or unix seconds) as UTC."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            parsed = datetime.fromtimestamp(value, tz=timezone.utc)
+        else:
+            parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except (ValueError, OverflowError, OSError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _user_records(path: Path, progress: _Progress) -> Iterator[tuple]:
+    """users.json: {user_id: {username, first_name, last_name, joined_date}} -> staging rows."""
+    for key, info in iter_json_items(path, progress):
+        if not isinstance(info, dict):
+            info = {}
+        raw_id = key if key is not None else info.get("user_id", info.get("id"))
+        try:
+            user_id = int(raw_id)
+        except (TypeError, ValueError):
+            continue
+        yield (
+            user_id,
+            (info.get("username") or None),
+            (info.get("first_name") or None),
+            (info.get("last_name") or None),
+            _parse_time(info.get("joined_date") or info.get("joined_at")),
+        )
+
+
+def _join_log_records(path: Path, progress: _Progress) -> Iterator[tuple]:
+    """
+    logs.txt: one line per event. Lines mentioning a join with a timestamp and a user ID
+    become join_logs rows; broadcast and unparseable lines are skipped.
+    """
+    rows = 0
+    skipped = 0
+    with open(path, "rb") as raw:
+        for line_bytes in raw:
+            line = line_bytes.decode("utf-8", errors="replace")
+            if "join" not in line.lower():
+                continue
+            ts = _LOG_TIME_RE.search(line)
+            uid = _LOG_USER_ID_RE.search(line)
+            created_at = _parse_time(ts.group(1)) if ts else None
+            if not created_at or not uid:
+                skipped += 1
+                continue
+            username = _LOG_USERNAME_RE.search(line)
+            failed = bool(_LOG_FAILED_RE.search(line))
+            rows += 1
+            progress.update(rows, raw.tell())
+            yield (
+                int(uid.group(1)),
+                username.group(1) if username else "",
+                not failed,
+                line.strip()[:500] if failed else None,
+                created_at,
+            )
+    if skipped:
+        logger.info("Import join_logs | skipped %s join lines without timestamp or user ID", skipped)
+
+
+def _batched(records: Iterator[tuple], size: int) -> Iterator[list[tuple]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _copy_stream(conn, table: str, columns: list[str], records: Iterator[tuple], batch_size: int) -> int:
+    """COPY records into a staging table batch by batch. Returns the row count."""
+    total = 0
+    for batch in _batched(records, batch_size):
+        await conn.copy_records_to_table(table, records=batch, columns=columns)
+        total += len(batch)
+    return total
+
+
+def _load_config(folder: Path) -> dict[str, str]:
+    """Map v1 bot_config.json (+ welcome.txt) onto v2 config keys."""
+    config: dict[str, str] = {}
+    cfg_path = folder / "bot_config.json"
+    v1: dict = {}
+    if cfg_path.exists():
+        with open(cfg_path, encoding="utf-8-sig") as f:
+            v1 = json.load(f)  # a few KB of settings, safe to load whole
+    welcome_path = folder / "welcome.txt"
+    welcome_text = v1.get("welcome_text")
+    if not welcome_text and welcome_path.exists():
+        welcome_text = welcome_path.read_text(encoding="utf-8").strip()
+    if welcome_text:
+        config["welcome_text"] = str(welcome_text)
+    if v1.get("welcome_image"):
+        config["welcome_image"] = str(v1["welcome_image"])
+    buttons = [
+        {"label": label, "url": str(v1[key])}
+        for label, key in _V1_BUTTON_KEYS
+        if str(v1.get(key) or "").startswith(("http://", "https://"))
+    ]
+    if buttons:
+        config["welcome_buttons"] = json.dumps(buttons)
+    ignored = sorted(k for k in v1 if k not in config and k not in dict(_V1_BUTTON_KEYS).values())
+    if ignored:
+        logger.info("Import bot_config | v1 keys with no v2 equivalent skipped: %s", ", ".join(ignored))
+    return config
+
+
+async def run_import(folder: Path, batch_size: int = DEFAULT_BATCH_SIZE, overwrite_config: bool = False) -> dict:
+    """Import a v1 bot folder. Returns per-table counts of rows read from the v1 files."""
+    from bot.backends.postgres import PostgresBackend, create_partitions_for_range
+
+    backend = get_backend()
+    if not isinstance(backend, PostgresBackend):
+        raise DatabaseError("The v1 importer needs a PostgreSQL DATABASE_URL (it uses COPY)")
+
+    summary = {"users": 0, "admins": 0, "bot_config": 0, "join_logs": 0}
+    started = time.perf_counter()
+    async with backend.acquire() as conn:
+        async with conn.transaction():
+            # Counter triggers are disabled for the bulk merge and counters recomputed after
+            await conn.execute("ALTER TABLE users DISABLE TRIGGER stats_users_counters")
+            await conn.execute("ALTER TABLE join_logs DISABLE TRIGGER stats_join_logs_counters")
+
+            users_path = folder / "users.json"
+            if users_path.exists():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE import_users (
+                        user_id BIGINT, username TEXT, first_name TEXT, last_name TEXT, joined_at TIMESTAMPTZ
+                    ) ON COMMIT DROP
+                    """
+                )
+                progress = _Progress("users", os.path.getsize(users_path))
+                summary["users"] = await _copy_stream(
+                    conn,
+                    "import_users",
+                    ["user_id", "username", "first_name", "last_name", "joined_at"],
+                    _user_records(users_path, progress),
+                    batch_size,
+                )
+                progress.update(summary["users"], os.path.getsize(users_path), force=True)
+                merged = await conn.execute(
+                    """
+                    INSERT INTO users (user_id, username, first_name, last_name, joined_at, updated_at)
+                    SELECT DISTINCT ON (user_id)
+                        user_id, username, first_name, last_name, COALESCE(joined_at, NOW()), NOW()
+                    FROM import_users
+                    ORDER BY user_id, joined_at
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        username = COALESCE(users.username, EXCLUDED.username),
+                        first_name = COALESCE(users.first_name, EXCLUDED.first_name),
+                        last_name = COALESCE(users.last_name, EXCLUDED.last_name),
+                        joined_at = LEAST(users.joined_at, EXCLUDED.joined_at)
+                    """
+                )
+                logger.info("Import users | merged: %s", merged)
+                await conn.execute(
+                    """
+                    DELETE FROM stats_counters WHERE name IN ('users_total', 'users_reachable');
+                    INSERT INTO stats_counters (name, slot, value)
+                    SELECT 'users_total', 0, COUNT(*) FROM users
+                    UNION ALL
+                    SELECT 'users_reachable', 0, COUNT(*) FROM users WHERE NOT blocked;
+                    """
+                )
+
+            admins_path = folder / "admins.json"
+            if admins_path.exists():
+                admin_ids = []
+                for _, value in iter_json_items(admins_path):
+                    try:
+                        admin_ids.append(int(value))
+                    except (TypeError, ValueError):
+                        continue
+                await conn.executemany(
+                    "INSERT INTO admins (user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING",
+                    [(a,) for a in admin_ids],
+                )
+                summary["admins"] = len(admin_ids)
+
+            config = _load_config(folder)
+            if config:
+                conflict = (
+                    "DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()"
+                    if overwrite_config
+                    else "DO NOTHING"
+                )
+                await conn.executemany(
+                    f"INSERT INTO bot_config (key, value, updated_at) VALUES ($1, $2, NOW()) "
+                    f"ON CONFLICT (key) {conflict}",
+                    list(config.items()),
+                )
+                summary["bot_config"] = len(config)
+
+            logs_path = folder / "logs.txt"
+            if logs_path.exists():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE import_join_logs (
+                        user_id BIGINT, username TEXT, dm_sent BOOLEAN, error_message TEXT, created_at TIMESTAMPTZ
+                    ) ON COMMIT DROP
+                    """
+                )
+                progress = _Progress("join_logs", os.path.getsize(logs_path))
+                summary["join_logs"] = await _copy_stream(
+                    conn,
+                    "import_join_logs",
+                    ["user_id", "username", "dm_sent", "error_message", "created_at"],
+                    _join_log_records(logs_path, progress),
+                    batch_size,
+                )
+                progress.update(summary["join_logs"], os.path.getsize(logs_path), force=True)
+                bounds = await conn.fetchrow("SELECT MIN(created_at) AS lo, MAX(created_at) AS hi FROM import_join_logs")
+                if bounds["lo"] is not None:
+                    await create_partitions_for_range(
+                        conn,
+                        "join_logs",
+                        bounds["lo"].astimezone(timezone.utc).date(),
+                        bounds["hi"].astimezone(timezone.utc).date(),
+                    )
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE import_join_logs_new ON COMMIT DROP AS
+                    SELECT s.* FROM import_join_logs s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM join_logs j WHERE j.created_at = s.created_at AND j.user_id = s.user_id
+                    );
+                    INSERT INTO join_logs (user_id, username, dm_sent, error_message, created_at)
+                    SELECT user_id, username, dm_sent, error_message, created_at FROM import_join_logs_new;
+                    INSERT INTO stats_counters (name, slot, value)
+                    SELECT 'joins:' || to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD'), 0, COUNT(*)
+                    FROM import_join_logs_new GROUP BY 1
+                    ON CONFLICT (name, slot) DO UPDATE SET value = stats_counters.value + EXCLUDED.value;
+                    """
+                )
+
+            await conn.execute("ALTER TABLE users ENABLE TRIGGER stats_users_counters")
+            await conn.execute("ALTER TABLE join_logs ENABLE TRIGGER stats_join_logs_counters")
+    logger.info(
+        "Import complete in %.1f s | %s",
+        time.perf_counter() - started,
+        " ".join(f"{k}={v}" for k, v in summary.items()),
+    )
+    return summary
+
+
+async def _main(args: argparse.Namespace) -> None:
+    await warm_pool()
+    try:
+        await init_db()
+        await run_import(Path(args.folder), args.batch_size, args.overwrite_config)
+    finally:
+        await close_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import v1 bot data (JSON/TXT files) into the v2 database.")
+    parser.add_argument("folder", help="v1 bot folder containing users.json, admins.json, bot_config.json, logs.txt")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per COPY batch")
+    parser.add_argument(
+        "--overwrite-config",
+        action="store_true",
+        help="replace existing v2 config values (default keeps them)",
+    )
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -26,14 +26,57 @@ def admin_panel_keyboard() -> InlineKeyboardMarkup:
         [
             InlineKeyboardButton("🔄 Toggle Auto-Accept Join", callback_data="toggle_auto_accept"),
         ],
+        [
+            InlineKeyboardButton("🗄 Database Pool Stats", callback_data="view_db_pool"),
+            InlineKeyboardButton("📥 Update Queue", callback_data="view_update_queue"),
+        ],
         [
             InlineKeyboardButton("📑 View Logs", callback_data="view_logs"),
+            InlineKeyboardButton("📈 Trends", callback_data="view_trends"),
+        ],
+        [
+            InlineKeyboardButton("📤 Export Data", callback_data="export_menu"),
             InlineKeyboardButton("🛑 Stop Bot", callback_data="stop_bot"),
         ],
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
+def export_keyboard() -> InlineKeyboardMarkup:
+    """Export presets: export:<table>:<format>:<days> (0 = all)."""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("👥 Users (CSV)", callback_data="export:users:csv:0"),
+            InlineKeyboardButton("👥 Users (JSONL)", callback_data="export:users:jsonl:0"),
+        ],
+        [
+            InlineKeyboardButton("📑 Logs, 7 days", callback_data="export:join_logs:csv:7"),
+            InlineKeyboardButton("📑 Logs, 30 days", callback_data="export:join_logs:csv:30"),
+        ],
+        [
+            InlineKeyboardButton("📑 All logs (CSV)", callback_data="export:join_logs:csv:0"),
+            InlineKeyboardButton("📑 All logs (JSONL)", callback_data="export:join_logs:jsonl:0"),
+        ],
+        [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data="back_to_admin")],
+    ])
+
+
+def pager_keyboard(
+    newer_data: str | None,
+    older_data: str | None,
+    extra_rows: list[list[InlineKeyboardButton]] | None = None,
+) -> InlineKeyboardMarkup:
+    """Newer/Older page buttons (each left out at its end of the list), extra rows, then Back."""
+    nav = []
+    if newer_data:
+        nav.append(InlineKeyboardButton("⬅️ Newer", callback_data=newer_data))
+    if older_data:
+        nav.append(InlineKeyboardButton("Older ➡️", callback_data=older_data))
+    rows = ([nav] if nav else []) + (extra_rows or [])
+    rows.append([InlineKeyboardButton("🔙 Back to Admin Panel", callback_data="back_to_admin")])
+    return InlineKeyboardMarkup(rows)
+
+
 def back_to_admin_keyboard() -> InlineKeyboardMarkup:
     """Back to admin panel button."""
     return InlineKeyboardMarkup([
@@ -16,13 +16,29 @@ from telegram.ext import (
     filters,
 )
 
-from bot.config import TELEGRAM_BOT_TOKEN, SUPERADMIN_ID
-from bot.database import init_db, close_pool
+from bot.config import TELEGRAM_BOT_TOKEN, UPDATE_MODE
+from bot.database import close_pool
+from bot.scheduler import register_jobs, start_scheduler, stop_scheduler
+from bot.services.activity_service import flush_activity_on_shutdown
+from bot.startup import run_startup
+from bot.updates import (
+    get_update_queue,
+    get_update_processor,
+    save_high_water_mark,
+)
+from bot.utils.alerts import register_alert_bot
 from bot.utils.error_handler import global_error_handler
 from bot.utils.logger import get_logger
+from bot.utils.update_capture import stop_update_capture
+from bot.utils.metrics import (
+    InstrumentedRequest,
+    instrument_handler,
+    stop_metrics_server,
+)
 
 from bot.handlers.start import start_command
-from bot.handlers.admin import admin_command, show_chat_id_command
+from bot.handlers.admin import admin_command, show_chat_id_command, profile_command
+from bot.handlers.export import export_command
 from bot.handlers.callbacks import handle_callback
 from bot.handlers.messages import handle_message
 from bot.handlers.join import handle_join_request
@@ -42,62 +58,100 @@ MESSAGE_FILTER = (
 ) & ~filters.COMMAND
 
 
-def build_application() -> Application:
-    """Build and configure the Application."""
-    if not TELEGRAM_BOT_TOKEN:
+class BotApplication(Application):
+    """Application whose initialize() also prepares the database, concurrently with getMe."""
+
+    async def initialize(self) -> None:
+        if self._initialized:
+            return
+        await run_startup(self, super().initialize())
+
+
+def build_application(token: str = TELEGRAM_BOT_TOKEN) -> Application:
+    """Build and configure the Application (bot.multi calls this once per tenant, with its token)."""
+    if not token:
         logger.critical("TELEGRAM_BOT_TOKEN is not set")
         sys.exit(1)
 
-    application = (
+    builder = (
         ApplicationBuilder()
-        .token(TELEGRAM_BOT_TOKEN)
+        .application_class(BotApplication)
+        .token(token)
+        # Records latency and error class per Bot API method (getUpdates long polls are not timed)
+        .request(InstrumentedRequest(connection_pool_size=256))
         .post_init(post_init)
         .post_shutdown(post_shutdown)
-        .build()
+        # Bounded, join-requests-first queue that drops redelivered update_ids
+        .update_queue(get_update_queue())
+        .concurrent_updates(get_update_processor())
     )
+    if UPDATE_MODE == "webhook":
+        # The webhook server feeds the update queue directly
+        builder = builder.updater(None)
+    application = builder.build()
+    register_handlers(application)
+    return application
 
+
+def register_handlers(application: Application) -> None:
+    """Register the error handler and all update handlers (also used by the benchmarks)."""
     # CRITICAL: Global error handler - must be registered first
     application.add_error_handler(global_error_handler)
 
     # Command handlers
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("admin", admin_command))
-    application.add_handler(CommandHandler("id", show_chat_id_command))
+    application.add_handler(CommandHandler("start", instrument_handler(start_command)))
+    application.add_handler(CommandHandler("admin", instrument_handler(admin_command)))
+    application.add_handler(CommandHandler("id", instrument_handler(show_chat_id_command)))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("export", instrument_handler(export_command)))
 
     # Callback handler
-    application.add_handler(CallbackQueryHandler(handle_callback))
+    application.add_handler(CallbackQueryHandler(instrument_handler(handle_callback)))
 
     # Message handler
-    application.add_handler(MessageHandler(MESSAGE_FILTER, handle_message))
+    application.add_handler(MessageHandler(MESSAGE_FILTER, instrument_handler(handle_message)))
 
     # Join request handler
-    application.add_handler(ChatJoinRequestHandler(handle_join_request))
-
-    return application
+    application.add_handler(ChatJoinRequestHandler(instrument_handler(handle_join_request)))
 
 
 async def post_init(application: Application) -> None:
-    """Run after application is initialized (before polling)."""
-    await init_db()
-    # Optionally add superadmin
-    if SUPERADMIN_ID:
-        from bot.services.user_service import add_admin
-        await add_admin(SUPERADMIN_ID)
-        logger.info("Superadmin %s added", SUPERADMIN_ID)
+    """Run after application is initialized (before polling); database and caches are ready by now."""
+    register_alert_bot(application.bot)
+    register_jobs(application.bot)
+    start_scheduler()
 
 
 async def post_shutdown(application: Application) -> None:
     """Run after application stops."""
+    stop_scheduler()
+    await save_high_water_mark()
+    await flush_activity_on_shutdown()
     await close_pool()
+    await stop_metrics_server()
+    stop_update_capture()
 
 
 def main() -> None:
     """Main entry point."""
+    if UPDATE_MODE not in ("polling", "webhook"):
+        logger.critical("UPDATE_MODE must be 'polling' or 'webhook', got '%s'", UPDATE_MODE)
+        sys.exit(1)
+    if UPDATE_MODE == "webhook":
+        from bot.webhook import run_webhook, webhook_config_error
+        error = webhook_config_error()
+        if error:
+            logger.critical(error)
+            sys.exit(1)
+
     application = build_application()
-    logger.info("Starting Bot v2...")
+    logger.info("Starting Bot v2 (%s)...", UPDATE_MODE)
+    if UPDATE_MODE == "webhook":
+        run_webhook(application)
+        return
     application.run_polling(
         allowed_updates=Update.ALL_TYPES,
-        drop_pending_updates=True,
+        drop_pending_updates=False,
     )
 
 
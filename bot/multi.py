@@ -0,0 +1,205 @@
+"""
+Multi-bot runner - several bots (tenants) in one process instead of one process per bot.
+
+Usage:
+    python -m bot.multi [--tenants tenants.json] [--workers 4]
+
+Each tenant gets its own Application, update queue, caches and scheduler jobs; tenants in a
+process share the event loop, one PostgreSQL pool (each tenant's tables in its own schema)
+and the scheduler. With --workers N > 1 the tenants are split round-robin over N worker
+processes, each with its own loop and pool; a worker that dies is restarted.
+Polling only: UPDATE_MODE=webhook is not supported here.
+
+Nothing from bot.* is imported at module level: worker processes set their own LOG_FILE and
+METRICS_PORT before the configuration is loaded.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+RESTART_DELAY_SECONDS = 5
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bot.multi", description="Run several bots in one process.")
+    parser.add_argument("--tenants", type=Path, help="tenants file (default: TENANTS_FILE)")
+    parser.add_argument("--workers", type=int, help="worker processes, 0 = one per CPU core (default: MULTI_WORKERS)")
+    return parser.parse_args()
+
+
+async def _serve_tenant(tenant, shutdown: asyncio.Event, failed: list, stop: asyncio.Event, total: int) -> None:
+    """Run one tenant's Application until `shutdown` is set. Runs in its own task, as the tenant."""
+    from telegram import Update
+
+    from bot.main import build_application, post_init
+    from bot.services.activity_service import flush_activity_on_shutdown
+    from bot.tenants import tenant_context
+    from bot.updates import save_high_water_mark
+    from bot.utils.logger import get_logger
+
+    logger = get_logger("bot.multi")
+    with tenant_context(tenant):
+        application = build_application(tenant.token)
+        try:
+            await application.initialize()
+            await post_init(application)
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=False)
+            await application.start()
+            logger.info("Tenant %s is running (@%s)", tenant.name, application.bot.username)
+        except Exception as e:
+            # One bad token or schema must not take the other tenants down
+            logger.critical("Tenant %s failed to start | %s", tenant.name, e, exc_info=True)
+            failed.append(tenant.name)
+            if len(failed) == total:
+                stop.set()
+        else:
+            await shutdown.wait()
+        finally:
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            if tenant.name not in failed:
+                await save_high_water_mark()
+                await flush_activity_on_shutdown()
+            await application.shutdown()
+
+
+async def _serve(tenants: list) -> int:
+    """Serve `tenants` on this event loop until SIGINT/SIGTERM. Returns the exit code."""
+    from bot.database import close_pool, enable_tenant_schemas
+    from bot.scheduler import stop_scheduler
+    from bot.utils.logger import get_logger
+    from bot.utils.metrics import stop_metrics_server
+    from bot.utils.update_capture import stop_update_capture
+
+    logger = get_logger("bot.multi")
+    enable_tenant_schemas()
+    stop = asyncio.Event()
+    shutdown = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    failed: list[str] = []
+    logger.info("Starting %s bots: %s", len(tenants), ", ".join(t.name for t in tenants))
+    tasks = [
+        asyncio.create_task(_serve_tenant(t, shutdown, failed, stop, len(tenants)), name=f"tenant:{t.name}")
+        for t in tenants
+    ]
+    await stop.wait()
+    logger.info("Stopping %s bots", len(tenants))
+    stop_scheduler()
+    shutdown.set()
+    for tenant, result in zip(tenants, await asyncio.gather(*tasks, return_exceptions=True)):
+        if isinstance(result, BaseException):
+            logger.error("Tenant %s did not shut down cleanly | %s", tenant.name, result)
+    await close_pool()
+    await stop_metrics_server()
+    stop_update_capture()
+    return 1 if len(failed) == len(tenants) else 0
+
+
+def _run_worker(index: int, workers: int, tenants_path: str, names: list[str]) -> None:
+    """Worker process entry point: serve the named tenants."""
+    if workers > 1:
+        log_file = Path(os.getenv("LOG_FILE") or Path(__file__).resolve().parent.parent / "logs" / "bot.log")
+        os.environ["LOG_FILE"] = str(log_file.with_suffix(f".worker{index}.log"))
+        metrics_port = int(os.getenv("METRICS_PORT") or 0)
+        if metrics_port > 0:
+            os.environ["METRICS_PORT"] = str(metrics_port + index)
+    from bot.tenants import load_tenants
+
+    tenants = [t for t in load_tenants(Path(tenants_path)) if t.name in names]
+    sys.exit(asyncio.run(_serve(tenants)))
+
+
+def _supervise(tenants_path: Path, groups: list[list[str]]) -> int:
+    """Run one worker process per group; restart workers that exit unexpectedly."""
+    from bot.utils.logger import get_logger
+
+    logger = get_logger("bot.multi")
+    context = multiprocessing.get_context("spawn")
+    processes: dict[int, multiprocessing.Process] = {}
+    restart_at: dict[int, float] = {}
+    stopping = False
+
+    def start(index: int) -> None:
+        process = context.Process(
+            target=_run_worker,
+            args=(index, len(groups), str(tenants_path), groups[index]),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        processes[index] = process
+        logger.info("Worker %s (pid %s): %s", index, process.pid, ", ".join(groups[index]))
+
+    def request_stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    for index in range(len(groups)):
+        start(index)
+
+    while processes or (restart_at and not stopping):
+        time.sleep(0.5)
+        for index, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            del processes[index]
+            if not stopping:
+                logger.error(
+                    "Worker %s exited with code %s, restarting in %ss", index, process.exitcode, RESTART_DELAY_SECONDS
+                )
+                restart_at[index] = time.monotonic() + RESTART_DELAY_SECONDS
+        for index, when in list(restart_at.items()):
+            if not stopping and time.monotonic() >= when:
+                del restart_at[index]
+                start(index)
+    return 0
+
+
+def main() -> int:
+    args = _parse_args()
+    from bot.config import DATABASE_URL, MULTI_WORKERS, TENANTS_FILE, UPDATE_MODE
+    from bot.tenants import load_tenants
+    from bot.utils.exceptions import ValidationError
+
+    if UPDATE_MODE != "polling":
+        print("python -m bot.multi supports UPDATE_MODE=polling only", file=sys.stderr)
+        return 2
+    if not DATABASE_URL.lower().startswith(("postgres://", "postgresql://")):
+        print("python -m bot.multi needs a postgresql:// DATABASE_URL (tenants share one pool)", file=sys.stderr)
+        return 2
+    tenants_path = args.tenants or Path(TENANTS_FILE)
+    try:
+        tenants = load_tenants(tenants_path)
+    except ValidationError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    workers = args.workers if args.workers is not None else MULTI_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tenants))
+    if workers == 1:
+        return asyncio.run(_serve(tenants))
+    groups = [[t.name for t in tenants[i::workers]] for i in range(workers)]
+    return _supervise(tenants_path, groups)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
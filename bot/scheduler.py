@@ -1,12 +1,22 @@
 """
 Persistent scheduler - uses APScheduler for scheduled tasks.
-Wrap all job logic in try/except to avoid SchedulerError crashing the event loop.
+Wrap all job logic in try/except to avoid SchedulerError crashing the event loop;
+failures are logged and alerted to the superadmin.
 """
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from telegram import Bot
 
-from bot.utils.exceptions import SchedulerError
+from bot.config import ACTIVITY_FLUSH_SECONDS, ALERT_DIGEST_SECONDS, STATS_ROLLUP_SECONDS
+from bot.database import maintain_partitions
+from bot.services.activity_service import flush_activity
+from bot.services.stats_service import rollup_stats
+from bot.tenants import bind_tenant, current_tenant
+from bot.updates import save_high_water_mark
+from bot.utils.alerts import alert_job_failure, send_alert_digest
+from bot.utils.exceptions import DatabaseUnavailableError, SchedulerError
 from bot.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -14,6 +24,12 @@ logger = get_logger(__name__)
 _scheduler: AsyncIOScheduler | None = None
 
 
+async def _alert_failure(job: str, exc: Exception) -> None:
+    """Alert the superadmin about a failed job; an outage is already alerted by the database breaker."""
+    if not isinstance(exc, DatabaseUnavailableError):
+        await alert_job_failure(job, exc)
+
+
 def get_scheduler() -> AsyncIOScheduler:
     """Get or create the scheduler."""
     global _scheduler
@@ -23,6 +39,103 @@ def get_scheduler() -> AsyncIOScheduler:
     return _scheduler
 
 
+async def _partition_maintenance_job() -> None:
+    """Premake next months' log partitions and drop those past retention."""
+    try:
+        await maintain_partitions()
+    except Exception as e:
+        logger.exception("Partition maintenance job failed: %s", e)
+        await _alert_failure("Partition maintenance", e)
+
+
+async def _update_high_water_mark_job() -> None:
+    """Persist how far update processing has got, so a crash doesn't replay handled updates."""
+    try:
+        await save_high_water_mark()
+    except Exception as e:
+        logger.exception("Update high-water mark job failed: %s", e)
+        await _alert_failure("Update high-water mark", e)
+
+
+async def _activity_flush_job() -> None:
+    """Write users' last activity recorded since the previous flush."""
+    try:
+        await flush_activity()
+    except Exception as e:
+        logger.exception("Activity flush job failed: %s", e)
+        await _alert_failure("Activity flush", e)
+
+
+async def _stats_rollup_job() -> None:
+    """Roll join/broadcast logs written since the last run into the hourly/daily stats."""
+    try:
+        await rollup_stats()
+    except Exception as e:
+        logger.exception("Stats rollup job failed: %s", e)
+        await _alert_failure("Stats rollup", e)
+
+
+async def _alert_digest_job(bot: Bot) -> None:
+    """Send the superadmin a digest of repeated errors whose alerts were held back."""
+    try:
+        await send_alert_digest(bot)
+    except Exception as e:
+        logger.exception("Alert digest job failed: %s", e)
+
+
+def register_jobs(bot: Bot) -> None:
+    """
+    Register the bot's periodic jobs. With several bots in one process each tenant gets its
+    own copy of every job, running as that tenant.
+    """
+    sched = get_scheduler()
+    tenant = current_tenant()
+    suffix = f":{tenant.name}" if tenant else ""
+    sched.add_job(
+        bind_tenant(_partition_maintenance_job),
+        CronTrigger(hour=0, minute=10, timezone="UTC"),
+        id="partition_maintenance" + suffix,
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=3600,
+    )
+    sched.add_job(
+        bind_tenant(_update_high_water_mark_job),
+        IntervalTrigger(seconds=5),
+        id="update_high_water_mark" + suffix,
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    sched.add_job(
+        bind_tenant(_activity_flush_job),
+        IntervalTrigger(seconds=max(ACTIVITY_FLUSH_SECONDS, 1)),
+        id="activity_flush" + suffix,
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    if STATS_ROLLUP_SECONDS > 0:
+        sched.add_job(
+            bind_tenant(_stats_rollup_job),
+            IntervalTrigger(seconds=STATS_ROLLUP_SECONDS),
+            id="stats_rollup" + suffix,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+    if ALERT_DIGEST_SECONDS > 0:
+        sched.add_job(
+            bind_tenant(_alert_digest_job),
+            IntervalTrigger(seconds=ALERT_DIGEST_SECONDS),
+            args=[bot],
+            id="alert_digest" + suffix,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+
+
 def start_scheduler() -> None:
     """Start the scheduler."""
     sched = get_scheduler()
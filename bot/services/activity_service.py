@@ -0,0 +1,84 @@
+"""
+Activity service - users.last_active_at without a write per update.
+Every update from a user only records the time in an in-memory map (user_id -> last seen);
+a periodic job and shutdown flush the map as one bulk UPDATE per chunk, so the write load
+depends on how many distinct users were active, not on how many messages they sent.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from bot.database import execute_query
+from bot.tenants import TenantLocal
+from bot.utils.exceptions import DatabaseError
+from bot.utils.logger import get_logger
+from bot.utils.metrics import GaugeFunc
+from bot.utils.tracing import traced
+
+logger = get_logger(__name__)
+
+# Users per UPDATE statement
+FLUSH_CHUNK = 5000
+
+_dirty: TenantLocal[dict[int, float]] = TenantLocal(dict)
+
+GaugeFunc(
+    "bot_activity_pending_users",
+    "Users whose last activity is not flushed to the database yet.",
+    lambda: sum(len(d) for d in _dirty.values()),
+)
+
+
+def touch_user(user_id: int) -> None:
+    """Record that user_id was active just now (no I/O)."""
+    _dirty.get()[user_id] = time.time()
+
+
+@traced()
+async def flush_activity() -> int:
+    """
+    Write the recorded activity to users.last_active_at (never moving it backwards).
+    Returns the number of users flushed. On failure the unflushed entries are kept for the
+    next flush and DatabaseError is raised.
+    """
+    dirty = _dirty.get()
+    if not dirty:
+        return 0
+    pending = sorted(dirty.items())
+    dirty.clear()
+    flushed = 0
+    try:
+        # user_id order: concurrent flushes (several instances) lock rows in the same order
+        for start in range(0, len(pending), FLUSH_CHUNK):
+            chunk = pending[start:start + FLUSH_CHUNK]
+            await execute_query(
+                """
+                UPDATE users AS u SET last_active_at = d.seen
+                FROM unnest($1::bigint[], $2::timestamptz[]) AS d(user_id, seen)
+                WHERE u.user_id = d.user_id AND (u.last_active_at IS NULL OR u.last_active_at < d.seen)
+                """,
+                [user_id for user_id, _ in chunk],
+                [datetime.fromtimestamp(seen, timezone.utc) for _, seen in chunk],
+            )
+            flushed += len(chunk)
+    except BaseException as e:
+        # Keep what was not written (also when cancelled at shutdown); newer activity wins
+        for user_id, seen in pending[flushed:]:
+            if dirty.get(user_id, 0) < seen:
+                dirty[user_id] = seen
+        if isinstance(e, Exception) and not isinstance(e, DatabaseError):
+            logger.exception("Failed to flush activity of %s users", len(pending) - flushed)
+            raise DatabaseError("Failed to flush user activity", original=e) from e
+        raise
+    return flushed
+
+
+async def flush_activity_on_shutdown() -> None:
+    """Final flush when the bot stops; logs instead of raising, whatever was not written is lost."""
+    try:
+        flushed = await flush_activity()
+    except DatabaseError as e:
+        logger.warning("Could not flush activity of %s users at shutdown | %s", len(_dirty.get()), e)
+        return
+    if flushed:
+        logger.info("Flushed activity of %s users at shutdown", flushed)
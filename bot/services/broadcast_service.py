@@ -5,19 +5,34 @@ One user's failure must NOT crash the broadcast loop.
 """
 
 import asyncio
+import time
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Any
 
 from telegram import Bot
 from telegram.error import RetryAfter, Forbidden, NetworkError, TelegramError
 
-from bot.config import BROADCAST_DELAY_SECONDS, BROADCAST_RETRY_AFTER_FALLBACK_SECONDS
+from bot.config import (
+    BROADCAST_DELAY_SECONDS,
+    BROADCAST_RETRY_AFTER_FALLBACK_SECONDS,
+    BROADCAST_ERROR_TRACEBACKS,
+    BROADCAST_ERROR_SUMMARY_SECONDS,
+)
 from bot.database import execute_query, fetch_all
+from bot.services.user_service import mark_users_blocked
+from bot.utils.error_aggregator import ErrorAggregator
 from bot.utils.exceptions import BroadcastError
 from bot.utils.logger import get_logger
+from bot.utils.tracing import traced
+from bot.utils.metrics import BROADCAST_MESSAGES, BROADCAST_RATE, BROADCAST_RETRY_AFTER
 
 logger = get_logger(__name__)
 
+_DELIVERED = BROADCAST_MESSAGES.labels("delivered")
+_FAILED = BROADCAST_MESSAGES.labels("failed")
+_BLOCKED = BROADCAST_MESSAGES.labels("blocked")
+
 
 @dataclass
 class BroadcastResult:
@@ -118,6 +133,7 @@ async def _send_to_user(bot: Bot, user_id: int, data: dict) -> None:
         raise BroadcastError(f"Unsupported message type: {msg_type}")
 
 
+@traced()
 async def broadcast_to_users(
     bot: Bot,
     user_ids: list[int],
@@ -128,7 +144,9 @@ async def broadcast_to_users(
     - Catches RetryAfter: waits and retries once for that user
     - Catches Forbidden: counts as blocked (user blocked bot)
     - Catches NetworkError: counts as failed
-    - Other errors: counts as failed, logged, loop continues
+    - Other errors: counts as failed, loop continues
+    Errors are aggregated by fingerprint and logged as a summary (periodically and at the end);
+    full tracebacks only for the first BROADCAST_ERROR_TRACEBACKS of each error class.
     """
     data = _extract_message_data(message)
     if not data:
@@ -137,13 +155,19 @@ async def broadcast_to_users(
     delivered = 0
     failed = 0
     blocked = 0
+    blocked_ids: list[int] = []
     total = len(user_ids)
+    started = time.perf_counter()
+
+    errors = ErrorAggregator(f"Broadcast ({data['type']})", logger, max_tracebacks=BROADCAST_ERROR_TRACEBACKS)
 
     for user_id in user_ids:
         try:
             await _send_to_user(bot, user_id, data)
             delivered += 1
+            _DELIVERED.inc()
         except RetryAfter as e:
+            BROADCAST_RETRY_AFTER.inc()
             wait_sec = getattr(e, "retry_after", None)
             if wait_sec is None:
                 wait_sec = BROADCAST_RETRY_AFTER_FALLBACK_SECONDS
@@ -160,38 +184,37 @@ async def broadcast_to_users(
             try:
                 await _send_to_user(bot, user_id, data)
                 delivered += 1
+                _DELIVERED.inc()
             except (Forbidden, NetworkError, TelegramError) as retry_err:
                 if isinstance(retry_err, Forbidden):
                     blocked += 1
-                    logger.warning("Broadcast blocked for user %s | %s", user_id, retry_err)
+                    _BLOCKED.inc()
+                    blocked_ids.append(user_id)
+                    errors.record(retry_err, user_id, traceback=False)
                 else:
                     failed += 1
-                    logger.exception(
-                        "Broadcast failed for user %s | %s: %s",
-                        user_id,
-                        type(retry_err).__name__,
-                        retry_err,
-                    )
-        except Forbidden:
+                    _FAILED.inc()
+                    errors.record(retry_err, user_id)
+        except Forbidden as e:
             blocked += 1
-            logger.warning("Broadcast blocked for user %s | user blocked bot", user_id)
-        except NetworkError as e:
-            failed += 1
-            logger.exception("Broadcast network error for user %s | %s", user_id, e)
-        except TelegramError as e:
-            failed += 1
-            logger.exception(
-                "Broadcast failed for user %s | %s: %s",
-                user_id,
-                type(e).__name__,
-                e,
-            )
+            _BLOCKED.inc()
+            blocked_ids.append(user_id)
+            errors.record(e, user_id, traceback=False)
         except Exception as e:
+            # NetworkError, other TelegramError, unexpected errors: counted, loop continues
             failed += 1
-            logger.exception("Broadcast unexpected error for user %s | %s", user_id, e)
+            _FAILED.inc()
+            errors.record(e, user_id)
 
+        if errors.summary_due(BROADCAST_ERROR_SUMMARY_SECONDS):
+            errors.log_summary()
         await asyncio.sleep(BROADCAST_DELAY_SECONDS)
 
+    errors.log_summary(final=True)
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0.0
+    BROADCAST_RATE.set(rate)
+
     result = BroadcastResult(
         total=total,
         delivered=delivered,
@@ -204,24 +227,33 @@ async def broadcast_to_users(
     try:
         await execute_query(
             """
-            INSERT INTO broadcast_results (total_users, delivered, failed, blocked, message_type)
-            VALUES ($1, $2, $3, $4, $5)
+            INSERT INTO broadcast_results (total_users, delivered, failed, blocked, message_type, broadcast_at)
+            VALUES ($1, $2, $3, $4, $5, $6)
             """,
             total,
             delivered,
             failed,
             blocked,
             data["type"],
+            datetime.now(timezone.utc),
+            spool=True,
         )
     except Exception as e:
         logger.exception("Failed to save broadcast result: %s", e)
 
+    # Keep the reachable-users counter accurate
+    try:
+        await mark_users_blocked(blocked_ids)
+    except Exception as e:
+        logger.exception("Failed to mark blocked users: %s", e)
+
     logger.info(
-        "Broadcast complete | total=%s delivered=%s failed=%s blocked=%s",
+        "Broadcast complete | total=%s delivered=%s failed=%s blocked=%s rate=%.1f msg/s",
         total,
         delivered,
         failed,
         blocked,
+        rate,
     )
 
     return result
@@ -3,8 +3,10 @@ Bot configuration service - reads/writes config from PostgreSQL.
 """
 
 from bot.database import fetch_one, fetch_all, execute_query
-from bot.utils.exceptions import DatabaseError
+from bot.tenants import TenantLocal
+from bot.utils.exceptions import DatabaseError, DatabaseUnavailableError
 from bot.utils.logger import get_logger
+from bot.utils.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -15,17 +17,29 @@ DEFAULT_CONFIG = {
     "auto_accept_enabled": "true",  # When false, join requests are not auto-approved (other services stay on)
 }
 
+# Last known good values (per tenant), served while the database is unavailable
+_snapshots: TenantLocal[dict[str, str]] = TenantLocal(dict)
 
+
+@traced()
 async def get_config_value(key: str) -> str:
     """Get a config value by key."""
+    snapshot = _snapshots.get()
     try:
         row = await fetch_one(
             "SELECT value FROM bot_config WHERE key = $1",
             key,
         )
         if row and row["value"] is not None:
-            return row["value"]
-        return DEFAULT_CONFIG.get(key, "")
+            value = row["value"]
+        else:
+            value = DEFAULT_CONFIG.get(key, "")
+        snapshot[key] = value
+        return value
+    except DatabaseUnavailableError:
+        if key not in snapshot:
+            raise
+        return snapshot[key]
     except DatabaseError:
         raise
     except Exception as e:
@@ -33,8 +47,10 @@ async def get_config_value(key: str) -> str:
         raise DatabaseError("Failed to get config", original=e) from e
 
 
+@traced()
 async def set_config_value(key: str, value: str) -> None:
     """Set a config value."""
+    snapshot = _snapshots.get()
     try:
         await execute_query(
             """
@@ -45,6 +61,7 @@ async def set_config_value(key: str, value: str) -> None:
             key,
             value,
         )
+        snapshot[key] = value
     except DatabaseError:
         raise
     except Exception as e:
@@ -52,14 +69,21 @@ async def set_config_value(key: str, value: str) -> None:
         raise DatabaseError("Failed to set config", original=e) from e
 
 
+@traced()
 async def get_all_config() -> dict:
     """Get all config as dict."""
+    snapshot = _snapshots.get()
     try:
         rows = await fetch_all("SELECT key, value FROM bot_config")
         result = dict(DEFAULT_CONFIG)
         for row in rows:
             result[row["key"]] = row["value"] or ""
+        snapshot.update(result)
         return result
+    except DatabaseUnavailableError:
+        if not snapshot:
+            raise
+        return {**DEFAULT_CONFIG, **snapshot}
     except DatabaseError:
         raise
     except Exception as e:
@@ -0,0 +1,130 @@
+"""
+Export service - users and join logs as gzip-compressed CSV or JSONL files.
+Rows are streamed from a database cursor in batches and compressed on a worker thread, so
+memory stays bounded and the event loop keeps serving updates during a large export.
+"""
+
+import asyncio
+import csv
+import gzip
+import json
+import os
+import tempfile
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import IO
+
+from bot.database import stream_all
+from bot.utils.exceptions import DatabaseError, ValidationError
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Exportable table -> (date filter column, query without WHERE, ORDER BY of an indexed column)
+EXPORTS: dict[str, tuple[str, str, str]] = {
+    "users": (
+        "joined_at",
+        "SELECT user_id, username, first_name, last_name, joined_at, updated_at, blocked FROM users",
+        "user_id",
+    ),
+    "join_logs": (
+        "created_at",
+        "SELECT id, user_id, username, dm_sent, error_message, created_at FROM join_logs",
+        "created_at",
+    ),
+}
+FORMATS = ("csv", "jsonl")
+
+BATCH_SIZE = 2000
+# Bot API limit for documents sent by bots
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+# One export at a time per process: each holds a connection and a CPU-bound compressor thread
+_lock = asyncio.Lock()
+
+
+@dataclass
+class ExportResult:
+    """A finished export; the caller sends and then deletes `path`."""
+
+    path: Path
+    filename: str
+    rows: int
+    size: int
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _write_batch(out: IO[str], writer, fmt: str, columns: list[str], rows: list[tuple]) -> None:
+    """Format and compress one batch (runs on a worker thread)."""
+    if fmt == "csv":
+        writer.writerows([[_cell(v) for v in row] for row in rows])
+    else:
+        out.writelines(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_cell) + "\n" for row in rows
+        )
+
+
+async def export_table(table: str, fmt: str, since: date | None = None, until: date | None = None) -> ExportResult:
+    """
+    Write `table` rows whose date column falls within [since, until] (UTC days, both optional)
+    to a temporary .gz file. Raises ValidationError for bad arguments or another export
+    running, DatabaseError on query failure.
+    """
+    if table not in EXPORTS:
+        raise ValidationError(f"Unknown export {table!r} (use {', '.join(EXPORTS)})")
+    if fmt not in FORMATS:
+        raise ValidationError(f"Unknown format {fmt!r} (use {', '.join(FORMATS)})")
+    if since and until and since > until:
+        raise ValidationError("The start date is after the end date")
+    if _lock.locked():
+        raise ValidationError("Another export is still running, try again when it has finished")
+
+    column, query, order = EXPORTS[table]
+    conditions, args = [], []
+    if since:
+        args.append(datetime.combine(since, time.min, timezone.utc))
+        conditions.append(f"{column} >= ${len(args)}")
+    if until:
+        args.append(datetime.combine(until + timedelta(days=1), time.min, timezone.utc))
+        conditions.append(f"{column} < ${len(args)}")
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order}"
+
+    filename = f"{table}_{since or 'start'}_{until or datetime.now(timezone.utc).date()}.{fmt}.gz"
+    fd, tmp = tempfile.mkstemp(prefix=f"{table}_", suffix=f".{fmt}.gz")
+    os.close(fd)
+    path = Path(tmp)
+    rows = 0
+    async with _lock:
+        try:
+            with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6) as out:
+                writer = csv.writer(out)
+                columns: list[str] | None = None
+                async with aclosing(stream_all(query, *args, batch_size=BATCH_SIZE, replica=True)) as batches:
+                    async for batch in batches:
+                        if columns is None:
+                            columns = list(batch[0].keys())
+                            if fmt == "csv":
+                                writer.writerow(columns)
+                        await asyncio.to_thread(_write_batch, out, writer, fmt, columns, [tuple(r) for r in batch])
+                        rows += len(batch)
+        except (DatabaseError, asyncio.CancelledError):
+            path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            path.unlink(missing_ok=True)
+            logger.exception("Export of %s failed", table)
+            raise DatabaseError(f"Export of {table} failed", original=e) from e
+    size = path.stat().st_size
+    logger.info("Exported %s rows of %s to %s (%s bytes)", rows, table, path, size)
+    return ExportResult(path=path, filename=filename, rows=rows, size=size)
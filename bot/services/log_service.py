@@ -2,13 +2,18 @@
 Log service - join logs and activity logs in PostgreSQL.
 """
 
+from datetime import datetime, timezone
+
 from bot.database import execute_query, fetch_all
 from bot.utils.exceptions import DatabaseError
 from bot.utils.logger import get_logger
+from bot.utils.pagination import OLDER, Page, PageCursor, fetch_page
+from bot.utils.tracing import traced
 
 logger = get_logger(__name__)
 
 
+@traced()
 async def log_join(
     user_id: int,
     username: str | None,
@@ -19,13 +24,16 @@ async def log_join(
     try:
         await execute_query(
             """
-            INSERT INTO join_logs (user_id, username, dm_sent, error_message)
-            VALUES ($1, $2, $3, $4)
+            INSERT INTO join_logs (user_id, username, dm_sent, error_message, created_at)
+            VALUES ($1, $2, $3, $4, $5)
             """,
             user_id,
             username or "",
             dm_sent,
             error_message,
+            # Explicit timestamp so a spooled row keeps its real time when replayed
+            datetime.now(timezone.utc),
+            spool=True,
         )
     except DatabaseError:
         raise
@@ -34,19 +42,28 @@ async def log_join(
         raise DatabaseError("Failed to log join", original=e) from e
 
 
-async def get_recent_logs(limit: int = 10) -> list[dict]:
-    """Get recent join logs for admin panel."""
+@traced()
+async def get_logs_page(
+    limit: int = 10,
+    cursor: PageCursor | None = None,
+    direction: str = OLDER,
+    failed_only: bool = False,
+) -> Page:
+    """One page of join logs, newest first, before/after `cursor`; failed_only keeps undelivered welcomes."""
     try:
-        rows = await fetch_all(
-            """
-            SELECT user_id, username, dm_sent, error_message, created_at
-            FROM join_logs ORDER BY created_at DESC LIMIT $1
-            """,
+        return await fetch_page(
+            lambda query, *args: fetch_all(query, *args, replica=True),
+            "SELECT id, user_id, username, dm_sent, error_message, created_at FROM join_logs",
+            ["dm_sent = FALSE"] if failed_only else [],
+            [],
+            "created_at",
+            "id",
             limit,
+            cursor,
+            direction,
         )
-        return [dict(r) for r in rows]
     except DatabaseError:
         raise
     except Exception as e:
-        logger.exception("Failed to get recent logs")
+        logger.exception("Failed to get logs page")
         raise DatabaseError("Failed to get logs", original=e) from e
@@ -1,14 +1,16 @@
 """
-User and admin state service - live chat and config wizard states.
+User, admin and bot state service - live chat and config wizard states, internal bookkeeping.
 """
 
 from bot.database import fetch_one, execute_query
 from bot.utils.exceptions import DatabaseError
 from bot.utils.logger import get_logger
+from bot.utils.tracing import traced
 
 logger = get_logger(__name__)
 
 
+@traced()
 async def get_user_state(user_id: int) -> str | None:
     """Get user state (e.g. live_chat)."""
     try:
@@ -21,6 +23,7 @@ async def get_user_state(user_id: int) -> str | None:
         raise DatabaseError("Failed to get state", original=e) from e
 
 
+@traced()
 async def set_user_state(user_id: int, state: str | None) -> None:
     """Set user state. Pass None to clear."""
     try:
@@ -43,6 +46,7 @@ async def set_user_state(user_id: int, state: str | None) -> None:
         raise DatabaseError("Failed to set state", original=e) from e
 
 
+@traced()
 async def get_admin_state(admin_id: int) -> str | None:
     """Get admin state (e.g. waiting_welcome_text)."""
     try:
@@ -55,6 +59,7 @@ async def get_admin_state(admin_id: int) -> str | None:
         raise DatabaseError("Failed to get state", original=e) from e
 
 
+@traced()
 async def set_admin_state(admin_id: int, state: str | None) -> None:
     """Set admin state. Pass None to clear."""
     try:
@@ -75,3 +80,36 @@ async def set_admin_state(admin_id: int, state: str | None) -> None:
     except Exception as e:
         logger.exception("Failed to set admin state %s", admin_id)
         raise DatabaseError("Failed to set state", original=e) from e
+
+
+@traced()
+async def get_bot_state(key: str) -> str | None:
+    """Get an internal bot_state value (e.g. update_high_water_mark), not shown to admins."""
+    try:
+        row = await fetch_one("SELECT value FROM bot_state WHERE key = $1", key)
+        return row["value"] if row else None
+    except DatabaseError:
+        raise
+    except Exception as e:
+        logger.exception("Failed to get bot state %s", key)
+        raise DatabaseError("Failed to get state", original=e) from e
+
+
+@traced()
+async def set_bot_state(key: str, value: str) -> None:
+    """Set an internal bot_state value."""
+    try:
+        await execute_query(
+            """
+            INSERT INTO bot_state (key, value, updated_at)
+            VALUES ($1, $2, NOW())
+            ON CONFLICT (key) DO UPDATE SET value = $2, updated_at = NOW()
+            """,
+            key,
+            value,
+        )
+    except DatabaseError:
+        raise
+    except Exception as e:
+        logger.exception("Failed to set bot state %s", key)
+        raise DatabaseError("Failed to set state", original=e) from e
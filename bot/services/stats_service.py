@@ -0,0 +1,302 @@
+"""
+Stats service - hourly/daily rollups of join_logs and broadcast_results.
+
+The rollup job aggregates only rows added since the last run: each source table has a
+watermark (last id rolled up) in stats_watermarks. Ids are handed out before the inserting
+transaction commits, so a run only rolls up to the highest id seen by the *previous* run;
+a row that was still in flight then has committed by now. Ids the watermark passes without
+a row (a longer transaction such as an import, or a rollback) are kept in stats_rollup_gaps
+and rechecked on every run for GAP_RECHECK_HOURS, so rows that commit late are still counted.
+The admin trends screen reads the rollup tables only, so it costs the same at any log size.
+"""
+
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from bot.config import STATS_ROLLUP_BATCH
+from bot.database import execute_batch, execute_query, fetch_all, fetch_one, get_backend
+from bot.services.user_service import get_user_stats
+from bot.utils.exceptions import DatabaseError
+from bot.utils.logger import get_logger
+from bot.utils.tracing import traced
+
+logger = get_logger(__name__)
+
+# Source table -> (timestamp column, aggregates; the first one counts the rows)
+_SOURCES: dict[str, tuple[str, str]] = {
+    "join_logs": (
+        "created_at",
+        """
+        COUNT(*) AS joins,
+        COALESCE(SUM(CASE WHEN dm_sent THEN 1 ELSE 0 END), 0) AS dm_sent,
+        COALESCE(SUM(CASE WHEN dm_sent THEN 0 ELSE 1 END), 0) AS dm_failed
+        """,
+    ),
+    "broadcast_results": (
+        "broadcast_at",
+        """
+        COUNT(*) AS broadcasts,
+        COALESCE(SUM(total_users), 0) AS broadcast_recipients,
+        COALESCE(SUM(delivered), 0) AS broadcast_delivered,
+        COALESCE(SUM(failed), 0) AS broadcast_failed,
+        COALESCE(SUM(blocked), 0) AS broadcast_blocked
+        """,
+    ),
+}
+
+# Batches rolled up per source in one run; a large backlog (first run on old data) catches up over several runs
+_MAX_BATCHES_PER_RUN = 10
+# Hourly buckets older than this are pruned; daily buckets are kept
+HOURLY_RETENTION_DAYS = 35
+# How long id ranges passed over without rows are rechecked for rows committed late
+GAP_RECHECK_HOURS = 24
+# Per-day "joins:YYYY-MM-DD" counters kept (only today's is read; stats_daily has the history)
+JOIN_COUNTER_RETENTION_DAYS = 2
+
+# The watermark only moves if it still has the value this run read, and the rollup rows are
+# only added if this run's token made it in; a second instance running the same range adds nothing.
+_ADVANCE_WATERMARK = """
+    INSERT INTO stats_watermarks (source, last_id, pending_id, run_token, updated_at)
+    VALUES ($1, $2, $3, $4, NOW())
+    ON CONFLICT (source) DO UPDATE
+    SET last_id = EXCLUDED.last_id, pending_id = EXCLUDED.pending_id,
+        run_token = EXCLUDED.run_token, updated_at = EXCLUDED.updated_at
+    WHERE stats_watermarks.last_id = $5
+"""
+
+_ADD_ROLLUP = """
+    INSERT INTO {table} (bucket, metric, value)
+    SELECT $1::text, $2::text, $3::bigint
+    WHERE EXISTS (SELECT 1 FROM {guard} WHERE source = $4 AND run_token = $5)
+    ON CONFLICT (bucket, metric) DO UPDATE SET value = {table}.value + EXCLUDED.value
+"""
+
+# Id ranges in ($1, $2] without a row, found from the ids that are there
+_FIND_GAPS = """
+    SELECT lo, hi FROM (
+        SELECT LAG(id, 1, $1) OVER (ORDER BY id) + 1 AS lo, id - 1 AS hi
+        FROM (SELECT id FROM {source} WHERE id > $1 AND id <= $2 UNION ALL SELECT $2 + 1) AS ids
+    ) AS g
+    WHERE hi >= lo
+"""
+
+_ADD_GAP = """
+    INSERT INTO stats_rollup_gaps (source, lo, hi)
+    SELECT $1::text, $2::bigint, $3::bigint
+    WHERE EXISTS (SELECT 1 FROM stats_watermarks WHERE source = $1 AND run_token = $4)
+    ON CONFLICT (source, lo, hi) DO NOTHING
+"""
+
+# A gap whose rows showed up: claimed with a token (a second instance claims nothing), its rows
+# rolled up, the ids still missing kept as smaller gaps with the same found_at, then removed
+_CLAIM_GAP = """
+    UPDATE stats_rollup_gaps SET run_token = $4
+    WHERE source = $1 AND lo = $2 AND hi = $3 AND run_token IS NULL
+"""
+
+_SPLIT_GAP = """
+    INSERT INTO stats_rollup_gaps (source, lo, hi, found_at)
+    SELECT $1::text, $2::bigint, $3::bigint, found_at FROM stats_rollup_gaps
+    WHERE source = $1 AND run_token = $4
+    ON CONFLICT (source, lo, hi) DO NOTHING
+"""
+
+_DROP_CLAIMED_GAP = "DELETE FROM stats_rollup_gaps WHERE source = $1 AND run_token = $2"
+
+_SET_DAILY = """
+    INSERT INTO stats_daily (bucket, metric, value) VALUES ($1, $2, $3)
+    ON CONFLICT (bucket, metric) DO UPDATE SET value = EXCLUDED.value
+"""
+
+
+async def _aggregate_range(source: str, after_id: int, upper: int):
+    """
+    Metric sums of `source` rows with ids in (after_id, upper] and the id ranges in it without
+    a row. Returns (rows counted, hourly sums, daily sums, gaps). The gaps are read first and
+    their ids left out of the sums, so a row committing in between is counted once, later.
+    """
+    column, aggregates = _SOURCES[source]
+    gaps = [(g["lo"], g["hi"]) for g in await fetch_all(_FIND_GAPS.format(source=source), after_id, upper)]
+    args = [after_id, upper]
+    exclude = ""
+    if gaps:
+        args += [[lo for lo, _ in gaps], [hi for _, hi in gaps]]
+        exclude = (
+            "AND NOT EXISTS (SELECT 1 FROM unnest($3::bigint[], $4::bigint[]) AS g(lo, hi)"
+            " WHERE id >= g.lo AND id <= g.hi)"
+        )
+    rows = await fetch_all(
+        f"""
+        SELECT {get_backend().utc_hour_sql(column)} AS bucket, {aggregates}
+        FROM {source} WHERE id > $1 AND id <= $2 {exclude}
+        GROUP BY 1
+        """,
+        *args,
+    )
+    hourly: dict[tuple[str, str], int] = {}
+    daily: dict[tuple[str, str], int] = defaultdict(int)
+    processed = 0
+    for r in rows:
+        values = dict(r)
+        bucket = values.pop("bucket")
+        processed += next(iter(values.values()))
+        for metric, value in values.items():
+            if value:
+                hourly[(bucket, metric)] = value
+                daily[(bucket[:10], metric)] += value
+    return processed, hourly, daily, gaps
+
+
+def _rollup_statements(guard: str, source: str, token: str, hourly: dict, daily: dict) -> list[tuple[str, list[tuple]]]:
+    """Batches adding hourly/daily sums, applied only if `guard` holds this run's token for `source`."""
+    batches = []
+    for table, values in (("stats_hourly", hourly), ("stats_daily", daily)):
+        if values:
+            batches.append(
+                (
+                    _ADD_ROLLUP.format(table=table, guard=guard),
+                    [(bucket, metric, value, source, token) for (bucket, metric), value in values.items()],
+                )
+            )
+    return batches
+
+
+async def _rollup_batch(source: str) -> tuple[int, bool]:
+    """Roll up the next batch of `source`. Returns (rows rolled up, more rows waiting)."""
+    row = await fetch_one("SELECT last_id, pending_id FROM stats_watermarks WHERE source = $1", source)
+    last_id, pending_id = (row["last_id"], row["pending_id"]) if row else (0, 0)
+    upper = min(pending_id, last_id + STATS_ROLLUP_BATCH)
+    more = upper < pending_id
+    if not more:
+        newest = await fetch_one(f"SELECT COALESCE(MAX(id), 0) AS max_id FROM {source}")
+        pending_id = max(pending_id, newest["max_id"])
+
+    processed, hourly, daily, gaps = 0, {}, {}, []
+    if upper > last_id:
+        processed, hourly, daily, gaps = await _aggregate_range(source, last_id, upper)
+    else:
+        upper = last_id
+
+    token = uuid.uuid4().hex
+    batches = [(_ADVANCE_WATERMARK, [(source, upper, pending_id, token, last_id)])]
+    if gaps:
+        batches.append((_ADD_GAP, [(source, lo, hi, token) for lo, hi in gaps]))
+    batches += _rollup_statements("stats_watermarks", source, token, hourly, daily)
+    await execute_batch(batches)
+    return processed, more
+
+
+async def _rollup_gaps(source: str) -> int:
+    """Roll up rows that committed inside id ranges an earlier run passed over. Returns the row count."""
+    filled = await fetch_all(
+        f"""
+        SELECT lo, hi FROM stats_rollup_gaps AS g
+        WHERE source = $1 AND run_token IS NULL
+          AND EXISTS (SELECT 1 FROM {source} AS s WHERE s.id >= g.lo AND s.id <= g.hi)
+        """,
+        source,
+    )
+    total = 0
+    for gap in filled:
+        lo, hi = gap["lo"], gap["hi"]
+        processed, hourly, daily, missing = await _aggregate_range(source, lo - 1, hi)
+        token = uuid.uuid4().hex
+        batches = [(_CLAIM_GAP, [(source, lo, hi, token)])]
+        batches += _rollup_statements("stats_rollup_gaps", source, token, hourly, daily)
+        if missing:
+            batches.append((_SPLIT_GAP, [(source, m_lo, m_hi, token) for m_lo, m_hi in missing]))
+        batches.append((_DROP_CLAIMED_GAP, [(source, token)]))
+        await execute_batch(batches)
+        total += processed
+    if total:
+        logger.info("Rolled up %s %s rows that committed after the watermark passed them", total, source)
+    return total
+
+
+@traced()
+async def rollup_stats() -> int:
+    """
+    Add rows logged since the last run to the hourly/daily rollups, snapshot today's user
+    totals and prune old hourly buckets, rollup gaps and per-day join counters. Returns the
+    number of log rows rolled up.
+    """
+    try:
+        total = 0
+        for source in _SOURCES:
+            for _ in range(_MAX_BATCHES_PER_RUN):
+                processed, more = await _rollup_batch(source)
+                total += processed
+                if not more:
+                    break
+            total += await _rollup_gaps(source)
+
+        now = datetime.now(timezone.utc)
+        day = now.strftime("%Y-%m-%d")
+        users = await get_user_stats()
+        await execute_batch(
+            [
+                (
+                    _SET_DAILY,
+                    [
+                        (day, "users_total", users["total_users"]),
+                        (day, "users_reachable", users["reachable_users"]),
+                    ],
+                )
+            ]
+        )
+        cutoff = (now - timedelta(days=HOURLY_RETENTION_DAYS)).strftime("%Y-%m-%d %H")
+        await execute_query("DELETE FROM stats_hourly WHERE bucket < $1", cutoff)
+        await execute_query(
+            "DELETE FROM stats_rollup_gaps WHERE found_at < $1", now - timedelta(hours=GAP_RECHECK_HOURS)
+        )
+        # Sharded join counters of past days (16 slots each on PostgreSQL) are dead rows
+        oldest_day = (now - timedelta(days=JOIN_COUNTER_RETENTION_DAYS - 1)).strftime("%Y-%m-%d")
+        await execute_query(
+            "DELETE FROM stats_counters WHERE name LIKE 'joins:%' AND name < $1", "joins:" + oldest_day
+        )
+        if total:
+            logger.debug("Rolled up %s log rows", total)
+        return total
+    except DatabaseError:
+        raise
+    except Exception as e:
+        logger.exception("Failed to roll up stats")
+        raise DatabaseError("Failed to roll up stats", original=e) from e
+
+
+@traced()
+async def get_stats_trends(days: int = 7) -> dict:
+    """
+    Rollup figures for the admin trends screen: metric totals for the last 24 hours, metrics
+    per day for the last `days` days (newest first) and when the rollups were last updated.
+    """
+    now = datetime.now(timezone.utc)
+    first_day = (now - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    first_hour = (now - timedelta(hours=23)).strftime("%Y-%m-%d %H")
+    try:
+        hourly = await fetch_all(
+            "SELECT metric, SUM(value)::bigint AS value FROM stats_hourly WHERE bucket >= $1 GROUP BY metric",
+            first_hour,
+            replica=True,
+        )
+        daily = await fetch_all(
+            "SELECT bucket, metric, value FROM stats_daily WHERE bucket >= $1",
+            first_day,
+            replica=True,
+        )
+        updated = await fetch_one("SELECT MIN(updated_at) AS updated_at FROM stats_watermarks", replica=True)
+    except DatabaseError:
+        raise
+    except Exception as e:
+        logger.exception("Failed to get stats trends")
+        raise DatabaseError("Failed to get stats trends", original=e) from e
+
+    per_day: dict[str, dict[str, int]] = defaultdict(dict)
+    for r in daily:
+        per_day[r["bucket"]][r["metric"]] = r["value"]
+    return {
+        "last_24h": {r["metric"]: r["value"] for r in hourly},
+        "days": sorted(per_day.items(), reverse=True),
+        "updated_at": updated["updated_at"] if updated else None,
+    }
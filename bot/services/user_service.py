@@ -2,18 +2,38 @@
 User service - manages users and admins in PostgreSQL.
 """
 
+from datetime import datetime, timezone
+
 from bot.database import fetch_one, fetch_all, execute_query
-from bot.utils.exceptions import DatabaseError
+from bot.tenants import TenantLocal
+from bot.utils.exceptions import DatabaseError, DatabaseUnavailableError
 from bot.utils.logger import get_logger
+from bot.utils.pagination import OLDER, Page, PageCursor, fetch_page
+from bot.utils.tracing import traced
 
 logger = get_logger(__name__)
 
+# Last known admin IDs (per tenant), used by is_admin while the database is unavailable
+_admin_snapshots: TenantLocal[set[int] | None] = TenantLocal(lambda: None)
+
 
+@traced()
 async def is_admin(user_id: int) -> bool:
-    """Check if user is admin."""
+    """Check if user is admin. Falls back to the last known admin list while the DB is down."""
     try:
         row = await fetch_one("SELECT 1 FROM admins WHERE user_id = $1", user_id)
+        admin_snapshot = _admin_snapshots.get()
+        if admin_snapshot is not None:
+            if row is not None:
+                admin_snapshot.add(user_id)
+            else:
+                admin_snapshot.discard(user_id)
         return row is not None
+    except DatabaseUnavailableError:
+        admin_snapshot = _admin_snapshots.get()
+        if admin_snapshot is None:
+            raise
+        return user_id in admin_snapshot
     except DatabaseError:
         raise
     except Exception as e:
@@ -21,11 +41,19 @@ async def is_admin(user_id: int) -> bool:
         raise DatabaseError("Failed to check admin", original=e) from e
 
 
+@traced()
 async def get_all_admin_ids() -> list[int]:
-    """Get all admin user IDs."""
+    """Get all admin user IDs (also refreshes the admin snapshot)."""
     try:
         rows = await fetch_all("SELECT user_id FROM admins ORDER BY user_id")
-        return [r["user_id"] for r in rows]
+        ids = [r["user_id"] for r in rows]
+        _admin_snapshots.set(set(ids))
+        return ids
+    except DatabaseUnavailableError:
+        admin_snapshot = _admin_snapshots.get()
+        if admin_snapshot is None:
+            raise
+        return sorted(admin_snapshot)
     except DatabaseError:
         raise
     except Exception as e:
@@ -33,6 +61,7 @@ async def get_all_admin_ids() -> list[int]:
         raise DatabaseError("Failed to get admins", original=e) from e
 
 
+@traced()
 async def add_admin(user_id: int) -> None:
     """Add admin."""
     try:
@@ -40,6 +69,9 @@ async def add_admin(user_id: int) -> None:
             "INSERT INTO admins (user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING",
             user_id,
         )
+        admin_snapshot = _admin_snapshots.get()
+        if admin_snapshot is not None:
+            admin_snapshot.add(user_id)
     except DatabaseError:
         raise
     except Exception as e:
@@ -47,6 +79,7 @@ async def add_admin(user_id: int) -> None:
         raise DatabaseError("Failed to add admin", original=e) from e
 
 
+@traced()
 async def remove_admin(user_id: int) -> bool:
     """Remove admin. Returns True if removed, False if not found."""
     try:
@@ -54,6 +87,9 @@ async def remove_admin(user_id: int) -> bool:
             "DELETE FROM admins WHERE user_id = $1",
             user_id,
         )
+        admin_snapshot = _admin_snapshots.get()
+        if admin_snapshot is not None:
+            admin_snapshot.discard(user_id)
         return True
     except DatabaseError:
         raise
@@ -62,6 +98,7 @@ async def remove_admin(user_id: int) -> bool:
         raise DatabaseError("Failed to remove admin", original=e) from e
 
 
+@traced()
 async def get_admins_with_info() -> list[dict]:
     """Get all admins with user_id, username, first_name (from users table when available)."""
     try:
@@ -71,7 +108,8 @@ async def get_admins_with_info() -> list[dict]:
             FROM admins a
             LEFT JOIN users u ON u.user_id = a.user_id
             ORDER BY a.user_id
-            """
+            """,
+            replica=True,
         )
         return [dict(r) for r in rows]
     except DatabaseError:
@@ -81,6 +119,7 @@ async def get_admins_with_info() -> list[dict]:
         raise DatabaseError("Failed to get admins", original=e) from e
 
 
+@traced()
 async def upsert_user(
     user_id: int,
     username: str | None = None,
@@ -97,12 +136,14 @@ async def upsert_user(
                 username = COALESCE(EXCLUDED.username, users.username),
                 first_name = COALESCE(EXCLUDED.first_name, users.first_name),
                 last_name = COALESCE(EXCLUDED.last_name, users.last_name),
+                blocked = FALSE,
                 updated_at = NOW()
             """,
             user_id,
             username,
             first_name,
             last_name,
+            spool=True,
         )
     except DatabaseError:
         raise
@@ -111,6 +152,7 @@ async def upsert_user(
         raise DatabaseError("Failed to save user", original=e) from e
 
 
+@traced()
 async def get_user(user_id: int) -> dict | None:
     """Get user by ID."""
     try:
@@ -128,6 +170,7 @@ async def get_user(user_id: int) -> dict | None:
         raise DatabaseError("Failed to get user", original=e) from e
 
 
+@traced()
 async def get_all_user_ids(exclude_admin_ids: list[int] | None = None) -> list[int]:
     """Get all user IDs for broadcast, optionally excluding admins."""
     try:
@@ -135,9 +178,10 @@ async def get_all_user_ids(exclude_admin_ids: list[int] | None = None) -> list[i
             rows = await fetch_all(
                 "SELECT user_id FROM users WHERE NOT (user_id = ANY($1::bigint[])) ORDER BY user_id",
                 exclude_admin_ids,
+                replica=True,
             )
         else:
-            rows = await fetch_all("SELECT user_id FROM users ORDER BY user_id")
+            rows = await fetch_all("SELECT user_id FROM users ORDER BY user_id", replica=True)
         return [r["user_id"] for r in rows]
     except DatabaseError:
         raise
@@ -146,10 +190,14 @@ async def get_all_user_ids(exclude_admin_ids: list[int] | None = None) -> list[i
         raise DatabaseError("Failed to get users", original=e) from e
 
 
+@traced()
 async def get_user_count() -> int:
-    """Get total user count."""
+    """Get total user count (maintained counter, constant time)."""
     try:
-        row = await fetch_one("SELECT COUNT(*) as c FROM users")
+        row = await fetch_one(
+            "SELECT COALESCE(SUM(value), 0)::bigint AS c FROM stats_counters WHERE name = 'users_total'",
+            replica=True,
+        )
         return row["c"] if row else 0
     except DatabaseError:
         raise
@@ -158,16 +206,68 @@ async def get_user_count() -> int:
         raise DatabaseError("Failed to get user count", original=e) from e
 
 
-async def get_recent_users(limit: int = 5) -> list[dict]:
-    """Get recent users for stats."""
+@traced()
+async def get_user_stats() -> dict:
+    """Get total users, reachable (not blocked) users and joins today from maintained counters."""
+    joins_key = "joins:" + datetime.now(timezone.utc).strftime("%Y-%m-%d")
     try:
         rows = await fetch_all(
-            "SELECT user_id, username, first_name, joined_at FROM users ORDER BY joined_at DESC LIMIT $1",
+            """
+            SELECT name, SUM(value)::bigint AS value FROM stats_counters
+            WHERE name IN ('users_total', 'users_reachable', $1)
+            GROUP BY name
+            """,
+            joins_key,
+            replica=True,
+        )
+        values = {r["name"]: r["value"] for r in rows}
+        return {
+            "total_users": values.get("users_total", 0),
+            "reachable_users": values.get("users_reachable", 0),
+            "joins_today": values.get(joins_key, 0),
+        }
+    except DatabaseError:
+        raise
+    except Exception as e:
+        logger.exception("Failed to get user stats")
+        raise DatabaseError("Failed to get user stats", original=e) from e
+
+
+@traced()
+async def mark_users_blocked(user_ids: list[int]) -> None:
+    """Mark users as blocked (bot got Forbidden). Cleared again by upsert_user."""
+    if not user_ids:
+        return
+    try:
+        await execute_query(
+            "UPDATE users SET blocked = TRUE WHERE user_id = ANY($1::bigint[]) AND NOT blocked",
+            user_ids,
+            spool=True,
+        )
+    except DatabaseError:
+        raise
+    except Exception as e:
+        logger.exception("Failed to mark %s users blocked", len(user_ids))
+        raise DatabaseError("Failed to mark users blocked", original=e) from e
+
+
+@traced()
+async def get_users_page(limit: int = 10, cursor: PageCursor | None = None, direction: str = OLDER) -> Page:
+    """One page of users, newest joins first, before/after `cursor`."""
+    try:
+        return await fetch_page(
+            lambda query, *args: fetch_all(query, *args, replica=True),
+            "SELECT user_id, username, first_name, joined_at, blocked FROM users",
+            [],
+            [],
+            "joined_at",
+            "user_id",
             limit,
+            cursor,
+            direction,
         )
-        return [dict(r) for r in rows]
     except DatabaseError:
         raise
     except Exception as e:
-        logger.exception("Failed to get recent users")
+        logger.exception("Failed to get users page")
         raise DatabaseError("Failed to get users", original=e) from e
@@ -9,6 +9,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from bot.services.config_service import get_all_config
 from bot.utils.exceptions import WelcomeBuilderError
 from bot.utils.logger import get_logger
+from bot.utils.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -33,6 +34,7 @@ def _parse_welcome_buttons(value: str) -> list[dict]:
         return []
 
 
+@traced()
 async def build_welcome_keyboard() -> InlineKeyboardMarkup | None:
     """Build welcome keyboard from config (custom buttons only, max 10)."""
     try:
@@ -50,6 +52,7 @@ async def build_welcome_keyboard() -> InlineKeyboardMarkup | None:
         raise WelcomeBuilderError("Failed to build welcome keyboard", original=e) from e
 
 
+@traced()
 async def send_welcome(bot: Bot, user_id: int) -> None:
     """
     Send welcome message to user.
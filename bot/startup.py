@@ -0,0 +1,93 @@
+"""
+Startup sequence - everything that has to happen before the first update is fetched.
+Database preparation and the Bot API calls (getMe, getWebhookInfo) do not depend on each
+other, so they run concurrently, and the cache preloads run concurrently with each other.
+Each phase's duration is logged so a slow restart can be attributed.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable
+
+from telegram.error import TelegramError
+from telegram.ext import Application
+
+from bot.database import init_db, replay_spool, warm_pool
+from bot.services.config_service import get_all_config
+from bot.services.user_service import add_admin, get_all_admin_ids
+from bot.tenants import current_tenant, get_superadmin_id
+from bot.updates import get_update_processor, load_high_water_mark
+from bot.utils.logger import get_logger
+from bot.utils.metrics import start_metrics_server
+from bot.utils.update_capture import start_update_capture
+
+logger = get_logger(__name__)
+
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase (phases may overlap)."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    async def phase(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items()]
+        return f"{(time.perf_counter() - self.started) * 1000:.0f} ms | " + " ".join(parts)
+
+
+async def _add_superadmin() -> None:
+    superadmin_id = get_superadmin_id()
+    if superadmin_id:
+        await add_admin(superadmin_id)
+        logger.info("Superadmin %s added", superadmin_id)
+
+
+async def _prepare_database(timer: StartupTimer) -> None:
+    await timer.phase("db.connect", warm_pool())
+    await timer.phase("db.schema", init_db())
+    await timer.phase(
+        "db.preload",
+        asyncio.gather(
+            # Writes spooled during a previous outage
+            replay_spool(),
+            # Updates that arrived while we were down are processed, not dropped; skip ones already handled
+            load_high_water_mark(),
+            _add_superadmin(),
+            # Prime the config/admin snapshots served while the database is unavailable
+            get_all_config(),
+            get_all_admin_ids(),
+        ),
+    )
+
+
+async def _read_pending_updates(application: Application) -> None:
+    try:
+        webhook_info = await application.bot.get_webhook_info()
+        get_update_processor().start_catch_up(webhook_info.pending_update_count)
+    except TelegramError as e:
+        logger.warning("Could not read pending update count: %s", e)
+
+
+async def run_startup(application: Application, initialize: Awaitable[None]) -> None:
+    """
+    Run the startup phases. `initialize` is Application.initialize (getMe and the HTTP
+    clients), awaited alongside the database work instead of before it.
+    """
+    timer = StartupTimer()
+    await timer.phase("metrics", start_metrics_server())
+    start_update_capture()
+    await asyncio.gather(
+        timer.phase("telegram.get_me", initialize),
+        timer.phase("telegram.webhook_info", _read_pending_updates(application)),
+        _prepare_database(timer),
+    )
+    tenant = current_tenant()
+    logger.info("Startup%s finished in %s", f" of {tenant.name}" if tenant else "", timer.summary())
@@ -0,0 +1,163 @@
+"""
+Tenants - several bots served by one process (`python -m bot.multi`).
+Each tenant has its own token, PostgreSQL schema and superadmin; they share the event loop,
+the connection pool and the scheduler. The tenant an update belongs to travels in a context
+variable: every task a tenant's Application creates inherits it, the database backend sets
+the connection's search_path from it, and per-bot state (config/admin snapshots, update
+queue, alert limiter, write spool) is kept per tenant with TenantLocal.
+
+With a single bot (`python -m bot.main`) no tenant is set and everything behaves as before.
+"""
+
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Generic, Iterator, TypeVar
+
+from bot.config import MAINTENANCE, SUPERADMIN_ID
+from bot.utils.exceptions import ValidationError
+
+T = TypeVar("T")
+
+_NAME_RE = re.compile(r"^[a-z][a-z0-9_]{0,39}$")
+_SCHEMA_RE = re.compile(r"^[a-z_][a-z0-9_]{0,62}$")
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """One bot hosted by the multi-bot runner."""
+
+    name: str
+    token: str
+    schema: str
+    superadmin_id: int | None = None
+    maintenance: bool = False
+
+
+_current: ContextVar[Tenant | None] = ContextVar("tenant", default=None)
+
+
+def current_tenant() -> Tenant | None:
+    """Tenant of the running task, or None in single-bot mode."""
+    return _current.get()
+
+
+@contextmanager
+def tenant_context(tenant: Tenant | None) -> Iterator[None]:
+    """Run the block (and tasks created in it) as `tenant`."""
+    token = _current.set(tenant)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def bind_tenant(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Coroutine function that runs `func` as the current tenant, wherever it is awaited
+    (scheduler jobs and background replays do not inherit the caller's context).
+    """
+    tenant = current_tenant()
+    if tenant is None:
+        return func
+
+    @wraps(func)
+    async def run(*args, **kwargs):
+        with tenant_context(tenant):
+            return await func(*args, **kwargs)
+
+    return run
+
+
+class TenantLocal(Generic[T]):
+    """A value per tenant, created by `factory` on first use (one value in single-bot mode)."""
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._values: dict[str, tuple[Tenant | None, T]] = {}
+
+    def get(self) -> T:
+        tenant = _current.get()
+        key = tenant.name if tenant else ""
+        try:
+            return self._values[key][1]
+        except KeyError:
+            value = self._factory()
+            self._values[key] = (tenant, value)
+            return value
+
+    def set(self, value: T) -> None:
+        tenant = _current.get()
+        self._values[tenant.name if tenant else ""] = (tenant, value)
+
+    def items(self) -> list[tuple[Tenant | None, T]]:
+        """(tenant, value) for every tenant that has used this so far."""
+        return list(self._values.values())
+
+    def values(self) -> list[T]:
+        return [value for _, value in self._values.values()]
+
+
+def get_superadmin_id() -> int | None:
+    """Superadmin of the current tenant (SUPERADMIN_ID in single-bot mode)."""
+    tenant = _current.get()
+    return tenant.superadmin_id if tenant else SUPERADMIN_ID
+
+
+def maintenance_enabled() -> bool:
+    """Maintenance mode of the current tenant (MAINTENANCE in single-bot mode)."""
+    tenant = _current.get()
+    return tenant.maintenance if tenant else MAINTENANCE
+
+
+def load_tenants(path: Path) -> list[Tenant]:
+    """
+    Read the tenants file: a JSON list of {"name", "token", "schema"?, "superadmin_id"?,
+    "maintenance"?}. The schema defaults to "bot_<name>". Raises ValidationError.
+    """
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise ValidationError(f"Could not read tenants file {path}: {e}") from e
+    if not isinstance(entries, list) or not entries:
+        raise ValidationError(f"{path} must contain a non-empty JSON list of tenants")
+
+    tenants = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValidationError(f"Tenant #{index + 1} is not an object")
+        name = str(entry.get("name", ""))
+        if not _NAME_RE.match(name):
+            raise ValidationError(f"Tenant #{index + 1}: name must be lowercase letters, digits and _ (got {name!r})")
+        token = str(entry.get("token", ""))
+        if ":" not in token:
+            raise ValidationError(f"Tenant {name}: token is missing or malformed")
+        schema = str(entry.get("schema") or f"bot_{name}")
+        if not _SCHEMA_RE.match(schema) or schema.startswith("pg_"):
+            raise ValidationError(f"Tenant {name}: invalid schema name {schema!r}")
+        superadmin_id = entry.get("superadmin_id")
+        try:
+            superadmin_id = int(superadmin_id) if superadmin_id not in (None, "") else None
+        except (TypeError, ValueError) as e:
+            raise ValidationError(f"Tenant {name}: superadmin_id must be a number") from e
+        tenants.append(
+            Tenant(
+                name=name,
+                token=token,
+                schema=schema,
+                superadmin_id=superadmin_id,
+                maintenance=bool(entry.get("maintenance", False)),
+            )
+        )
+
+    for field in ("name", "token", "schema"):
+        values = [getattr(t, field) for t in tenants]
+        duplicates = sorted({v for v in values if values.count(v) > 1})
+        if duplicates:
+            shown = duplicates if field != "token" else [d.split(":", 1)[0] + ":…" for d in duplicates]
+            raise ValidationError(f"Duplicate tenant {field}: {', '.join(shown)}")
+    return tenants
@@ -0,0 +1,409 @@
+"""
+Update intake - the Application's update queue and update processor.
+Updates that arrived while the bot was down are not dropped: on startup they are processed
+in update_id order, with chat join requests moved ahead of everything else so a burst of
+joins is approved first. Redelivered updates are skipped by update_id: everything at or below
+the persisted high-water mark, plus a bounded window of recently seen ids. Telegram restarts
+update_id from a random value after about a week without updates; an id far below the newest
+one seen is taken as such a reset (the mark and window are cleared) rather than a duplicate.
+
+Updates are handled concurrently (UPDATE_CONCURRENCY), but updates from the same user
+(or chat, when there is no user) run one at a time in arrival order, so the admin wizard
+still sees its messages in sequence. With concurrency the Application takes every update off
+the queue at once and they wait for a processing slot instead, so the slots are handed out
+join requests first as well.
+
+Each update runs under its own trace (bot.utils.tracing), so slow updates can be broken down.
+"""
+
+import asyncio
+import collections
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from bot.config import UPDATE_QUEUE_SIZE, UPDATE_DEDUPE_WINDOW, UPDATE_CONCURRENCY
+from bot.services.activity_service import touch_user
+from bot.tenants import TenantLocal
+from bot.utils.exceptions import DatabaseError
+from bot.utils.logger import get_logger
+from bot.utils.metrics import GaugeFunc
+from bot.utils.tracing import start_trace
+from bot.utils.update_capture import capture_update
+
+logger = get_logger(__name__)
+
+# bot_state key holding the persisted high-water mark
+HIGH_WATER_MARK_KEY = "update_high_water_mark"
+
+
+@dataclass
+class DispatchStats:
+    """Snapshot of update intake for the admin panel and logs."""
+    queued: int
+    queued_joins: int
+    running: int
+    waiting: int
+    concurrency: int
+    capacity: int
+    active_keys: int
+    busiest_key_depth: int
+    processed: int
+    duplicates: int
+    avg_key_wait_ms: float
+    max_key_wait_ms: float
+
+
+class UpdateQueue(asyncio.Queue):
+    """
+    Two-lane FIFO: chat join requests first, then everything else, each in arrival order.
+    Duplicate updates are dropped on put and never reach the handlers.
+    """
+
+    def _init(self, maxsize: int) -> None:
+        self._joins: collections.deque = collections.deque()
+        self._queue: collections.deque = collections.deque()
+        self.high_water_mark = 0
+        self._seen: set[int] = set()
+        self._seen_order: collections.deque = collections.deque()
+        self._pending: set[int] = set()
+        self.max_accepted = 0
+        self.duplicates = 0
+        # Set when update_id was reset, so the lower high-water mark is persisted
+        self.ids_reset = False
+
+    def _put(self, item: Any) -> None:
+        if isinstance(item, Update) and item.chat_join_request is not None:
+            self._joins.append(item)
+        else:
+            self._queue.append(item)
+
+    def _get(self) -> Any:
+        if self._joins:
+            return self._joins.popleft()
+        return self._queue.popleft()
+
+    def qsize(self) -> int:
+        return len(self._joins) + len(self._queue)
+
+    def empty(self) -> bool:
+        return not self._joins and not self._queue
+
+    def full(self) -> bool:
+        # Updates handed to the processor still count until complete(), so the bound
+        # holds with concurrent processing too
+        if self.maxsize <= 0:
+            return False
+        return max(self.qsize(), len(self._pending)) >= self.maxsize
+
+    @property
+    def queued_joins(self) -> int:
+        return len(self._joins)
+
+    @property
+    def pending(self) -> int:
+        """Accepted updates not yet fully handled (queued + in the processor)."""
+        return len(self._pending)
+
+    def put_nowait(self, item: Any) -> None:
+        if isinstance(item, Update):
+            if self._is_duplicate(item.update_id):
+                self.duplicates += 1
+                logger.debug("Skipping duplicate update %s", item.update_id)
+                return
+            super().put_nowait(item)
+            self._remember(item.update_id)
+            capture_update(item)
+            return
+        super().put_nowait(item)
+
+    def _is_duplicate(self, update_id: int) -> bool:
+        newest = max(self.high_water_mark, self.max_accepted)
+        # Redeliveries are at most a few unacknowledged batches behind; anything further back
+        # is Telegram numbering updates afresh
+        if update_id < newest - max(UPDATE_DEDUPE_WINDOW, UPDATE_QUEUE_SIZE):
+            logger.warning("update_id went back from %s to %s: Telegram reset the ids", newest, update_id)
+            self.high_water_mark = 0
+            self.max_accepted = 0
+            self._seen.clear()
+            self._seen_order.clear()
+            self.ids_reset = True
+            return False
+        return update_id <= self.high_water_mark or update_id in self._seen
+
+    def _remember(self, update_id: int) -> None:
+        self._seen.add(update_id)
+        self._seen_order.append(update_id)
+        if len(self._seen_order) > UPDATE_DEDUPE_WINDOW:
+            self._seen.discard(self._seen_order.popleft())
+        self._pending.add(update_id)
+        self.max_accepted = max(self.max_accepted, update_id)
+
+    def complete(self, update_id: int) -> None:
+        """Called once an accepted update has been fully handled."""
+        self._pending.discard(update_id)
+        # Wake a producer blocked in put(); the base class only does that on get()
+        self._wakeup_next(self._putters)
+
+    def safe_high_water_mark(self) -> int:
+        """Highest update_id such that every accepted update at or below it has been handled."""
+        if self._pending:
+            return max(min(self._pending) - 1, self.high_water_mark)
+        return max(self.max_accepted, self.high_water_mark)
+
+
+def update_kind(update: object) -> str:
+    """Which field the update carries ("message", "chat_join_request"...), for trace names."""
+    if isinstance(update, Update):
+        for kind in Update.ALL_TYPES:
+            if getattr(update, kind, None) is not None:
+                return str(kind)
+    return type(update).__name__
+
+
+def update_key(update: object) -> int | None:
+    """Ordering key: the user, else the chat. None means no ordering constraint."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class _PrioritySlots:
+    """Concurrency limit whose waiters get a free slot join requests first, otherwise FIFO."""
+
+    def __init__(self, limit: int) -> None:
+        self.free = limit
+        self._joins: collections.deque = collections.deque()
+        self._others: collections.deque = collections.deque()
+
+    @property
+    def waiting_joins(self) -> int:
+        return sum(1 for fut in self._joins if not fut.done())
+
+    async def acquire(self, join: bool) -> None:
+        if self.free > 0 and not self._joins and not self._others:
+            self.free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        (self._joins if join else self._others).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def release(self) -> None:
+        for waiters in (self._joins, self._others):
+            while waiters:
+                fut = waiters.popleft()
+                if not fut.done():
+                    fut.set_result(None)
+                    return
+        self.free += 1
+
+
+class UpdateProcessor(BaseUpdateProcessor):
+    """
+    Keyed dispatcher: up to max_concurrent_updates updates run at once, updates with the same
+    key run one at a time in arrival order. Marks updates complete on the queue and reports
+    when the startup backlog is drained.
+    """
+
+    def __init__(self, queue: UpdateQueue, max_concurrent_updates: int = 1) -> None:
+        super().__init__(max_concurrent_updates)
+        self.queue = queue
+        self.processed = 0
+        self.running = 0
+        self._entered = 0
+        # key -> [lock, updates holding or waiting for it]
+        self._keys: dict[int, list] = {}
+        self._key_waits = 0
+        self._key_wait_total = 0.0
+        self._key_wait_max = 0.0
+        self._catch_up_started: float | None = None
+        self._catch_up_processed = 0
+        # Used instead of the base class's FIFO semaphore
+        self._slots = _PrioritySlots(max_concurrent_updates)
+
+    def start_catch_up(self, pending_count: int) -> None:
+        """Log progress until the pending_count updates Telegram held for us are handled."""
+        if pending_count > 0:
+            self._catch_up_started = time.perf_counter()
+            self._catch_up_processed = self.processed
+            logger.info("Catching up on %s pending updates (join requests first)", pending_count)
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # Blocking/unblocking the bot (my_chat_member) is not activity
+        if isinstance(update, Update) and update.effective_user is not None and update.my_chat_member is None:
+            touch_user(update.effective_user.id)
+        key = update_key(update)
+        self._entered += 1
+        try:
+            if key is None:
+                await self._run(update, coroutine)
+                return
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+            try:
+                # asyncio.Lock wakes waiters FIFO, so same-key updates keep arrival order
+                started = time.perf_counter()
+                async with entry[0]:
+                    self._record_key_wait(time.perf_counter() - started)
+                    await self._run(update, coroutine)
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._keys[key]
+        finally:
+            self._entered -= 1
+            if isinstance(update, Update):
+                self.queue.complete(update.update_id)
+
+    async def _run(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Wait for a processing slot (join requests are admitted first) and handle the update."""
+        await self._slots.acquire(isinstance(update, Update) and update.chat_join_request is not None)
+        try:
+            await self.do_process_update(update, coroutine)
+        finally:
+            self._slots.release()
+
+    def _record_key_wait(self, seconds: float) -> None:
+        self._key_waits += 1
+        self._key_wait_total += seconds
+        if seconds > self._key_wait_max:
+            self._key_wait_max = seconds
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.running += 1
+        try:
+            with start_trace(
+                update_kind(update),
+                update_id=getattr(update, "update_id", None),
+                key=update_key(update),
+            ):
+                await coroutine
+        finally:
+            self.running -= 1
+            self.processed += 1
+            # Caught up when nothing is queued and no other update is waiting for a slot
+            if self._catch_up_started is not None and self.queue.empty() and self._entered <= 1:
+                logger.info(
+                    "Caught up: %s updates in %.1f s, %s duplicates skipped",
+                    self.processed - self._catch_up_processed,
+                    time.perf_counter() - self._catch_up_started,
+                    self.queue.duplicates,
+                )
+                self._catch_up_started = None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> DispatchStats:
+        return DispatchStats(
+            queued=self.queue.qsize(),
+            queued_joins=self.queue.queued_joins + self._slots.waiting_joins,
+            running=self.running,
+            waiting=self._entered - self.running,
+            concurrency=self.max_concurrent_updates,
+            capacity=self.queue.maxsize,
+            active_keys=len(self._keys),
+            busiest_key_depth=max((entry[1] for entry in self._keys.values()), default=0),
+            processed=self.processed,
+            duplicates=self.queue.duplicates,
+            avg_key_wait_ms=(self._key_wait_total / self._key_waits * 1000) if self._key_waits else 0.0,
+            max_key_wait_ms=self._key_wait_max * 1000,
+        )
+
+
+# One queue and processor per Application (per tenant when several bots share the process)
+_queues: TenantLocal[UpdateQueue] = TenantLocal(lambda: UpdateQueue(maxsize=UPDATE_QUEUE_SIZE))
+_processors: TenantLocal[UpdateProcessor] = TenantLocal(
+    lambda: UpdateProcessor(get_update_queue(), max(UPDATE_CONCURRENCY, 1))
+)
+_persisted_marks: TenantLocal[int] = TenantLocal(int)
+
+
+def get_update_queue() -> UpdateQueue:
+    """Get or create the update queue."""
+    return _queues.get()
+
+
+def get_update_processor() -> UpdateProcessor:
+    """Get or create the update processor."""
+    return _processors.get()
+
+
+GaugeFunc(
+    "bot_updates_queued",
+    "Updates received and waiting for a handler.",
+    lambda: sum(queue.qsize() for queue in _queues.values()),
+)
+GaugeFunc(
+    "bot_updates_running",
+    "Updates being handled right now.",
+    lambda: sum(processor.running for processor in _processors.values()),
+)
+GaugeFunc(
+    "bot_updates_waiting",
+    "Updates handed to the dispatcher but waiting for their user's previous update or a free slot.",
+    lambda: sum(processor.stats().waiting for processor in _processors.values()),
+)
+
+
+def get_dispatch_stats() -> DispatchStats:
+    """Queue depth, concurrency and per-key wait times."""
+    return get_update_processor().stats()
+
+
+def format_dispatch_stats(stats: DispatchStats) -> str:
+    """One-line dispatch stats for logs."""
+    return (
+        f"queued={stats.queued} (joins={stats.queued_joins}) running={stats.running}/{stats.concurrency} "
+        f"waiting={stats.waiting} keys={stats.active_keys} busiest_key={stats.busiest_key_depth} "
+        f"processed={stats.processed} duplicates={stats.duplicates} "
+        f"key_wait avg={stats.avg_key_wait_ms:.1f}ms max={stats.max_key_wait_ms:.1f}ms"
+    )
+
+
+async def load_high_water_mark() -> None:
+    """Restore the persisted high-water mark (called from post_init, before updates are fetched)."""
+    from bot.services.state_service import get_bot_state
+    try:
+        value = await get_bot_state(HIGH_WATER_MARK_KEY)
+        mark = int(value) if value else 0
+    except (DatabaseError, ValueError) as e:
+        logger.error("Could not load update high-water mark, deduping by window only | %s", e)
+        return
+    _persisted_marks.set(mark)
+    get_update_queue().high_water_mark = mark
+    logger.info("Update high-water mark: %s", mark)
+
+
+async def save_high_water_mark() -> None:
+    """Persist the high-water mark if it advanced or update_id was reset (periodic job and shutdown)."""
+    from bot.services.state_service import set_bot_state
+    queue = get_update_queue()
+    mark = queue.safe_high_water_mark()
+    if mark <= _persisted_marks.get() and not queue.ids_reset:
+        return
+    reset, queue.ids_reset = queue.ids_reset, False
+    try:
+        await set_bot_state(HIGH_WATER_MARK_KEY, str(mark))
+        _persisted_marks.set(mark)
+    except DatabaseError as e:
+        queue.ids_reset = queue.ids_reset or reset
+        logger.warning("Could not persist update high-water mark %s | %s", mark, e)
@@ -0,0 +1,182 @@
+"""
+Superadmin alerts - deduplicated and rate-limited.
+An alert's fingerprint is the exception class, the handler and the normalized message. The first
+alert with a fingerprint is sent right away; repeats within ALERT_COOLDOWN_SECONDS are only
+counted and rolled up into one digest message every ALERT_DIGEST_SECONDS. At most
+ALERT_MAX_PER_HOUR alert messages go out in total, so an outage can't spend the bot's
+API quota on telling the superadmin about itself.
+Besides CRITICAL handler errors, failed scheduler jobs and database circuit breaker state
+changes are alerted; those have no handler context, so they go through the bot registered
+with register_alert_bot.
+"""
+
+import asyncio
+import collections
+import time
+from dataclasses import dataclass
+
+from telegram import Bot
+
+from bot.config import (
+    ALERT_COOLDOWN_SECONDS,
+    ALERT_MAX_PER_HOUR,
+)
+from bot.tenants import TenantLocal, get_superadmin_id, tenant_context
+from bot.utils.error_aggregator import normalize_error_message
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Fingerprint = tuple[str, str, str]
+
+
+@dataclass
+class _AlertEntry:
+    last_sent: float
+    suppressed: int = 0
+
+
+class AlertLimiter:
+    """Decides which alerts are sent now and collects the rest for the digest."""
+
+    def __init__(self, cooldown: float, max_per_hour: int) -> None:
+        self.cooldown = cooldown
+        self.max_per_hour = max_per_hour
+        self._entries: dict[Fingerprint, _AlertEntry] = {}
+        self._sent: collections.deque = collections.deque()
+        self._last_digest = time.monotonic()
+
+    def _take_budget(self, now: float) -> bool:
+        while self._sent and now - self._sent[0] >= 3600:
+            self._sent.popleft()
+        if len(self._sent) >= self.max_per_hour:
+            return False
+        self._sent.append(now)
+        return True
+
+    def should_send(self, fingerprint: Fingerprint) -> bool:
+        """True if this alert goes out now; otherwise it is counted for the next digest."""
+        now = time.monotonic()
+        entry = self._entries.get(fingerprint)
+        if (entry is None or now - entry.last_sent >= self.cooldown) and self._take_budget(now):
+            if entry is None:
+                self._entries[fingerprint] = _AlertEntry(last_sent=now)
+            else:
+                entry.last_sent = now
+            return True
+        if entry is None:
+            # Over budget before the first alert of this kind went out
+            entry = self._entries[fingerprint] = _AlertEntry(last_sent=float("-inf"))
+        entry.suppressed += 1
+        return False
+
+    def digest(self, limit: int = 15) -> str | None:
+        """Text of the digest of suppressed repeats, or None if there is nothing to send (or no budget)."""
+        now = time.monotonic()
+        pending = [(fp, entry) for fp, entry in self._entries.items() if entry.suppressed]
+        if not pending:
+            self._last_digest = now
+            self._prune(now)
+            return None
+        if not self._take_budget(now):
+            # Keep counting; the next digest covers the longer window
+            return None
+        minutes = max(round((now - self._last_digest) / 60), 1)
+        pending.sort(key=lambda item: item[1].suppressed, reverse=True)
+        lines = [f"📋 Error digest (last {minutes} min)", ""]
+        for (exc_type, handler, message), entry in pending[:limit]:
+            lines.append(f"{exc_type} in {handler} ×{entry.suppressed}")
+            lines.append(f"  {message[:150]}")
+        if len(pending) > limit:
+            rest = sum(entry.suppressed for _, entry in pending[limit:])
+            lines.append(f"…and {rest} more in {len(pending) - limit} other kinds")
+        for _, entry in pending:
+            entry.suppressed = 0
+        self._last_digest = now
+        self._prune(now)
+        return "\n".join(lines)
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            fp for fp, entry in self._entries.items()
+            if not entry.suppressed and now - entry.last_sent >= self.cooldown
+        ]
+        for fp in expired:
+            del self._entries[fp]
+
+
+_limiters = TenantLocal(lambda: AlertLimiter(ALERT_COOLDOWN_SECONDS, ALERT_MAX_PER_HOUR))
+_bots: TenantLocal[Bot | None] = TenantLocal(lambda: None)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def register_alert_bot(bot: Bot) -> None:
+    """Bot that sends the current tenant's alerts raised outside handlers (called from post_init)."""
+    _bots.set(bot)
+
+
+def alert_fingerprint(exc: BaseException, handler: str | None) -> Fingerprint:
+    """(exception class, handler, normalized message)."""
+    return type(exc).__name__, handler or "unknown handler", normalize_error_message(str(exc))
+
+
+async def send_alert(bot: Bot, exc: BaseException, handler: str | None, text: str) -> None:
+    """Send `text` to the superadmin unless an alert like it was sent recently."""
+    await _send_alert(bot, alert_fingerprint(exc, handler), text)
+
+
+async def _send_alert(bot: Bot, fingerprint: Fingerprint, text: str) -> None:
+    superadmin_id = get_superadmin_id()
+    if not superadmin_id:
+        return
+    if not _limiters.get().should_send(fingerprint):
+        return
+    if ALERT_COOLDOWN_SECONDS > 0:
+        text += f"\n\nRepeats in the next {ALERT_COOLDOWN_SECONDS / 60:.0f} min are sent as a digest."
+    try:
+        await bot.send_message(chat_id=superadmin_id, text=text[:4000])
+    except Exception as e:
+        logger.exception("Failed to send alert to superadmin: %s", e)
+
+
+async def alert_job_failure(job: str, exc: Exception) -> None:
+    """Alert the current tenant's superadmin that scheduler job `job` failed."""
+    bot = _bots.get()
+    if bot is None:
+        return
+    text = (
+        f"🚨 Scheduled job failed\n\n"
+        f"Job: {job}\n"
+        f"Type: {type(exc).__name__}\n"
+        f"Message: {str(exc)[:200]}"
+    )
+    await send_alert(bot, exc, f"{job} job", text)
+
+
+def alert_all_tenants(fingerprint: Fingerprint, text: str) -> None:
+    """
+    Alert every tenant's superadmin in the background, for events of the whole process such
+    as the database going down. Call from the event loop (it may be a sync callback).
+    """
+    loop = asyncio.get_running_loop()
+    for tenant, bot in _bots.items():
+        if bot is None:
+            continue
+        with tenant_context(tenant):
+            task = loop.create_task(_send_alert(bot, fingerprint, text))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def send_alert_digest(bot: Bot) -> None:
+    """Send the digest of suppressed repeats, if any (scheduler job every ALERT_DIGEST_SECONDS)."""
+    superadmin_id = get_superadmin_id()
+    if not superadmin_id:
+        return
+    text = _limiters.get().digest()
+    if text is None:
+        return
+    try:
+        await bot.send_message(chat_id=superadmin_id, text=text[:4000])
+    except Exception as e:
+        logger.exception("Failed to send alert digest to superadmin: %s", e)
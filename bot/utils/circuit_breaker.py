@@ -0,0 +1,91 @@
+"""
+Circuit breaker - fail fast while a dependency is down instead of waiting on every call.
+Closed: calls pass. Open (after N consecutive failures): calls are refused.
+Half-open (reset_seconds after opening): one probe call is let through; success closes it.
+on_state_change(state, error) is called on every transition (e.g. to alert the superadmin).
+"""
+
+import time
+from typing import Callable
+
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (single event loop, no locking needed)."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        on_recover: Callable[[], None] | None = None,
+        on_state_change: Callable[[str, Exception | None], None] | None = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.on_recover = on_recover
+        self.on_state_change = on_state_change
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+            logger.warning("Circuit %s closed: dependency recovered", self.name)
+            if self.on_recover:
+                self.on_recover()
+
+    def record_failure(self, error: Exception | None = None) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            if self.state == CLOSED:
+                logger.error(
+                    "Circuit %s opened after %s consecutive failures | %s",
+                    self.name,
+                    self.failures,
+                    error,
+                )
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN, error)
+
+    def _set_state(self, state: str, error: Exception | None = None) -> None:
+        self.state = state
+        if self.on_state_change:
+            try:
+                self.on_state_change(state, error)
+            except Exception:
+                logger.exception("Circuit %s state change callback failed", self.name)
+
+    def release(self) -> None:
+        """Give up a probe slot without a verdict (e.g. the call was cancelled)."""
+        self._probing = False
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 when closed)."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
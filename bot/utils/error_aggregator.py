@@ -0,0 +1,113 @@
+"""
+Error aggregation - count repeated errors by fingerprint instead of logging each one.
+A fingerprint is the exception class plus its message with ids, numbers and quoted values
+normalized away, so "Chat 123 not found" and "Chat 456 not found" are one entry.
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+_NORMALIZE_PATTERNS = (
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "'…'"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "0x…"),
+    (re.compile(r"\d+(\.\d+)?"), "N"),
+)
+_MAX_MESSAGE_LENGTH = 200
+
+
+def normalize_error_message(message: str) -> str:
+    """Message with variable parts replaced, for grouping errors that differ only in ids/values."""
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return message.strip()[:_MAX_MESSAGE_LENGTH]
+
+
+def error_fingerprint(error: BaseException) -> tuple[str, str]:
+    """(exception class name, normalized message)."""
+    return type(error).__name__, normalize_error_message(str(error))
+
+
+@dataclass
+class _Entry:
+    count: int = 0
+    samples: list[str] = field(default_factory=list)
+
+
+class ErrorAggregator:
+    """
+    Collects errors for one operation (e.g. a broadcast): counts per fingerprint, the first few
+    sample subjects per fingerprint, and full tracebacks only for the first max_tracebacks
+    occurrences of each exception class. Call log_summary() periodically and at the end.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        logger: logging.Logger,
+        max_samples: int = 3,
+        max_tracebacks: int = 3,
+    ) -> None:
+        self.label = label
+        self.logger = logger
+        self.max_samples = max_samples
+        self.max_tracebacks = max_tracebacks
+        self.total = 0
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._tracebacks: dict[str, int] = {}
+        self._last_summary = time.monotonic()
+
+    def record(self, error: BaseException, subject: object = None, traceback: bool = True) -> None:
+        """Count an error. traceback=False for expected errors (e.g. user blocked the bot)."""
+        self.total += 1
+        fingerprint = error_fingerprint(error)
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            entry = self._entries[fingerprint] = _Entry()
+        entry.count += 1
+        if subject is not None and len(entry.samples) < self.max_samples:
+            entry.samples.append(str(subject))
+        if not traceback:
+            return
+        class_name = fingerprint[0]
+        logged = self._tracebacks.get(class_name, 0)
+        if logged < self.max_tracebacks:
+            self._tracebacks[class_name] = logged + 1
+            self.logger.error(
+                "%s | %s for %s (traceback %s of max %s for this error class)",
+                self.label,
+                class_name,
+                subject,
+                logged + 1,
+                self.max_tracebacks,
+                exc_info=error,
+            )
+
+    def summary_lines(self, limit: int = 10) -> list[str]:
+        """Most frequent fingerprints first: "count× Class: message (e.g. a, b, c)"."""
+        ranked = sorted(self._entries.items(), key=lambda item: item[1].count, reverse=True)
+        lines = []
+        for (class_name, message), entry in ranked[:limit]:
+            examples = f" (e.g. {', '.join(entry.samples)})" if entry.samples else ""
+            lines.append(f"{entry.count}× {class_name}: {message}{examples}")
+        if len(ranked) > limit:
+            rest = sum(entry.count for _, entry in ranked[limit:])
+            lines.append(f"{rest}× in {len(ranked) - limit} other error kinds")
+        return lines
+
+    def summary_due(self, interval: float) -> bool:
+        return interval > 0 and time.monotonic() - self._last_summary >= interval
+
+    def log_summary(self, final: bool = False) -> None:
+        """Log one compact summary of everything recorded so far."""
+        self._last_summary = time.monotonic()
+        if not self.total:
+            return
+        self.logger.warning(
+            "%s | %s errors %s:\n  %s",
+            self.label,
+            self.total,
+            "in total" if final else "so far",
+            "\n  ".join(self.summary_lines()),
+        )
@@ -5,11 +5,14 @@ Never exposes raw tracebacks to users.
 """
 
 import traceback
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 from telegram import Update
 
-from bot.config import DEBUG, SUPERADMIN_ID
+from bot.config import DEBUG
+from bot.tenants import get_superadmin_id
+from bot.utils.alerts import send_alert
 from bot.utils.exceptions import BotBaseError
 from bot.utils.logger import get_logger
 
@@ -42,13 +45,22 @@ def _sanitize_update(update: object) -> dict:
     return data
 
 
+_HANDLERS_DIR = str(Path(__file__).parent.parent / "handlers")
+
+
 def _get_handler_name(context: "ContextTypes.DEFAULT_TYPE") -> str | None:
     """Get the name of the handler that raised the error if possible."""
-    if not context or not hasattr(context, "handler"):
+    if not context:
         return None
     handler = getattr(context, "handler", None)
     if handler:
         return getattr(handler, "callback", handler).__qualname__
+    # The context doesn't carry the handler; the outermost frame in bot/handlers/ is it
+    exc = getattr(context, "error", None)
+    if exc is not None:
+        for frame in traceback.extract_tb(exc.__traceback__):
+            if frame.filename.startswith(_HANDLERS_DIR):
+                return frame.name
     return None
 
 
@@ -114,22 +126,16 @@ async def global_error_handler(
     except Exception as send_err:
         logger.exception("Failed to send error message to user: %s", send_err)
 
-    # Admin alert for CRITICAL (no traceback via Telegram)
-    if log_level == "CRITICAL" and SUPERADMIN_ID:
-        try:
-            bot = context.bot if context else None
-            if bot:
-                summary = (
-                    f"🚨 CRITICAL Error\n\n"
-                    f"Type: {exc_type}\n"
-                    f"Message: {exc_msg[:200]}\n"
-                    f"User ID: {user_id}\n"
-                    f"Chat ID: {chat_id}\n"
-                    f"Handler: {handler_name}"
-                )
-                await bot.send_message(
-                    chat_id=SUPERADMIN_ID,
-                    text=summary[:4000],
-                )
-        except Exception as alert_err:
-            logger.exception("Failed to send CRITICAL alert to superadmin: %s", alert_err)
+    # Admin alert for CRITICAL (no traceback via Telegram); repeats are rolled up into a digest
+    if log_level == "CRITICAL" and get_superadmin_id():
+        bot = context.bot if context else None
+        if bot:
+            summary = (
+                f"🚨 CRITICAL Error\n\n"
+                f"Type: {exc_type}\n"
+                f"Message: {exc_msg[:200]}\n"
+                f"User ID: {user_id}\n"
+                f"Chat ID: {chat_id}\n"
+                f"Handler: {handler_name}"
+            )
+            await send_alert(bot, exc, handler_name, summary)
@@ -17,6 +17,14 @@ class DatabaseError(BotBaseError):
     """Raised when a database operation fails."""
 
 
+class DatabaseUnavailableError(DatabaseError):
+    """Raised when the database is unreachable or its circuit breaker is open."""
+
+
+class DatabaseBusyError(DatabaseError):
+    """Raised when no pooled connection frees up in time (the database itself is reachable)."""
+
+
 class BroadcastError(BotBaseError):
     """Raised when a broadcast operation fails (aggregate or fatal)."""
 
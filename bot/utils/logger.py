@@ -2,13 +2,37 @@
 Structured logging for the bot.
 Uses Python logging module with configurable format and levels.
 All exceptions must use logger.exception() for full traceback capture.
+
+Records are handed to a bounded in-memory queue (QueueHandler) and written by a background
+listener thread, so file and console I/O never run on the event loop. If the queue is full,
+records are dropped and counted rather than blocking. The log file rotates by size or on a
+schedule, and rotated files are gzip-compressed. LOG_JSON=true writes one JSON object per line.
 """
 
+import atexit
+import copy
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
 
-from bot.config import LOG_LEVEL, LOG_FILE, DEBUG
+from bot.config import (
+    LOG_LEVEL,
+    LOG_FILE,
+    DEBUG,
+    LOG_JSON,
+    LOG_ROTATE_WHEN,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_COMPRESS,
+    LOG_QUEUE_SIZE,
+)
 
 # Ensure logs directory exists
 Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
@@ -19,25 +43,119 @@ LOG_FORMAT = (
 )
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, exc (if any) and extra={...} fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may change after this call); tracebacks are formatted later
+        # by the listener thread, which also keeps linecache reads off the event loop
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _build_file_handler() -> logging.Handler:
+    if LOG_ROTATE_WHEN:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", utc=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    if LOG_COMPRESS:
+        handler.namer = lambda name: name + ".gz"
+        handler.rotator = _gzip_rotator
+    return handler
+
+
 # Create formatter
-_formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+_formatter = JsonFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
 
-# File handler
-_file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+# File handler (rotating, written by the listener thread)
+_file_handler = _build_file_handler()
 _file_handler.setFormatter(_formatter)
 
 # Console handler
 _console_handler = logging.StreamHandler(sys.stdout)
 _console_handler.setFormatter(_formatter)
 
+_log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_queue_handler = _DroppingQueueHandler(_log_queue)
+_listener = logging.handlers.QueueListener(
+    _log_queue, _file_handler, _console_handler, respect_handler_level=True
+)
+
 # Root logger
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL, logging.INFO),
-    format=LOG_FORMAT,
-    datefmt=DATE_FORMAT,
-    handlers=[_file_handler, _console_handler],
+    handlers=[_queue_handler],
     force=True,
 )
+_listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread (also runs at interpreter exit)."""
+    global _listener
+    if _listener is not None:
+        if _DroppingQueueHandler.dropped:
+            _log_queue.put(logging.makeLogRecord({
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": "%s log records were dropped because the log queue was full",
+                "args": (_DroppingQueueHandler.dropped,),
+            }))
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def get_dropped_log_count() -> int:
+    """Records dropped since startup because the log queue was full."""
+    return _DroppingQueueHandler.dropped
 
 
 def get_logger(name: str) -> logging.Logger:
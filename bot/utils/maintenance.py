@@ -1,13 +1,13 @@
 """
-Maintenance mode - server-only (env MAINTENANCE=true).
+Maintenance mode - server-only (env MAINTENANCE=true, or "maintenance" in the tenants file).
 When enabled, non-admin users see a maintenance message; admins can use the bot normally.
 """
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from bot.config import MAINTENANCE
 from bot.services.user_service import is_admin
+from bot.tenants import maintenance_enabled
 
 MAINTENANCE_MESSAGE = (
     "🔧 **Bot is under maintenance**\n\n"
@@ -21,7 +21,7 @@ async def check_maintenance(update: Update, context: ContextTypes.DEFAULT_TYPE)
     Caller should return immediately when True.
     Returns False if bot should process normally.
     """
-    if not MAINTENANCE:
+    if not maintenance_enabled():
         return False
     user = update.effective_user
     if not user:
@@ -0,0 +1,354 @@
+"""
+In-process metrics in Prometheus text format, served on a local HTTP endpoint (METRICS_PORT).
+Recording is cheap enough for the hot path: every metric child is created once and cached,
+histogram buckets are pre-allocated lists, and all updates happen on the event loop thread,
+so plain increments are safe without locks.
+"""
+
+import asyncio
+import bisect
+import functools
+import time
+from typing import Any, Callable, Iterable
+
+from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
+
+from bot.config import METRICS_LISTEN, METRICS_PORT
+from bot.utils.logger import get_dropped_log_count, get_logger
+from bot.utils.tracing import span
+
+logger = get_logger(__name__)
+
+# Seconds; covers a fast cached lookup up to a slow Bot API upload
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+_server: "MetricsServer | None" = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any):
+        """Child for these label values; hold on to it in hot code to skip the lookup."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: tuple[str, ...], child) -> list[str]:
+        return [f"{self.name}{_labels_text(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class GaugeFunc(_Metric):
+    """Gauge read from a callback at scrape time (pool sizes, queue depth)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, func: Callable[[], float | None]) -> None:
+        self.func = func
+        super().__init__(name, documentation)
+
+    def _new_child(self) -> None:
+        return None
+
+    def render(self) -> list[str]:
+        try:
+            value = self.func()
+        except Exception:
+            logger.exception("Metric callback %s failed", self.name)
+            return []
+        if value is None:
+            return []
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_value(value)}",
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "counts", "sum")
+
+    def __init__(self, upper: tuple[float, ...]) -> None:
+        self._upper = upper
+        # One slot per bucket plus +Inf; cumulative counts are built at scrape time
+        self.counts = [0] * (len(upper) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self._upper, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram (seconds)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def total_count(self) -> int:
+        """Observations across all label values (the benchmarks diff this around a run)."""
+        return sum(sum(child.counts) for child in list(self._children.values()))
+
+    def _render_child(self, key: tuple[str, ...], child: _HistogramChild) -> list[str]:
+        lines = []
+        cumulative = 0
+        for upper, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = f'le="{_format_value(upper)}"'
+            lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le)} {cumulative}")
+        labels = _labels_text(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {child.sum!r}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Metrics recorded across the bot
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds", "Time spent in an update handler.", ["handler"]
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Update handlers that raised an exception.", ["handler"]
+)
+DB_QUERY_LATENCY = Histogram(
+    "bot_db_query_duration_seconds", "Database call time, including pool wait.", ["operation"]
+)
+DB_ERRORS = Counter(
+    "bot_db_errors_total", "Failed database calls by kind (unavailable, busy, query, rejected).", ["kind"]
+)
+DB_POOL_WAIT = Histogram(
+    "bot_db_pool_wait_seconds", "Time waiting for a pooled database connection.", ["pool"]
+)
+BOT_API_LATENCY = Histogram(
+    "bot_api_request_duration_seconds", "Telegram Bot API request time.", ["method"]
+)
+BOT_API_ERRORS = Counter(
+    "bot_api_errors_total", "Telegram Bot API errors by method and error class.", ["method", "error"]
+)
+BROADCAST_MESSAGES = Counter(
+    "bot_broadcast_messages_total", "Broadcast sends by result (delivered, failed, blocked).", ["result"]
+)
+BROADCAST_RETRY_AFTER = Counter(
+    "bot_broadcast_retry_after_total", "Broadcast sends answered with 429 RetryAfter."
+)
+BROADCAST_RATE = Gauge(
+    "bot_broadcast_last_rate_messages_per_second", "Send rate of the most recent broadcast."
+)
+
+LOG_RECORDS_DROPPED = GaugeFunc(
+    "bot_log_records_dropped",
+    "Log records dropped since startup because the log queue was full.",
+    get_dropped_log_count,
+)
+
+
+def instrument_handler(callback: Callable) -> Callable:
+    """Wrap an update handler callback to record its latency, errors and a trace span under its name."""
+    latency = HANDLER_LATENCY.labels(callback.__name__)
+    errors = HANDLER_ERRORS.labels(callback.__name__)
+    span_name = f"handler.{callback.__name__}"
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            with span(span_name):
+                return await callback(update, context)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """Bot API transport that records latency, error class and a trace span per API method."""
+
+    async def post(self, url: str, *args, **kwargs):
+        method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        try:
+            with span(f"api.{method}"):
+                return await super().post(url, *args, **kwargs)
+        except TelegramError as e:
+            BOT_API_ERRORS.labels(method, type(e).__name__).inc()
+            raise
+        finally:
+            BOT_API_LATENCY.labels(method).observe(time.perf_counter() - started)
+
+
+class MetricsServer:
+    """Serves GET /metrics; anything else is 404. Bind it to localhost or a private interface."""
+
+    def __init__(self, listen: str, port: int) -> None:
+        self.listen = listen
+        self.port = port
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.listen, self.port)
+        logger.info("Metrics endpoint on http://%s:%s/metrics", self.listen, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # One deadline for the whole request, so a client trickling header lines cannot hold it
+            request_line = await asyncio.wait_for(self._read_head(reader), 10)
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+                status, body = "200 OK", render_metrics().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # ValueError: a line longer than the stream limit
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> bytes:
+        """Read the request line and skip the headers."""
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        return request_line
+
+
+async def start_metrics_server() -> None:
+    """Start the endpoint if METRICS_PORT is set (called from post_init)."""
+    global _server
+    if METRICS_PORT <= 0 or _server is not None:
+        return
+    server = MetricsServer(METRICS_LISTEN, METRICS_PORT)
+    try:
+        await server.start()
+    except OSError as e:
+        logger.error("Could not start metrics endpoint on %s:%s | %s", METRICS_LISTEN, METRICS_PORT, e)
+        return
+    _server = server
+
+
+async def stop_metrics_server() -> None:
+    """Stop the endpoint (called from post_shutdown)."""
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -0,0 +1,107 @@
+"""
+Keyset pagination for admin lists ordered newest first by (timestamp, id).
+A page boundary is a PageCursor small enough for callback data; the next page is an index
+seek "(ts, id) < cursor" instead of an OFFSET scan over every row already shown.
+Rows with a NULL timestamp have no place in that order and are left out.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+OLDER = "o"
+NEWER = "n"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """(timestamp, id) of a boundary row."""
+
+    at: datetime
+    id: int
+
+    @classmethod
+    def from_row(cls, at, row_id: int) -> "PageCursor | None":
+        """Build from column values (None for a NULL timestamp); SQLite returns timestamps as text."""
+        if at is None:
+            return None
+        if isinstance(at, str):
+            at = datetime.fromisoformat(at)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        return cls(at, int(row_id))
+
+    def encode(self) -> str:
+        """Compact text form: microseconds since the epoch and id."""
+        micros = (self.at - _EPOCH) // timedelta(microseconds=1)
+        return f"{micros}.{self.id}"
+
+    @classmethod
+    def decode(cls, text: str) -> "PageCursor":
+        """Inverse of encode. Raises ValueError for malformed text."""
+        micros, row_id = text.split(".")
+        return cls(_EPOCH + timedelta(microseconds=int(micros)), int(row_id))
+
+
+@dataclass
+class Page:
+    """One page of rows plus the cursors for the neighbouring pages (None at either end)."""
+
+    rows: list[dict]
+    newer: PageCursor | None
+    older: PageCursor | None
+
+
+async def fetch_page(
+    fetch: Callable[..., Awaitable[list]],
+    select: str,
+    conditions: list[str],
+    args: list,
+    ts_column: str,
+    id_column: str,
+    limit: int,
+    cursor: PageCursor | None = None,
+    direction: str = OLDER,
+) -> Page:
+    """
+    Fetch `limit` rows of `select` (filtered by `conditions` over `args`) older or newer than
+    `cursor`, newest first; no cursor means the newest page. fetch(query, *args) runs the query.
+    Needs an index on (ts_column DESC, id_column DESC) to be a seek. Rows whose ts_column is
+    NULL are skipped (PostgreSQL would sort them first and they cannot be a cursor).
+    """
+    where = list(conditions) + [f"{ts_column} IS NOT NULL"]
+    params = list(args)
+    if cursor is not None:
+        op = "<" if direction == OLDER else ">"
+        params += [cursor.at, cursor.id]
+        where.append(f"({ts_column}, {id_column}) {op} (${len(params) - 1}::timestamptz, ${len(params)}::bigint)")
+    order = "DESC" if cursor is None or direction == OLDER else "ASC"
+    params.append(limit + 1)
+    query = (
+        select
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + f" ORDER BY {ts_column} {order}, {id_column} {order} LIMIT ${len(params)}"
+    )
+    rows = [dict(r) for r in await fetch(query, *params)]
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    if cursor is not None and direction == NEWER:
+        if not more:
+            # Reached the newest rows: show a full first page rather than a short one
+            return await fetch_page(fetch, select, conditions, args, ts_column, id_column, limit)
+        rows.reverse()
+        has_newer, has_older = True, True
+    else:
+        has_newer, has_older = cursor is not None, more
+
+    def boundary(row: dict) -> PageCursor | None:
+        return PageCursor.from_row(row[ts_column], row[id_column])
+
+    return Page(
+        rows=rows,
+        newer=boundary(rows[0]) if rows and has_newer else None,
+        older=boundary(rows[-1]) if rows and has_older else None,
+    )
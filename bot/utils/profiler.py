@@ -0,0 +1,196 @@
+"""
+On-demand profiling of the live process (superadmin /profile command).
+A background thread samples the event loop thread's stack every few milliseconds and
+tracemalloc records allocations, both only for the requested window - nothing runs otherwise.
+Full results (collapsed stacks for flamegraph tools, allocation statistics) go to logs/profiles/.
+"""
+
+import asyncio
+import collections
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from bot.config import LOG_FILE, ROOT_DIR
+from bot.utils.exceptions import ValidationError
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_DIR = Path(LOG_FILE).parent / "profiles"
+SAMPLE_INTERVAL = 0.005
+MAX_SECONDS = 300
+
+_lock = asyncio.Lock()
+
+_Frame = tuple[str, int, str]
+
+
+@dataclass
+class ProfileReport:
+    """Summary of one profiling run."""
+
+    seconds: float
+    samples: int
+    idle_ratio: float
+    top_functions: list[tuple[str, float, float]] = field(default_factory=list)
+    top_allocations: list[tuple[str, int, int]] = field(default_factory=list)
+    growth: list[tuple[str, int, int]] = field(default_factory=list)
+    files: list[Path] = field(default_factory=list)
+
+
+def _describe(frame: _Frame) -> str:
+    filename, lineno, name = frame
+    path = Path(filename)
+    try:
+        path = path.relative_to(ROOT_DIR)
+    except ValueError:
+        path = Path(*path.parts[-2:]) if len(path.parts) > 1 else path
+    return f"{name} ({path}:{lineno})"
+
+
+def _is_idle(frame: _Frame) -> bool:
+    """The event loop waiting in select/epoll means there was nothing to run."""
+    filename, _, name = frame
+    return filename.endswith("selectors.py") and name == "select"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.idle = 0
+        self.self_counts: collections.Counter = collections.Counter()
+        self.total_counts: collections.Counter = collections.Counter()
+        self.stacks: collections.Counter = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: list[_Frame] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.samples += 1
+            if _is_idle(stack[0]):
+                self.idle += 1
+                continue
+            self.self_counts[stack[0]] += 1
+            for item in set(stack):
+                self.total_counts[item] += 1
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _write_files(stamp: str, sampler: _StackSampler, snapshot: tracemalloc.Snapshot) -> list[Path]:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    cpu_path = PROFILE_DIR / f"profile-{stamp}.collapsed"
+    with cpu_path.open("w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(";".join(_describe(frame).replace(";", ",") for frame in stack) + f" {count}\n")
+    mem_path = PROFILE_DIR / f"profile-{stamp}-memory.txt"
+    with mem_path.open("w", encoding="utf-8") as f:
+        for stat in snapshot.statistics("traceback")[:200]:
+            f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format():
+                f.write(f"  {line}\n")
+    return [cpu_path, mem_path]
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+async def run_profile(seconds: float) -> ProfileReport:
+    """
+    Profile CPU and allocations for `seconds`. Only one run at a time.
+    Memory growth compares the snapshot at the end with the one taken at the start.
+    """
+    if not 1 <= seconds <= MAX_SECONDS:
+        raise ValidationError(f"Profile duration must be between 1 and {MAX_SECONDS} seconds")
+    if _lock.locked():
+        raise ValidationError("A profile is already running")
+
+    async with _lock:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        baseline = _snapshot()
+        sampler = _StackSampler(threading.get_ident(), SAMPLE_INTERVAL)
+        started = time.perf_counter()
+        sampler.start()
+        logger.info("Profiling started for %s s", seconds)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            elapsed = time.perf_counter() - started
+            await asyncio.to_thread(sampler.stop)
+            snapshot = _snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+        busy = max(sampler.samples - sampler.idle, 1)
+        report = ProfileReport(
+            seconds=elapsed,
+            samples=sampler.samples,
+            idle_ratio=sampler.idle / sampler.samples if sampler.samples else 1.0,
+            top_functions=[
+                (_describe(frame), count / busy * 100, sampler.total_counts[frame] / busy * 100)
+                for frame, count in sampler.self_counts.most_common(10)
+            ],
+            top_allocations=[
+                (str(stat.traceback[0]), stat.size, stat.count)
+                for stat in snapshot.statistics("lineno")[:10]
+            ],
+            growth=[
+                (str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                for stat in snapshot.compare_to(baseline, "lineno")[:10]
+                if stat.size_diff > 0
+            ],
+        )
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        report.files = await asyncio.to_thread(_write_files, stamp, sampler, snapshot)
+        logger.info(
+            "Profiling finished | %s samples, %.0f%% idle, files: %s",
+            report.samples,
+            report.idle_ratio * 100,
+            ", ".join(str(p) for p in report.files),
+        )
+        return report
+
+
+def format_profile_report(report: ProfileReport) -> str:
+    """Plain-text summary that fits in one Telegram message."""
+    lines = [
+        f"Profile: {report.seconds:.0f} s, {report.samples} samples, event loop idle {report.idle_ratio:.0%}",
+        "",
+        "Top functions (self % / total % of busy samples):",
+    ]
+    lines += [f"{s:5.1f}% {t:5.1f}%  {name}" for name, s, t in report.top_functions] or ["  (no busy samples)"]
+    lines += ["", "Top allocation sites (live at end):"]
+    lines += [f"{size / 1024:8.1f} KiB {count:6} blocks  {site}" for site, size, count in report.top_allocations]
+    lines += ["", "Growth since the start snapshot:"]
+    lines += [f"{diff / 1024:+8.1f} KiB {count:+6} blocks  {site}" for site, diff, count in report.growth] or ["  (none)"]
+    lines += ["", "Saved: " + ", ".join(p.name for p in report.files)]
+    text = "\n".join(lines)
+    return text if len(text) <= 4000 else text[:3990] + "\n…"
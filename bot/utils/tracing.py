@@ -0,0 +1,200 @@
+"""
+Lightweight tracing - where the time in one update went.
+Each update gets a trace whose id is carried in a contextvar, so spans opened in handlers,
+services, database calls and Bot API calls attach to it without passing anything around.
+Spans are plain in-memory records; a trace is only written out if the whole update took
+longer than TRACE_SLOW_MS, as one JSON line in TRACE_FILE.
+"""
+
+import asyncio
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from bot.config import TRACE_SLOW_MS, TRACE_FILE, TRACE_MAX_SPANS
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_write_lock = threading.Lock()
+_MAX_ATTR_LENGTH = 160
+
+
+def _compact(value: Any) -> Any:
+    """Attribute values are stored as given and only shortened when a trace is exported."""
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value if len(value) <= _MAX_ATTR_LENGTH else value[:_MAX_ATTR_LENGTH] + "…"
+    return value
+
+
+class _Span:
+    __slots__ = ("name", "parent", "start", "end", "attrs", "error")
+
+    def __init__(self, name: str, parent: int, start: float, attrs: dict) -> None:
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.end = start
+        self.attrs = attrs
+        self.error: str | None = None
+
+
+class Trace:
+    """Spans recorded for one update. Span parents are indexes into `spans` (-1 = root)."""
+
+    __slots__ = ("trace_id", "name", "attrs", "started", "wall_started", "spans", "dropped", "finished")
+
+    def __init__(self, name: str, attrs: dict) -> None:
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans: list[_Span] = []
+        self.dropped = 0
+        self.finished = False
+
+    def to_dict(self, duration: float) -> dict:
+        def ms(seconds: float) -> float:
+            return round(seconds * 1000, 2)
+
+        spans = []
+        for item in self.spans:
+            entry: dict[str, Any] = {
+                "name": item.name,
+                "parent": item.parent,
+                "start_ms": ms(item.start - self.started),
+                "duration_ms": ms(item.end - item.start),
+            }
+            if item.attrs:
+                entry["attrs"] = {key: _compact(value) for key, value in item.attrs.items()}
+            if item.error:
+                entry["error"] = item.error
+            spans.append(entry)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started": datetime.fromtimestamp(self.wall_started, timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": ms(duration),
+            "attrs": self.attrs,
+            "spans": spans,
+            "dropped_spans": self.dropped,
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_current_span: ContextVar[int] = ContextVar("trace_span", default=-1)
+
+
+def current_trace_id() -> str | None:
+    """Id of the trace this code runs under, if any (for log lines and error reports)."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def start_trace(name: str, **attrs: Any) -> Iterator[Trace | None]:
+    """Root of a trace (one per update). Does nothing if tracing is off or a trace is already active."""
+    if TRACE_SLOW_MS <= 0 or _current_trace.get() is not None:
+        yield None
+        return
+    trace = Trace(name, attrs)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(-1)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace.finished = True
+        duration = time.perf_counter() - trace.started
+        if duration * 1000 >= TRACE_SLOW_MS:
+            _export(trace, duration)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """Time a block as a child of the current span. A no-op outside a trace."""
+    trace = _current_trace.get()
+    if trace is None or trace.finished:
+        yield
+        return
+    if len(trace.spans) >= TRACE_MAX_SPANS:
+        trace.dropped += 1
+        yield
+        return
+    item = _Span(name, _current_span.get(), time.perf_counter(), attrs)
+    trace.spans.append(item)
+    token = _current_span.set(len(trace.spans) - 1)
+    try:
+        yield
+    except BaseException as e:
+        item.error = type(e).__name__
+        raise
+    finally:
+        item.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def traced(name: str | None = None) -> Callable:
+    """Decorator: run an async function inside a span (default name: module.function)."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _slowest_leaf(trace: Trace) -> _Span | None:
+    parents = {item.parent for item in trace.spans}
+    leaves = [item for index, item in enumerate(trace.spans) if index not in parents]
+    return max(leaves, key=lambda item: item.end - item.start, default=None)
+
+
+def _append_line(line: str) -> None:
+    with _write_lock:
+        path = Path(TRACE_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _write(line: str) -> None:
+    try:
+        _append_line(line)
+    except OSError as e:
+        logger.error("Could not write slow trace to %s | %s", TRACE_FILE, e)
+
+
+def _export(trace: Trace, duration: float) -> None:
+    line = json.dumps(trace.to_dict(duration), ensure_ascii=False, default=str)
+    slowest = _slowest_leaf(trace)
+    logger.warning(
+        "Slow update %s: %.0f ms (trace %s)%s",
+        trace.name,
+        duration * 1000,
+        trace.trace_id,
+        f", slowest step {slowest.name} {(slowest.end - slowest.start) * 1000:.0f} ms" if slowest else "",
+    )
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write(line)
+        return
+    # File I/O off the event loop
+    loop.run_in_executor(None, _write, line)
@@ -0,0 +1,135 @@
+"""
+Anonymized capture of incoming updates (UPDATE_CAPTURE_FILE), for replaying real traffic
+shapes with `python -m bot.bench.load --replay`.
+User and chat ids are replaced by salted hashes (the same user keeps the same fake id),
+names and message text are masked, and contact/location data is dropped. Anonymizing and
+writing happen on a background thread; the event loop only converts the update to a dict.
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+from typing import Any
+
+from telegram import Update
+
+from bot.config import UPDATE_CAPTURE_FILE, UPDATE_CAPTURE_SAMPLE, UPDATE_CAPTURE_SALT
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_ID_KEYS = {"id", "user_id", "user_chat_id", "chat_id", "sender_chat_id", "migrate_to_chat_id", "migrate_from_chat_id"}
+_NAME_KEYS = {"first_name", "last_name", "username", "title", "bio", "description", "invite_link", "name"}
+_TEXT_KEYS = {"text", "caption", "query"}
+_DROP_KEYS = {"phone_number", "email", "contact", "location", "venue", "url", "vcard"}
+_COMMAND_RE = re.compile(r"^/[A-Za-z0-9_]+(@[A-Za-z0-9_]+)?")
+_QUEUE_SIZE = 10000
+
+_salt = UPDATE_CAPTURE_SALT or os.urandom(16).hex()
+_queue_handler: "_CaptureQueueHandler | None" = None
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _fake_id(value: int, salt: str) -> int:
+    digest = hashlib.blake2b(f"{salt}:{abs(value)}".encode(), digest_size=8).digest()
+    fake = 1_000_000_000 + int.from_bytes(digest, "big") % 9_000_000_000
+    return -fake if value < 0 else fake
+
+
+def _mask_text(text: str) -> str:
+    """Keep a leading /command (handlers route on it), mask everything else but keep its shape."""
+    match = _COMMAND_RE.match(text)
+    command = match.group(0) if match else ""
+    return command + re.sub(r"\S", "x", text[len(command):])
+
+
+def anonymize_update(data: Any, salt: str) -> Any:
+    """Copy of an update dict with personal data replaced or removed."""
+    if isinstance(data, list):
+        return [anonymize_update(item, salt) for item in data]
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for key, value in data.items():
+        if key in _DROP_KEYS:
+            continue
+        if key in _ID_KEYS and isinstance(value, int) and not isinstance(value, bool):
+            result[key] = _fake_id(value, salt)
+        elif key in _NAME_KEYS and isinstance(value, str):
+            result[key] = "x" * min(len(value), 64)
+        elif key in _TEXT_KEYS and isinstance(value, str):
+            result[key] = _mask_text(value)
+        else:
+            result[key] = anonymize_update(value, salt)
+    return result
+
+
+class _CaptureFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {"ts": round(record.created, 3), "update": anonymize_update(record.msg, _salt)},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+
+class _CaptureQueueHandler(logging.handlers.QueueHandler):
+    """Hands the raw dict to the writer thread unformatted; drops records when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _CaptureQueueHandler.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def capture_update(update: Update) -> None:
+    """Record an accepted update (called by the update queue); no-op unless capture is on."""
+    if _queue_handler is None:
+        return
+    if UPDATE_CAPTURE_SAMPLE < 1 and random.random() >= UPDATE_CAPTURE_SAMPLE:
+        return
+    record = logging.LogRecord(__name__, logging.INFO, "", 0, update.to_dict(), None, None)
+    _queue_handler.handle(record)
+
+
+def start_update_capture() -> None:
+    """Start the writer thread if UPDATE_CAPTURE_FILE is set (called from post_init)."""
+    global _queue_handler, _listener
+    if not UPDATE_CAPTURE_FILE or _listener is not None:
+        return
+    try:
+        file_handler = logging.FileHandler(UPDATE_CAPTURE_FILE, encoding="utf-8")
+    except OSError as e:
+        logger.error("Could not open update capture file %s | %s", UPDATE_CAPTURE_FILE, e)
+        return
+    file_handler.setFormatter(_CaptureFormatter())
+    records: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(records, file_handler)
+    _listener.start()
+    _queue_handler = _CaptureQueueHandler(records)
+    logger.info("Capturing anonymized updates to %s (sample %.0f%%)", UPDATE_CAPTURE_FILE, UPDATE_CAPTURE_SAMPLE * 100)
+
+
+def stop_update_capture() -> None:
+    """Flush and close the capture file (called from post_shutdown)."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    _queue_handler = None
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    if _CaptureQueueHandler.dropped:
+        logger.warning("%s updates were not captured because the capture queue was full", _CaptureQueueHandler.dropped)
@@ -0,0 +1,167 @@
+"""
+Append-only local spool for database writes made while the database is unreachable.
+Each line is one JSON record {"q": query, "a": args}; datetimes are tagged so they round-trip.
+Replay renames the file first, so writes spooled during a replay land in a fresh file, and
+applies it in chunks; writes the database rejects are moved to a ".failed" file.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator
+
+from bot.utils.exceptions import DatabaseError, DatabaseUnavailableError
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_DT_TAG = "$dt"
+# Spooled writes applied per transaction during a replay
+REPLAY_CHUNK = 500
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {_DT_TAG: value.isoformat()}
+    raise TypeError(f"Cannot spool value of type {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and _DT_TAG in obj:
+        return datetime.fromisoformat(obj[_DT_TAG])
+    return obj
+
+
+class WriteSpool:
+    """File-backed queue of (query, args) writes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.replay_path = self.path.with_suffix(self.path.suffix + ".replaying")
+        # Number of replay_path lines already applied, kept across restarts
+        self.progress_path = self.path.with_suffix(self.path.suffix + ".replayed")
+        # Dead letters: records that failed on their own for a reason other than an outage
+        self.failed_path = self.path.with_suffix(self.path.suffix + ".failed")
+        replaying = max(0, self._count_lines(self.replay_path) - self._replayed_lines())
+        self.pending = self._count_lines(self.path) + replaying
+        self.failed = self._count_lines(self.failed_path)
+
+    @staticmethod
+    def _count_lines(path: Path) -> int:
+        if not path.exists():
+            return 0
+        with open(path, "rb") as f:
+            return sum(1 for _ in f)
+
+    def append(self, query: str, args: tuple) -> None:
+        """Persist one write. Raises OSError/TypeError if it cannot be stored."""
+        line = json.dumps({"q": query, "a": list(args)}, default=_encode, ensure_ascii=False)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        if self.pending == 0:
+            logger.warning("Database unavailable: spooling writes to %s", self.path)
+        self.pending += 1
+
+    def _read_records(self, skip: int) -> Iterator[tuple[int, str, str, tuple]]:
+        """Yield (line number, raw line, query, args) of the replay file after the first `skip` lines."""
+        with open(self.replay_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line_no <= skip or not line.strip():
+                    continue
+                try:
+                    record = json.loads(line, object_hook=_decode)
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave one torn line at the end
+                    logger.error("Skipping unreadable spool line %s in %s", line_no, self.replay_path)
+                    continue
+                yield line_no, line, record["q"], tuple(record["a"])
+
+    @staticmethod
+    def _group(records: list[tuple[int, str, str, tuple]]) -> list[tuple[str, list[tuple]]]:
+        """Group consecutive records with the same query, preserving order."""
+        batches: list[tuple[str, list[tuple]]] = []
+        for _, _, query, args in records:
+            if batches and batches[-1][0] == query:
+                batches[-1][1].append(args)
+            else:
+                batches.append((query, [args]))
+        return batches
+
+    def _replayed_lines(self) -> int:
+        try:
+            return int(self.progress_path.read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def _mark_replayed(self, line_no: int) -> None:
+        tmp = self.progress_path.with_suffix(".tmp")
+        tmp.write_text(str(line_no))
+        os.replace(tmp, self.progress_path)
+
+    def _quarantine(self, raw: str, error: Exception) -> None:
+        record = json.loads(raw)
+        record["e"] = str(getattr(error, "original", None) or error)
+        with open(self.failed_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.failed += 1
+
+    async def _apply_one_by_one(self, chunk, execute_batches) -> None:
+        """Replay a failed chunk record by record, moving records the database rejects to failed_path."""
+        for line_no, raw, query, args in chunk:
+            try:
+                await execute_batches([(query, [args])])
+            except DatabaseUnavailableError:
+                raise
+            except DatabaseError as e:
+                logger.error("Spooled write rejected, moved to %s | %s | %s", self.failed_path, query[:100], e)
+                self._quarantine(raw, e)
+            self._mark_replayed(line_no)
+
+    async def replay(
+        self,
+        execute_batches: Callable[[list[tuple[str, list[tuple]]]], Awaitable[None]],
+        chunk_size: int = REPLAY_CHUNK,
+    ) -> int:
+        """
+        Apply spooled writes with execute_batches (expected to run them in one transaction),
+        chunk_size records per call. Progress is saved after every chunk, so a failed replay
+        resumes after the last applied chunk. When a chunk fails for any reason other than the
+        database being unavailable, its records are retried one at a time and the ones that
+        fail again are moved to failed_path instead of blocking the spool.
+        Returns the number of writes applied. Raises DatabaseUnavailableError (file kept).
+        """
+        if not self.replay_path.exists():
+            if not self.path.exists():
+                return 0
+            self.progress_path.unlink(missing_ok=True)
+            os.replace(self.path, self.replay_path)
+        count = 0
+        failed_before = self.failed
+        chunk: list[tuple[int, str, str, tuple]] = []
+        records = self._read_records(self._replayed_lines())
+        while True:
+            record = next(records, None)
+            if record is not None:
+                chunk.append(record)
+                if len(chunk) < chunk_size:
+                    continue
+            if not chunk:
+                break
+            try:
+                await execute_batches(self._group(chunk))
+                self._mark_replayed(chunk[-1][0])
+            except DatabaseUnavailableError:
+                raise
+            except DatabaseError:
+                await self._apply_one_by_one(chunk, execute_batches)
+            count += len(chunk)
+            chunk = []
+        self.replay_path.unlink()
+        self.progress_path.unlink(missing_ok=True)
+        self.pending = self._count_lines(self.path)
+        count -= self.failed - failed_before
+        if count:
+            logger.info("Replayed %s spooled database writes", count)
+        return count
@@ -0,0 +1,277 @@
+"""
+Webhook ingestion - alternative to long polling (UPDATE_MODE=webhook).
+A small asyncio HTTP server accepts Telegram's POSTs, checks the secret token,
+puts the update on the Application's bounded update queue and answers 200 right away;
+handlers run afterwards. When the queue is full the server answers 503 and Telegram
+redelivers the update later, so a burst never grows memory without bound.
+Several instances can run behind one load balancer with the same WEBHOOK_SECRET_TOKEN.
+The port may be reachable by anyone: each request must arrive in full within
+_REQUEST_TIMEOUT, connections are capped, and the secret token is checked before the body
+is read, so slow or unauthenticated clients can't hold the server.
+"""
+
+import asyncio
+import contextlib
+import hmac
+import json
+import re
+import signal
+import time
+
+from telegram import Update
+from telegram.ext import Application
+
+from bot.config import (
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_MAX_CONNECTIONS,
+)
+from bot.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SECRET_HEADER = "x-telegram-bot-api-secret-token"
+_SECRET_RE = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+_MAX_BODY_BYTES = 1024 * 1024
+_MAX_HEADERS = 100
+# Deadline for reading one whole request (request line, headers and body); an idle
+# keep-alive connection is closed after this long too (Telegram reconnects as needed)
+_REQUEST_TIMEOUT = 30.0
+# Open connections beyond Telegram's own limit are answered 503 and closed
+_MAX_CONNECTIONS = WEBHOOK_MAX_CONNECTIONS + 20
+# On shutdown, how long accepted-but-unprocessed updates may take to finish
+_DRAIN_TIMEOUT = 10.0
+_QUEUE_FULL_LOG_INTERVAL = 10.0
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    501: "Not Implemented",
+    503: "Service Unavailable",
+}
+
+
+class _Reject(Exception):
+    """A request answered with `status` before its body was read; the connection is closed."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+def webhook_config_error() -> str | None:
+    """Return why the webhook settings are unusable, or None if they are fine."""
+    if not WEBHOOK_URL.startswith("https://"):
+        return "WEBHOOK_URL must be set to a public https:// URL"
+    if not _SECRET_RE.match(WEBHOOK_SECRET_TOKEN):
+        return "WEBHOOK_SECRET_TOKEN must be 1-256 characters of A-Z, a-z, 0-9, _ and -"
+    return None
+
+
+class WebhookServer:
+    """Minimal HTTP/1.1 server for Telegram webhook POSTs (keep-alive, no TLS - terminate it in front)."""
+
+    def __init__(
+        self,
+        application: Application,
+        listen: str,
+        port: int,
+        path: str,
+        secret_token: str,
+    ) -> None:
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self._secret = secret_token.encode()
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+        self.accepted = 0
+        self.rejected_full = 0
+        self._last_full_log = 0.0
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        logger.info("Webhook server listening on %s:%s%s", self.listen, self.port, self.path)
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        logger.info(
+            "Webhook server stopped | accepted=%s rejected_queue_full=%s",
+            self.accepted,
+            self.rejected_full,
+        )
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            if len(self._connections) > _MAX_CONNECTIONS:
+                logger.warning("Webhook connection limit (%s) reached, refusing a connection", _MAX_CONNECTIONS)
+                await self._respond(writer, 503, keep_alive=False)
+                return
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), _REQUEST_TIMEOUT)
+                except _Reject as e:
+                    await self._respond(writer, e.status, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                _, _, version, headers, body = request
+                status = self._accept(body)
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, str, dict, bytes] | None:
+        """
+        Read one request: (method, path, version, headers, body), or None when the client closed
+        the connection. Raises _Reject for a request refused before its body is read.
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, version = request_line.decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= _MAX_HEADERS:
+                raise ValueError("too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        path = target.split("?", 1)[0]
+        # Checked before the body is read, so unauthenticated clients can't make us buffer it
+        if path != self.path:
+            raise _Reject(404)
+        if method != "POST":
+            raise _Reject(405)
+        if not hmac.compare_digest(headers.get(_SECRET_HEADER, "").encode(), self._secret):
+            logger.warning("Webhook request with wrong secret token rejected")
+            raise _Reject(403)
+        if "transfer-encoding" in headers:
+            raise _Reject(501)
+        if "content-length" not in headers:
+            raise _Reject(411)
+        length = int(headers["content-length"])
+        if length < 0:
+            raise ValueError("negative content-length")
+        if length > _MAX_BODY_BYTES:
+            raise _Reject(413)
+        body = await reader.readexactly(length) if length else b""
+        return method, path, version, headers, body
+
+    def _accept(self, body: bytes) -> int:
+        """Enqueue the update of an authenticated request. Returns the HTTP status."""
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except Exception:
+            logger.warning("Webhook request with malformed update body rejected")
+            return 400
+        if update is None:
+            return 400
+        try:
+            self.application.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected_full += 1
+            now = time.monotonic()
+            if now - self._last_full_log >= _QUEUE_FULL_LOG_INTERVAL:
+                self._last_full_log = now
+                logger.warning(
+                    "Update queue full (%s), answering 503 so Telegram retries | rejected so far: %s",
+                    self.application.update_queue.maxsize,
+                    self.rejected_full,
+                )
+            return 503
+        self.accepted += 1
+        return 200
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, keep_alive: bool) -> None:
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                "Content-Length: 0\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                "\r\n"
+            ).encode("latin-1")
+        )
+        await writer.drain()
+
+
+async def _serve(application: Application) -> None:
+    """Same lifecycle as run_polling, with the webhook server in place of the updater."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    server = WebhookServer(application, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN)
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            drop_pending_updates=False,
+        )
+        logger.info("Webhook registered | %s%s", WEBHOOK_URL.rstrip("/"), WEBHOOK_PATH)
+        await stop.wait()
+        logger.info("Stop signal received, shutting down webhook mode")
+    finally:
+        await server.stop()
+        # Updates already answered with 200 would otherwise be dropped by Application.stop()
+        try:
+            await asyncio.wait_for(application.update_queue.join(), _DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Shutdown drain timed out, %s queued updates dropped",
+                application.update_queue.qsize(),
+            )
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+def run_webhook(application: Application) -> None:
+    """Blocking entry point for UPDATE_MODE=webhook. The webhook stays registered on exit."""
+    asyncio.run(_serve(application))